@@ -0,0 +1,184 @@
+"""Engine-vs-engine arena: play many games between two search configurations on a process pool.
+Colors alternate (player A moves first in even games, B in odd ones), every game gets its own
+seed from one SeedSequence, and each finished game is appended to a JSONL file as it comes in,
+so a long match can be watched (or salvaged) while it runs.
+
+    a = Player(MCTS, playouts=400, scorer=PUCT(c=3.))
+    b = Player(MCGS, playouts=400)
+    with Arena(a, b, Connect4.get_state(np.zeros((6, 7))), seed=0) as arena:
+        print(arena.play(1000, path='match.jsonl'))
+
+    python arena.py --game connect4 --games 1000 --a MCTS:400 --b MCGS:400 --jsonl match.jsonl
+"""
+from typing import Any
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+import numpy as np
+from connect4 import Connect4
+from tictactoe import TicTacToe
+from mcts import MCTS
+from mcgs import MCGS
+from selection import PUCT
+
+GameState = Any
+
+ENGINES = {'MCTS': MCTS, 'MCGS': MCGS}
+GAMES = {'connect4': (Connect4, (6, 7)), 'tictactoe': (TicTacToe, (3, 3))}
+
+class Player:
+    """One side of a match: an engine class, playouts per move and the engine's keyword arguments.
+    With reuse_tree the search tree is kept between moves (advanced past both players' moves)."""
+    def __init__(player, engine: type = MCTS, playouts: int = 1000, name: str | None = None,
+                 reuse_tree: bool = True, **engine_kwargs):
+        player.engine: type = engine
+        player.playouts: int = playouts
+        player.name: str = name or f"{engine.__name__}:{playouts}"
+        player.reuse_tree: bool = reuse_tree
+        player.engine_kwargs: dict = engine_kwargs
+
+    def new_tree(player, game_state: GameState, seed: int):
+        return player.engine(game_state, rng=random.Random(seed), **player.engine_kwargs)
+
+def play_game(index: int, a: Player, b: Player, start: GameState, seed: int) -> dict:
+    """Worker task: play one game, A moving first when index is even. Returns the game record,
+    with `score` the result for A (1 win, 0 draw, -1 loss)."""
+    players = (a, b) if index % 2 == 0 else (b, a)
+    colors = {start.player: players[0], -start.player: players[1]}
+    seeds = {color: seed + i for i, color in enumerate(colors)}
+    trees = {color: None for color in colors}
+    game = start
+    moves, seconds, playouts = [], [], []
+    while not game.is_terminal:
+        color = game.player
+        player = colors[color]
+        tick = time.perf_counter()
+        if trees[color] is None or not player.reuse_tree:
+            trees[color] = player.new_tree(game, seeds[color] + len(moves))
+        result = trees[color].search(player.playouts)
+        seconds.append(time.perf_counter() - tick)
+        playouts.append(result.playouts)
+        moves.append(result.best_move)
+        next_game = game.transition(result.best_move)
+        for side, tree in trees.items():
+            if tree is not None and colors[side].reuse_tree:
+                tree.advance(next_game)
+        game = next_game
+    a_color = start.player if players[0] is a else -start.player
+    return {'game': index, 'seed': seed, 'a_first': players[0] is a, 'a_color': a_color,
+            'score': game.result[a_color], 'moves': [list(move) if isinstance(move, tuple) else move for move in moves],
+            'seconds': seconds, 'playouts': playouts}
+
+def wilson(successes: float, n: int, z: float = 1.96) -> tuple[float, float]:
+    """Wilson score interval for a proportion; draws may be passed as half successes."""
+    if n == 0:
+        return 0., 1.
+    p = successes / n
+    center = (p + z * z / (2 * n)) / (1 + z * z / n)
+    half = z / (1 + z * z / n) * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n))
+    return max(center - half, 0.), min(center + half, 1.)
+
+class MatchResult:
+    """Win/draw/loss counts from A's point of view, and how long the match took."""
+    def __init__(result, a: str, b: str, wins: int, draws: int, losses: int, elapsed: float):
+        result.a: str = a
+        result.b: str = b
+        result.wins: int = wins
+        result.draws: int = draws
+        result.losses: int = losses
+        result.elapsed: float = elapsed  # seconds
+
+    @property
+    def games(result) -> int:
+        return result.wins + result.draws + result.losses
+
+    @property
+    def score(result) -> float:
+        """A's expected score: wins plus half the draws, per game."""
+        return (result.wins + result.draws / 2) / result.games if result.games else 0.
+
+    @property
+    def interval(result) -> tuple[float, float]:
+        """95% Wilson interval of A's score."""
+        return wilson(result.wins + result.draws / 2, result.games)
+
+    @property
+    def games_per_min(result) -> float:
+        return 60 * result.games / result.elapsed if result.elapsed else 0.
+
+    def __repr__(result):
+        lo, hi = result.interval
+        return (f"{result.a} vs {result.b}: +{result.wins} ={result.draws} -{result.losses} "
+                f"score {result.score:.3f} [{lo:.3f}, {hi:.3f}] ({result.games_per_min:.1f} games/min)")
+
+class Arena:
+    """Plays matches between two Players from one start position on a pool of `workers`
+    processes (created once, reused by every play(); close() it when done)."""
+    def __init__(arena, a: Player, b: Player, start: GameState, workers: int | None = None,
+                 seed: int | None = None, mp_context: str | None = None):
+        arena.a: Player = a
+        arena.b: Player = b
+        arena.start: GameState = start
+        arena.workers: int = workers or os.cpu_count()
+        arena.seeds = np.random.SeedSequence(seed)
+        arena.pool = multiprocessing.get_context(mp_context).Pool(arena.workers)
+
+    def play(arena, games: int, path: str | os.PathLike | None = None) -> MatchResult:
+        """Play `games` games; each game record is appended to the JSONL file at path as it finishes."""
+        seeds = [int(child.generate_state(1)[0]) for child in arena.seeds.spawn(games)]
+        tasks = [(i, arena.a, arena.b, arena.start, seed) for i, seed in enumerate(seeds)]
+        scores = {1: 0, 0: 0, -1: 0}
+        start = time.perf_counter()
+        file = open(path, 'a') if path is not None else None
+        try:
+            for record in arena.pool.imap_unordered(_play_game, tasks):
+                scores[record['score']] += 1
+                if file is not None:
+                    file.write(json.dumps(record) + '\n')
+                    file.flush()
+        finally:
+            if file is not None:
+                file.close()
+        return MatchResult(arena.a.name, arena.b.name, scores[1], scores[0], scores[-1],
+                           time.perf_counter() - start)
+
+    def close(arena):
+        arena.pool.close()
+        arena.pool.join()
+
+    def __enter__(arena):
+        return arena
+
+    def __exit__(arena, *exc_info):
+        arena.close()
+
+def _play_game(task: tuple) -> dict:
+    return play_game(*task)
+
+def parse_player(spec: str) -> Player:
+    """ENGINE:PLAYOUTS[:C], e.g. MCGS:400 or MCTS:400:1.5 (C is the PUCT exploration constant)."""
+    engine, playouts, *c = spec.split(':')
+    kwargs = {'scorer': PUCT(c=float(c[0]))} if c else {}
+    return Player(ENGINES[engine], int(playouts), name=spec, **kwargs)
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--game', choices=list(GAMES), default='connect4')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--a', default='MCTS:200', help="ENGINE:PLAYOUTS[:C] of player A")
+    parser.add_argument('--b', default='MCGS:200', help="ENGINE:PLAYOUTS[:C] of player B")
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--jsonl', help="append every finished game to this file")
+    args = parser.parse_args(argv)
+    game, shape = GAMES[args.game]
+    with Arena(parse_player(args.a), parse_player(args.b), game.get_state(np.zeros(shape)),
+               args.workers, args.seed) as arena:
+        print(arena.play(args.games, args.jsonl))
+
+if __name__ == "__main__":
+    main()
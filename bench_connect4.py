@@ -0,0 +1,72 @@
+"""States/sec of the bitboard Connect4State against the old NumPy window scan.
+Run with `python bench_connect4.py [n_playouts]`."""
+import random
+import sys
+import time
+from itertools import product
+import numpy as np
+from connect4 import Connect4
+
+class WindowScanConnect4State:
+    """The previous Connect4State: every state scans all 4x4 windows with NumPy."""
+    game_states: dict = {}
+
+    def __init__(game, state: np.ndarray):
+        game.state: np.ndarray = state
+        game.player = 1 if np.sum(state) <= 0 else -1
+        game.result = game.game_result()
+        game.is_terminal = True if game.result is not None else False
+        game.all_legal_actions: list[int] = [action for
+                                               action in range(state.shape[1])
+                                               if np.any(state[:,action]==0)] if not game.is_terminal else []
+
+    def transition(game, action: int) -> 'WindowScanConnect4State':
+        new_state = game.state.copy()
+        for i,row_entry in enumerate(reversed(new_state[:,action])):
+            if row_entry == 0:
+                new_state[game.state.shape[0]-i-1,action] = game.player
+                break
+        state_tuple = tuple(new_state.flat)
+        if state_tuple not in WindowScanConnect4State.game_states:
+            WindowScanConnect4State.game_states[state_tuple] = WindowScanConnect4State(new_state)
+        return WindowScanConnect4State.game_states[state_tuple]
+
+    def game_result(game) -> dict | None:
+        def check_4by4(view: np.ndarray):
+            horiz_sums: set[int] = set(view.sum(axis=1).tolist())
+            vert_sums: set[int]  = set(view.sum(axis=0).tolist())
+            diag_sums: set[int]  = {view.trace(), view[::-1].trace()}
+            all_sums: set[int] = horiz_sums | vert_sums | diag_sums
+
+            if 4 in all_sums:      return {1:1, -1:-1}
+            if -4 in all_sums:     return {1:-1, -1:1}
+            if np.all(game.state): return {1:0, -1:0}
+            else: return None
+
+        return next((result for result in map(check_4by4,(game.state[i:i+4,j:j+4]
+            for (i, j) in product(range(game.state.shape[0]-3), range(game.state.shape[1]-3))))
+            if result is not None), None)
+
+def states_per_sec(root, n_playouts: int) -> float:
+    """Random playouts from root; every ply creates (and interns) a fresh state."""
+    random.seed(0)
+    states = 0
+    start = time.perf_counter()
+    for _ in range(n_playouts):
+        game = root
+        while not game.is_terminal:
+            game = game.transition(random.choice(game.all_legal_actions))
+            states += 1
+    return states / (time.perf_counter() - start)
+
+def main(n_playouts: int = 200):
+    empty_board = np.zeros((6, 7))
+    WindowScanConnect4State.game_states = {}
+    Connect4.reset_cache()
+    old = states_per_sec(WindowScanConnect4State(empty_board), n_playouts)
+    new = states_per_sec(Connect4.get_state(empty_board), n_playouts)
+    print(f"window scan: {old:12.0f} states/sec")
+    print(f"bitboard:    {new:12.0f} states/sec  ({new / old:.1f}x)")
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,53 @@
+"""Lookups/sec of a node table keyed by game states under three hashing schemes:
+`tuple(state.flat)` (how TicTacToeState hashed and both games interned before Zobrist keys),
+the exact (x_bits, o_bits, shape) key (how Connect4State hashed) and the cached Zobrist key.
+Also times transitions that hit the intern cache, which look states up by Zobrist key.
+A Zobrist lookup still pays for the Python-level __hash__ call, but no longer builds a tuple.
+Run with `python bench_hashing.py [n_positions] [repeats]`."""
+import random
+import sys
+import time
+import numpy as np
+from connect4 import Connect4
+from tictactoe import TicTacToe
+
+def positions(root, n: int) -> list:
+    random.seed(0)
+    found = []
+    while len(found) < n:
+        game = root
+        while not game.is_terminal and len(found) < n:
+            game = game.transition(random.choice(game.all_legal_actions))
+            found.append(game)
+    return found
+
+def lookups_per_sec(games: list, key, repeats: int) -> float:
+    """Look every game up in a table keyed by key(game), rebuilding the key on each lookup
+    the way the state's __hash__ would."""
+    table = dict.fromkeys(map(key, games))
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for game in games:
+            table[key(game)]
+    return len(games) * repeats / (time.perf_counter() - start)
+
+def main(n_positions: int = 2000, repeats: int = 20):
+    print(f"{'game':>10} {'tuple(flat)':>12} {'exact key':>12} {'zobrist':>12} {'transition':>12}")
+    for name, root in (('connect4', Connect4.get_state(np.zeros((6, 7)))),
+                       ('tictactoe', TicTacToe.get_state(np.zeros((3, 3))))):
+        games = positions(root, n_positions)
+        moves = [(game, action) for game in games for action in game.all_legal_actions]
+        for game, action in moves:
+            game.transition(action)  # warm the cache
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for game, action in moves:
+                game.transition(action)
+        transitions = len(moves) * repeats / (time.perf_counter() - start)
+        rates = (lookups_per_sec(games, lambda game: tuple(game.state.flat), repeats),
+                 lookups_per_sec(games, lambda game: (game.x_bits, game.o_bits, game.key[2]), repeats),
+                 lookups_per_sec(games, lambda game: game, repeats), transitions)
+        print(f"{name:>10} " + " ".join(f"{rate:12.0f}" for rate in rates))
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
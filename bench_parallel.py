@@ -0,0 +1,45 @@
+"""Playouts/sec of TreeParallelMCTS at 1, 2, 4 and 8 worker threads on the Connect4 test positions.
+Run with `python bench_parallel.py [playouts]`."""
+import random
+import sys
+import time
+import numpy as np
+from connect4 import Connect4
+from parallel import TreeParallelMCTS
+
+POSITIONS = {
+    'empty': np.zeros((6, 7)),
+    'one_move_to_win': np.array([
+        [0., 0., 0., 0., 0., 0., 0.],
+        [0., 0., 0., 0., 0., 0., 0.],
+        [0., 0., 0., 0., 0., 0., 0.],
+        [0., 0., 0., 1., 0., 0., 0.],
+        [0., 0., -1, 1., 0., 0., 0.],
+        [0., 0., -1, 1, -1, 0., 0.]]),
+    'O_can_win': np.array([
+        [0., 0., 0., 0., 0., 0., 0.],
+        [0., 0., 0., 1., 0., 0., 0.],
+        [0., 0., 0., -1., 0., 0., 0.],
+        [0., 0., -1., 1., 0., 0., 0.],
+        [0., 0., -1, 1., 1., 0., 0.],
+        [0., 0., -1, 1, -1, 0., 0.]]),
+}
+
+def playouts_per_sec(board: np.ndarray, workers: int, n: int, batch_size: int) -> float:
+    random.seed(0)
+    Connect4.reset_cache()
+    tree = TreeParallelMCTS(Connect4.get_state(board), workers=workers, batch_size=batch_size)
+    start = time.perf_counter()
+    tree.search(n)
+    return tree.root.N / (time.perf_counter() - start)
+
+def main(n: int = 2000):
+    for batch_size in (1, 64):
+        print(f"batch_size={batch_size}")
+        print(f"{'position':>16} " + " ".join(f"{w:>10}w" for w in (1, 2, 4, 8)))
+        for name, board in POSITIONS.items():
+            rates = [playouts_per_sec(board, workers, n // batch_size or 1, batch_size) for workers in (1, 2, 4, 8)]
+            print(f"{name:>16} " + " ".join(f"{rate:11.0f}" for rate in rates))
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
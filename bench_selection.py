@@ -0,0 +1,52 @@
+"""Selections/sec of the child scoring kernels at several branching factors.
+`max()` + per-child PUCT with scalar np.sqrt is how MCTS.best_child used to score children.
+"PUCT array" assumes the child statistics are already in arrays, as in a NodeStore.
+Run with `python bench_selection.py [repeats]`."""
+import random
+import sys
+import time
+import numpy as np
+from mcts import MCTSNode
+from selection import PUCT, UCB1, UCB1Tuned
+
+class Stub:
+    is_terminal = False
+
+def make_children(branching: int) -> list[MCTSNode]:
+    children = []
+    for _ in range(branching):
+        child = MCTSNode(Stub())
+        child.N = random.randint(1, 1000)
+        child.results = {1: random.randint(0, child.N), -1: 0, 0: 0}
+        child.results[-1] = child.N - child.results[1]
+        child.W = child.results[1] - child.results[-1]
+        children.append(child)
+    return children
+
+def per_sec(fn, repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return repeats / (time.perf_counter() - start)
+
+def main(repeats: int = 2000):
+    random.seed(0)
+    print(f"{'children':>8} {'max+np.sqrt':>12} {'PUCT':>12} {'UCB1':>12} {'UCB1Tuned':>12} {'PUCT array':>12}")
+    for branching in (3, 7, 30, 100, 1000):
+        children = make_children(branching)
+        parent_N = sum(child.N for child in children)
+        priors = dict.fromkeys(children, 1.)  # the parent's edge priors
+        def old_puct(node, c_param=3):
+            return node.Q + c_param * priors[node] * np.sqrt(parent_N) / (1 + node.N)
+        def stats():
+            return [c.Q for c in children], [c.N for c in children], [priors[c] for c in children]
+        Q, N, P = (np.array(x, dtype=float) for x in stats())
+        results = np.array([[c.results[1], c.results[-1], c.results[0]] for c in children])
+        rates = [per_sec(lambda: max([child for child in children], key=old_puct), repeats)]
+        for scorer in (PUCT(), UCB1(), UCB1Tuned()):
+            rates.append(per_sec(lambda: scorer.best(parent_N, children, *stats()), repeats))
+        rates.append(per_sec(lambda: children[int(np.argmax(PUCT().array_scores(parent_N, Q, N, P, results)))], repeats))
+        print(f"{branching:>8} " + " ".join(f"{rate:12.0f}" for rate in rates))
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
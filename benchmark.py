@@ -0,0 +1,144 @@
+"""Seeded benchmark suite: MCTS and MCGS on the tic-tac-toe and Connect4 test positions.
+Every case searches with its own random.Random, NumPy generator and intern cache, so two runs
+with the same arguments build the same trees and pick the same moves. Reported per case:
+playouts/sec, nodes/sec, p50/p99 latency of one run(), intern cache size, peak RSS of the
+process so far, the chosen move and whether it is the known right one.
+
+    python benchmark.py --playouts 2000 --json results.json
+    python benchmark.py --json new.json --compare results.json   # flag playouts/sec regressions
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import numpy as np
+from cache import StateCache
+from connect4 import Connect4
+from tictactoe import TicTacToe
+from mcts import MCTS
+from mcgs import MCGS
+from budget import root_statistics
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ENGINES = {'MCTS': MCTS, 'MCGS': MCGS}
+
+# (game, board, expected best move or None), taken from the test files
+POSITIONS = {
+    'tictactoe/empty': (TicTacToe, np.zeros((3, 3)), None),
+    'tictactoe/almost_won': (TicTacToe, np.array([
+        [1,-1,0],
+        [1,1,-1],
+        [-1,0,0]]), (2, 2)),
+    'tictactoe/O_can_win': (TicTacToe, np.array([
+        [-1,1,0],
+        [1,-1,0],
+        [0,0,0]]), (2, 2)),
+    'connect4/empty': (Connect4, np.zeros((6, 7)), None),
+    'connect4/one_move_to_win': (Connect4, np.array([
+        [0., 0., 0., 0., 0., 0., 0.],
+        [0., 0., 0., 0., 0., 0., 0.],
+        [0., 0., 0., 0., 0., 0., 0.],
+        [0., 0., 0., 1., 0., 0., 0.],
+        [0., 0., -1, 1., 0., 0., 0.],
+        [0., 0., -1, 1, -1, 0., 0.]]), 3),
+    'connect4/O_can_win': (Connect4, np.array([
+        [0., 0., 0., 0., 0., 0., 0.],
+        [0., 0., 0., 1., 0., 0., 0.],
+        [0., 0., 0., -1., 0., 0., 0.],
+        [0., 0., -1., 1., 0., 0., 0.],
+        [0., 0., -1, 1., 1., 0., 0.],
+        [0., 0., -1, 1, -1, 0., 0.]]), 2),
+    'connect4/cant_lose': (Connect4, np.array([
+        [ 0, -1, 0, -1,  1, -1,  0],
+        [-1,  1, 0,  1, -1,  1, -1],
+        [-1,  1, 1,  1, -1,  -1, 1],
+        [ 1, -1,  1, -1,  1, -1,  1],
+        [ 1, -1,  1, -1,  1, -1,  1],
+        [-1,  1, -1,  1, -1,  1, -1]]), None),
+}
+
+def peak_rss() -> int | None:
+    """Peak resident set size of this process in bytes (None where unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # macOS reports bytes, Linux KiB
+
+def run_case(position: str, engine: str, playouts: int, seed: int, **engine_kwargs) -> dict:
+    game, board, expected = POSITIONS[position]
+    cache = StateCache()
+    tree = ENGINES[engine](game.get_state(board, cache=cache), rng=random.Random(seed), **engine_kwargs)
+    latencies = np.empty(playouts)
+    start = time.perf_counter()
+    for i in range(playouts):
+        tick = time.perf_counter()
+        tree.run()
+        latencies[i] = time.perf_counter() - tick
+    elapsed = time.perf_counter() - start
+    visits, _ = root_statistics(tree)
+    best_move = max(visits, key=visits.get) if visits else None
+    return {'position': position, 'engine': engine, 'playouts': playouts, 'seed': seed,
+            'playouts_per_sec': playouts / elapsed, 'nodes_per_sec': len(tree.nodes) / elapsed,
+            'nodes': len(tree.nodes), 'p50_ms': float(np.percentile(latencies, 50)) * 1e3,
+            'p99_ms': float(np.percentile(latencies, 99)) * 1e3, 'cache_size': len(cache),
+            'peak_rss': peak_rss(), 'best_move': list(best_move) if isinstance(best_move, tuple) else best_move,
+            'correct': None if expected is None else best_move == expected}
+
+def run_suite(positions: list[str] | None = None, engines: list[str] | None = None,
+              playouts: int = 1000, seed: int = 0) -> dict:
+    cases = [run_case(position, engine, playouts, seed)
+             for position in positions or POSITIONS for engine in engines or ENGINES]
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'cases': cases}
+
+def compare(results: dict, baseline: dict, tolerance: float = .1) -> list[str]:
+    """Cases whose playouts/sec fell more than `tolerance` below the baseline, or whose move changed."""
+    before = {(case['position'], case['engine']): case for case in baseline['cases']}
+    regressions = []
+    for case in results['cases']:
+        old = before.get((case['position'], case['engine']))
+        if old is None:
+            continue
+        ratio = case['playouts_per_sec'] / old['playouts_per_sec']
+        if ratio < 1 - tolerance:
+            regressions.append(f"{case['position']} {case['engine']}: {ratio:.2f}x playouts/sec")
+        if old['playouts'] == case['playouts'] and old['seed'] == case['seed'] and old['best_move'] != case['best_move']:
+            regressions.append(f"{case['position']} {case['engine']}: best move {old['best_move']} -> {case['best_move']}")
+    return regressions
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--playouts', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--positions', nargs='+', choices=list(POSITIONS))
+    parser.add_argument('--engines', nargs='+', choices=list(ENGINES))
+    parser.add_argument('--json', help="write the results to this file")
+    parser.add_argument('--compare', help="baseline results file to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=.2, help="allowed playouts/sec drop (default 0.2)")
+    args = parser.parse_args(argv)
+    results = run_suite(args.positions, args.engines, args.playouts, args.seed)
+    print(f"{'position':>26} {'engine':>6} {'playouts/s':>11} {'nodes/s':>9} {'p50 ms':>7} {'p99 ms':>7} "
+          f"{'cache':>7} {'rss MB':>7} {'move':>7} {'ok':>5}")
+    for case in results['cases']:
+        rss = f"{case['peak_rss'] / 2**20:7.0f}" if case['peak_rss'] is not None else f"{'-':>7}"
+        print(f"{case['position']:>26} {case['engine']:>6} {case['playouts_per_sec']:11.0f} "
+              f"{case['nodes_per_sec']:9.0f} {case['p50_ms']:7.3f} {case['p99_ms']:7.3f} {case['cache_size']:7d} "
+              f"{rss} {str(case['best_move']):>7} {str(case['correct']):>5}")
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=1)
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print("REGRESSION", regression)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Persistent opening book: per-position search statistics in one memory-mapped file.
+
+Layout (little endian): a 64 byte header, then the sorted Zobrist keys of all positions, then
+one fixed-size record per position (exact bitboards, N, Q, result counts and the slice of the
+edge table holding its children), then the edge table (child Zobrist key, edge visits).
+A Book maps the file read-only with np.memmap and binary-searches the key array, so opening
+it reads nothing but the header and a lookup touches a few pages. Any number of processes can
+open the same file and share it through the OS page cache; a Book pickles as its path.
+
+merge_book() adds a search's statistics to a book (positions found in both have their visits
+and result counts summed and their Q averaged by visits) and atomically replaces the file, so
+readers that already have it open keep their old, consistent copy."""
+from typing import Any
+import os
+import tempfile
+import numpy as np
+
+GameState = Any
+
+MAGIC = b'MCGSBOOK'
+VERSION = 1
+HEADER = np.dtype([('magic', 'S8'), ('version', '<u4'), ('rows', '<u4'), ('cols', '<u4'),
+                   ('pad', '<u4'), ('nodes', '<u8'), ('edges', '<u8'), ('reserved', 'V24')])
+RECORD = np.dtype([('x_bits', '<u8'), ('o_bits', '<u8'), ('N', '<i8'), ('Q', '<f8'),
+                   ('results', '<i8', (3,)), ('edge_start', '<u8'), ('edge_count', '<u8')])
+EDGE = np.dtype([('child', '<u8'), ('visits', '<i8')])
+REWARDS = (1, -1, 0)  # order of the result count columns
+
+class BookEntry:
+    """Book statistics of one position, from the perspective of the player who moved into it."""
+    def __init__(entry, N: int, Q: float, results: dict, edges: dict):
+        entry.N: int = N
+        entry.Q: float = Q
+        entry.results: dict = results  # reward -> playouts
+        entry.edges: dict = edges      # child Zobrist key -> edge visits
+
+class Book:
+    """Read-only view of a book file."""
+    def __init__(book, path: str | os.PathLike):
+        book.path = os.fspath(path)
+        header = np.fromfile(book.path, dtype=HEADER, count=1)
+        if len(header) == 0 or header['magic'][0] != MAGIC or header['version'][0] != VERSION:
+            raise ValueError(f"{book.path} is not a version {VERSION} book")
+        book.shape: tuple = (int(header['rows'][0]), int(header['cols'][0]))
+        n, m = int(header['nodes'][0]), int(header['edges'][0])
+        offset = HEADER.itemsize
+        book.keys = book._map(np.dtype('<u8'), offset, n)
+        offset += n * 8
+        book.records = book._map(RECORD, offset, n)
+        offset += n * RECORD.itemsize
+        book.edges = book._map(EDGE, offset, m)
+
+    def _map(book, dtype: np.dtype, offset: int, count: int) -> np.ndarray:
+        if count == 0:  # mmap cannot map zero bytes
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(book.path, dtype=dtype, mode='r', offset=offset, shape=(count,))
+
+    def find(book, game_state: GameState) -> int | None:
+        """Index of game_state's record, or None if the book does not have it."""
+        if game_state.key[2] != book.shape:
+            return None
+        key = np.uint64(game_state.zobrist)
+        i = int(np.searchsorted(book.keys, key))
+        while i < len(book.keys) and book.keys[i] == key:  # equal Zobrist keys: compare the boards
+            record = book.records[i]
+            if record['x_bits'] == game_state.x_bits and record['o_bits'] == game_state.o_bits:
+                return i
+            i += 1
+        return None
+
+    def lookup(book, game_state: GameState) -> BookEntry | None:
+        i = book.find(game_state)
+        if i is None:
+            return None
+        record = book.records[i]
+        start = int(record['edge_start'])
+        edges = book.edges[start:start + int(record['edge_count'])]
+        return BookEntry(int(record['N']), float(record['Q']),
+                         dict(zip(REWARDS, map(int, record['results']))),
+                         dict(zip(map(int, edges['child']), map(int, edges['visits']))))
+
+    def moves(book, game_state: GameState) -> dict[Any, BookEntry]:
+        """Book entry of the position after each legal action at game_state, for those in the book.
+        Each entry's Q is the action's value for the player to move at game_state."""
+        moves = {}
+        for action in game_state.all_legal_actions:
+            entry = book.lookup(game_state.transition(action))
+            if entry is not None:
+                moves[action] = entry
+        return moves
+
+    def __contains__(book, game_state: GameState) -> bool:
+        return book.find(game_state) is not None
+
+    def __len__(book) -> int:
+        return len(book.keys)
+
+    def __reduce__(book):
+        # workers reopen (and so share) the file instead of receiving a copy of it
+        return (Book, (book.path,))
+
+def graph_statistics(tree) -> tuple[list, list]:
+    """Per-position statistics gathered by a search (MCTS or MCGS), without those a warm-started
+    MCGS seeded its nodes with, so merging a warm-started search never counts the book twice."""
+    nodes, edges = [], []
+    for node in tree.nodes.values():
+        book_N = getattr(node, 'book_N', 0)
+        N = node.N - book_N
+        if N <= 0:
+            continue
+        game = node.game_state
+        W = node.Q * node.N - getattr(node, 'book_value', 0.)
+        book_results = getattr(node, 'book_results', None) or {}
+        results = [node.results[reward] - book_results.get(reward, 0) for reward in REWARDS]
+        nodes.append((game.zobrist, game.x_bits, game.o_bits, N, W, results))
+        edges.append([(child.game_state.zobrist, tree.visits(node, child)) for child in node.children])
+    return nodes, edges
+
+def merge_book(tree, path: str | os.PathLike) -> Book:
+    """Add the statistics of tree's search to the book at path (creating it if needed) and return
+    the new book. The file is rewritten next to the old one and swapped in with os.replace."""
+    path = os.fspath(path)
+    game = tree.root.game_state
+    shape = game.key[2]
+    stats, children = graph_statistics(tree)
+    keys = np.array([s[0] for s in stats], dtype=np.uint64)
+    x_bits = np.array([s[1] for s in stats], dtype=np.uint64)
+    o_bits = np.array([s[2] for s in stats], dtype=np.uint64)
+    N = np.array([s[3] for s in stats], dtype=np.int64)
+    W = np.array([s[4] for s in stats], dtype=np.float64)
+    results = np.array([s[5] for s in stats], dtype=np.int64).reshape(-1, 3)
+    edge_parent = np.repeat(np.arange(len(stats)), [len(c) for c in children])
+    edge_child = np.array([e[0] for c in children for e in c], dtype=np.uint64)
+    edge_visits = np.array([e[1] for c in children for e in c], dtype=np.int64)
+    if os.path.exists(path):
+        old = Book(path)
+        if old.shape != shape:
+            raise ValueError(f"{path} holds {old.shape} boards, not {shape}")
+        records = old.records
+        keys = np.concatenate([old.keys, keys])
+        x_bits = np.concatenate([records['x_bits'], x_bits])
+        o_bits = np.concatenate([records['o_bits'], o_bits])
+        N = np.concatenate([records['N'], N])
+        W = np.concatenate([records['Q'] * records['N'], W])
+        results = np.concatenate([records['results'], results])
+        old_parent = np.repeat(np.arange(len(old)), records['edge_count'].astype(np.int64))
+        edge_parent = np.concatenate([old_parent, edge_parent + len(old)])
+        edge_child = np.concatenate([old.edges['child'], edge_child])
+        edge_visits = np.concatenate([old.edges['visits'], edge_visits])
+        del old, records  # drop the mapping before the file is replaced
+    # one record per position: sort by (key, x_bits, o_bits) and sum each run of equal positions
+    order = np.lexsort((o_bits, x_bits, keys))
+    keys, x_bits, o_bits = keys[order], x_bits[order], o_bits[order]
+    new_position = np.ones(len(keys), dtype=bool)
+    new_position[1:] = (keys[1:] != keys[:-1]) | (x_bits[1:] != x_bits[:-1]) | (o_bits[1:] != o_bits[:-1])
+    starts = np.flatnonzero(new_position)
+    position = np.empty(len(keys), dtype=np.int64)
+    position[order] = np.cumsum(new_position) - 1  # input row -> merged position
+    N = np.add.reduceat(N[order], starts) if len(starts) else N
+    W = np.add.reduceat(W[order], starts) if len(starts) else W
+    results = np.add.reduceat(results[order], starts) if len(starts) else results
+    # one edge per (position, child): sum the visits of duplicates, grouped by position
+    edge_parent = position[edge_parent]
+    order = np.lexsort((edge_child, edge_parent))
+    edge_parent, edge_child = edge_parent[order], edge_child[order]
+    new_edge = np.ones(len(edge_parent), dtype=bool)
+    new_edge[1:] = (edge_parent[1:] != edge_parent[:-1]) | (edge_child[1:] != edge_child[:-1])
+    edge_starts = np.flatnonzero(new_edge)
+    edge_visits = np.add.reduceat(edge_visits[order], edge_starts) if len(edge_starts) else edge_visits
+    edge_parent, edge_child = edge_parent[edge_starts], edge_child[edge_starts]
+
+    n, m = len(starts), len(edge_starts)
+    header = np.zeros(1, dtype=HEADER)
+    header['magic'], header['version'], header['nodes'], header['edges'] = MAGIC, VERSION, n, m
+    header['rows'], header['cols'] = shape
+    records = np.zeros(n, dtype=RECORD)
+    records['x_bits'], records['o_bits'] = x_bits[starts], o_bits[starts]
+    records['N'], records['Q'], records['results'] = N, W / N, results
+    records['edge_count'] = np.bincount(edge_parent, minlength=n)
+    records['edge_start'] = np.cumsum(records['edge_count']) - records['edge_count']
+    edges = np.zeros(m, dtype=EDGE)
+    edges['child'], edges['visits'] = edge_child, edge_visits
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(dir=directory, suffix='.book', delete=False) as file:
+        for array in (header, keys[starts], records, edges):
+            file.write(array.tobytes())
+    os.replace(file.name, path)
+    return Book(path)
@@ -0,0 +1,90 @@
+from typing import Any
+import time
+
+class SearchResult:
+    """What a budgeted search did and what it recommends."""
+    def __init__(result, best_move: Any, visits: dict, values: dict, playouts: int, nodes: int,
+                 elapsed: float, stopped_by: str, solved: int | None = None):
+        result.best_move: Any = best_move  # most visited root action, None if the root is terminal
+        result.visits: dict = visits       # root action -> visits
+        result.values: dict = values       # root action -> Q for the player to move at the root
+        result.playouts: int = playouts    # number of run() calls
+        result.nodes: int = nodes          # nodes in the tree/graph when the search stopped
+        result.elapsed: float = elapsed    # seconds
+        result.stopped_by: str = stopped_by  # 'playouts', 'deadline', 'max_nodes', 'max_bytes', 'decided' or 'solved'
+        result.solved: int | None = solved  # proven value for the player to move at the root, if any
+
+    def __repr__(result):
+        return (f"SearchResult(best_move={result.best_move!r}, playouts={result.playouts}, "
+                f"nodes={result.nodes}, elapsed={result.elapsed:.3f}, stopped_by={result.stopped_by!r})")
+
+def root_statistics(tree) -> tuple[dict, dict]:
+    root = tree.root
+    children = tree.children_by_action(root)
+    visits = {action: tree.visits(root, child) for action, child in children.items()}
+    values = {action: child.Q for action, child in children.items()}
+    return visits, values
+
+def decided(tree, remaining_playouts: float) -> bool:
+    """True when no other root child can catch up with the most visited one in the remaining playouts."""
+    root = tree.root
+    visits = sorted((tree.visits(root, child) for child in root.children), reverse=True)
+    if len(visits) < 2:
+        return len(visits) == 1
+    return visits[0] - visits[1] > remaining_playouts * tree.max_visits_per_run()
+
+def exhausted(tree, playouts: int, start: float, n: int | None, deadline: float | None,
+              max_nodes: int | None, max_bytes: int | None, stop_early: bool) -> str | None:
+    """Which budget (if any) stops a search that has done `playouts` playouts since `start`."""
+    now = time.monotonic()
+    if deadline is not None and now >= deadline:
+        return 'deadline'
+    if max_nodes is not None and len(tree.nodes) >= max_nodes:
+        return 'max_nodes'
+    if max_bytes is not None and tree.memory_estimate() >= max_bytes:
+        return 'max_bytes'
+    if stop_early:
+        remaining = n - playouts if n is not None else float('inf')
+        if deadline is not None:
+            remaining = min(remaining, (deadline - now) * playouts / max(now - start, 1e-9))
+        if decided(tree, remaining):
+            return 'decided'
+    return None
+
+def search_result(tree, playouts: int, start: float, stopped_by: str) -> SearchResult:
+    visits, values = root_statistics(tree)
+    best_move = max(visits, key=visits.get) if visits else None
+    solved = None
+    if tree.solved():
+        solved = -tree.root.proven
+        # only a child proven to keep the root's value is a right move, even if another has more visits
+        proven_best = [action for action, child in tree.children_by_action(tree.root).items() if child.proven == solved]
+        if proven_best:
+            best_move = max(proven_best, key=lambda action: visits.get(action, 0))
+    return SearchResult(best_move, visits, values, playouts, len(tree.nodes),
+                        time.monotonic() - start, stopped_by, solved)
+
+def budgeted_search(tree, n: int | None = None, deadline: float | None = None,
+                    max_nodes: int | None = None, max_bytes: int | None = None,
+                    check_every: int = 64, stop_early: bool = True) -> SearchResult:
+    """Run playouts until n of them are done or a budget is hit, whichever comes first.
+    `deadline` is a time.monotonic() timestamp. The clock, the node and byte budgets and early
+    stopping are only checked every `check_every` playouts."""
+    if n is None and deadline is None and max_nodes is None and max_bytes is None:
+        raise ValueError("search needs a playout count or a budget")
+    start = time.monotonic()
+    playouts = 0
+    stopped_by = 'playouts'
+    while n is None or playouts < n:
+        if tree.solved():
+            stopped_by = 'solved'
+            break
+        tree.run()
+        playouts += 1
+        if playouts % check_every:
+            continue
+        reason = exhausted(tree, playouts, start, n, deadline, max_nodes, max_bytes, stop_early)
+        if reason is not None:
+            stopped_by = reason
+            break
+    return search_result(tree, playouts, start, stopped_by)
@@ -0,0 +1,92 @@
+from collections import OrderedDict
+from typing import Any, Hashable
+from weakref import WeakValueDictionary
+
+GameState = Any
+
+class StateCache:
+    """Bounded intern table for game states.
+    The `max_size` most recently used states are held strongly and evicted in LRU order.
+    Every interned state is also indexed weakly, so a state that is still referenced
+    somewhere else (e.g. by a live MCTS/MCGS node) is pinned: it keeps its identity however
+    long ago it was used, and is released as soon as the last node holding it goes away.
+
+    Each game class owns a default cache (`Connect4.cache`, `TicTacToe.cache`); pass your own
+    to `get_state` to give a search its own budget. States remember the cache they were
+    interned in and intern their children into the same one.
+
+    States are stored under their 64-bit Zobrist key (see zobrist.py) and checked against their
+    exact `key` on lookup. A state whose Zobrist slot is taken by a different position is stored
+    under its exact key instead and counted in `collisions`."""
+
+    def __init__(cache, max_size: int = 100_000):
+        cache.max_size: int = max_size
+        cache.recent: OrderedDict[Hashable, GameState] = OrderedDict()  # strong refs, LRU order
+        cache.live: WeakValueDictionary = WeakValueDictionary()         # every interned state
+        cache.hits: int = 0
+        cache.misses: int = 0
+        cache.evictions: int = 0
+        cache.collisions: int = 0
+
+    def get(cache, key: Hashable, exact_key: Hashable | None = None) -> GameState | None:
+        """Return the interned state for `key` or None, counting a hit or a miss.
+        With `exact_key`, a state stored under `key` only counts if it is that exact position."""
+        state = cache._find(key)
+        if exact_key is not None:
+            if state is not None and state.key != exact_key:
+                state = None
+            if state is None and cache.collisions:
+                state = cache._find(exact_key)  # it may have been stored under its exact key
+        if state is None:
+            cache.misses += 1
+            return None
+        cache.hits += 1
+        return state
+
+    def _find(cache, key: Hashable) -> GameState | None:
+        state = cache.recent.get(key)
+        if state is not None:
+            cache.recent.move_to_end(key)
+            return state
+        state = cache.live.get(key)
+        if state is not None:  # evicted from the LRU but pinned by someone else
+            cache._remember(key, state)
+        return state
+
+    def put(cache, key: Hashable, state: GameState) -> GameState:
+        """Intern `state` under `key` (under its exact key if `key` holds another position) and return it."""
+        occupant = cache.live.get(key)
+        if occupant is not None and occupant is not state and occupant.key != state.key:
+            cache.collisions += 1
+            key = state.key
+        cache.live[key] = state
+        cache._remember(key, state)
+        return state
+
+    def _remember(cache, key: Hashable, state: GameState):
+        cache.recent[key] = state
+        if len(cache.recent) > cache.max_size:
+            cache.recent.popitem(last=False)
+            cache.evictions += 1
+
+    def discard(cache, state: GameState):
+        """Un-intern `state`, if it is interned."""
+        for key in (state.zobrist, state.key):
+            if cache.live.get(key) is state:
+                cache.recent.pop(key, None)
+                cache.live.pop(key, None)
+
+    def clear(cache):
+        cache.recent.clear()
+        cache.live.clear()
+
+    def stats(cache) -> dict:
+        return {'size': len(cache.recent), 'live': len(cache.live), 'max_size': cache.max_size,
+                'hits': cache.hits, 'misses': cache.misses, 'evictions': cache.evictions,
+                'collisions': cache.collisions}
+
+    def __len__(cache):
+        return len(cache.live)
+
+    def __contains__(cache, key: Hashable):
+        return key in cache.live
@@ -1,62 +1,341 @@
 import numpy as np
-from itertools import product
+from functools import lru_cache
+from cache import StateCache
+from zobrist import zobrist_hash, zobrist_table
+
+X_WINS = {1: 1, -1: -1}  # Player 1 wins
+O_WINS = {1: -1, -1: 1}  # Player -1 wins
+TIE = {1: 0, -1: 0}
+
+@lru_cache(maxsize=None)
+def geometry(rows: int, cols: int) -> tuple:
+    """Precomputed bitboard masks for a rows x cols board.
+    Every column owns rows+1 bits (the extra one is an always-empty sentinel so
+    shifted lines never wrap into the next column). Bit c*(rows+1) + h is the cell
+    in column c at height h, counted from the bottom."""
+    height = rows + 1
+    bottom = sum(1 << (c * height) for c in range(cols))
+    board = bottom * ((1 << rows) - 1)
+    bottoms = tuple(1 << (c * height) for c in range(cols))
+    tops = tuple(1 << (c * height + rows - 1) for c in range(cols))
+    shifts = (1, height, height - 1, height + 1)  # vertical, horizontal, both diagonals
+    return bottoms, tops, board, shifts
+
+def four_through(bits: int, move: int, shifts: tuple) -> bool:
+    """Check only the lines that pass through the freshly filled `move` bit."""
+    for s in shifts:
+        run = 1
+        probe = move >> s
+        while probe & bits:
+            run += 1
+            probe >>= s
+        probe = move << s
+        while probe & bits:
+            run += 1
+            probe <<= s
+        if run >= 4:
+            return True
+    return False
+
+def has_four(bits: int, shifts: tuple) -> bool:
+    """Shift-and-mask check for four in a line on a single player's bitboard."""
+    for s in shifts:
+        m = bits & (bits >> s)
+        if m & (m >> 2 * s):
+            return True
+    return False
+
+def threats(bits: int, shifts: tuple) -> int:
+    """Every cell that would complete four in a line with `bits` (occupied or not, inside the
+    board or not: mask the result). Shifted copies of the bitboard, as in a bitboard solver."""
+    vertical = shifts[0]
+    found = (bits << vertical) & (bits << 2 * vertical) & (bits << 3 * vertical)
+    for s in shifts[1:]:
+        pair = (bits << s) & (bits << 2 * s)
+        found |= pair & (bits << 3 * s) | pair & (bits >> s)
+        pair = (bits >> s) & (bits >> 2 * s)
+        found |= pair & (bits << s) | pair & (bits >> 3 * s)
+    return found
+
+def mirror(bits: int, shape: tuple) -> int:
+    """Reflect a bitboard left to right by reversing the order of its columns."""
+    rows, cols = shape
+    height = rows + 1
+    column = (1 << height) - 1
+    mirrored = 0
+    for c in range(cols):
+        mirrored |= ((bits >> (c * height)) & column) << ((cols - 1 - c) * height)
+    return mirrored
+
+def batch_rollout(boards: np.ndarray, rng: np.random.Generator | None = None) -> np.ndarray:
+    """Play a uniformly random game to the end from each of K boards at once.
+    `boards` is a stacked (K, rows, cols) array; every ply samples a legal column for all
+    unfinished boards and checks their wins on uint64 bitboards in a handful of vector ops.
+    Returns a length-K array with 1 where player 1 won, -1 where player -1 won and 0 for ties."""
+    rng = np.random.default_rng() if rng is None else rng
+    k, rows, cols = boards.shape
+    height = rows + 1
+    if cols * height > 64:
+        raise ValueError(f"a {rows}x{cols} board does not fit in a 64 bit bitboard")
+    bottoms, tops, board, shifts = geometry(rows, cols)
+    bottoms = np.array(bottoms, dtype=np.uint64)
+    tops = np.array(tops, dtype=np.uint64)
+    weights = np.array([[1 << (c * height + rows - 1 - r) for c in range(cols)]
+                        for r in range(rows)], dtype=np.uint64)
+    x_bits = np.where(boards > 0, weights, 0).sum(axis=(1, 2), dtype=np.uint64)
+    o_bits = np.where(boards < 0, weights, 0).sum(axis=(1, 2), dtype=np.uint64)
+    balance = boards.sum(axis=(1, 2)).astype(np.int64)
+
+    def fours(bits: np.ndarray) -> np.ndarray:
+        won = np.zeros(k, dtype=bool)
+        for s in shifts:
+            m = bits & (bits >> np.uint64(s))
+            won |= (m & (m >> np.uint64(2 * s))) != 0
+        return won
+
+    results = np.zeros(k, dtype=np.int64)
+    x_won, o_won = fours(x_bits), fours(o_bits)
+    results[x_won] = 1
+    results[o_won & ~x_won] = -1
+    active = ~(x_won | o_won) & ((x_bits | o_bits) != np.uint64(board))
+    while active.any():
+        filled = x_bits | o_bits
+        legal = (filled[:, None] & tops[None, :]) == 0
+        action = np.argmax(rng.random((k, cols)) * legal, axis=1)
+        move = ((filled + bottoms[action]) & ~filled) * active
+        player = np.where(balance <= 0, 1, -1)
+        x_moves = player == 1
+        x_bits |= move * x_moves
+        o_bits |= move * ~x_moves
+        balance += player * active
+        won = active & np.where(x_moves, fours(x_bits), fours(o_bits))
+        results[won] = player[won]
+        active &= ~won & ((x_bits | o_bits) != np.uint64(board))
+    return results
 
 class Connect4State:
+    """A connect4 state stored as two bitboards, one per player.
+    The np.ndarray board is only built when someone reads `.state`."""
+    __slots__ = ('x_bits', 'o_bits', 'shape', 'key', 'zobrist', 'balance', 'player', 'result',
+                 'is_terminal', 'all_legal_actions', 'cache', '_state', '__weakref__')
+
     def __init__(game, state: np.ndarray):
-        game.state: np.ndarray = state
-        game.player = 1 if np.sum(state) <= 0 else -1
+        rows, cols = state.shape
+        height = rows + 1
+        x_bits = o_bits = 0
+        for r, c in zip(*np.nonzero(state)):
+            bit = 1 << (int(c) * height + rows - 1 - int(r))
+            if state[r, c] > 0:
+                x_bits |= bit
+            else:
+                o_bits |= bit
+        game._setup(x_bits, o_bits, (rows, cols))
+        game._state = state
+        game.cache: StateCache = Connect4.cache
+
+    @classmethod
+    def from_bits(cls, x_bits: int, o_bits: int, shape: tuple) -> 'Connect4State':
+        game = cls.__new__(cls)
+        game._setup(x_bits, o_bits, shape)
+        game._state = None
+        game.cache = Connect4.cache
+        return game
+
+    def _setup(game, x_bits: int, o_bits: int, shape: tuple):
+        game.x_bits: int = x_bits
+        game.o_bits: int = o_bits
+        game.shape: tuple = shape
+        game.key: tuple = (x_bits, o_bits, shape)  # the exact position; states are hashed by the Zobrist key
+        game.zobrist: int = zobrist_hash(x_bits, o_bits, zobrist_table(shape[1] * (shape[0] + 1)))
+        game.balance: int = x_bits.bit_count() - o_bits.bit_count()  # same as np.sum(state)
+        game.player = 1 if game.balance <= 0 else -1
         game.result = game.game_result()
         game.is_terminal = True if game.result is not None else False
-        game.all_legal_actions: list[int] = [action for 
-                                               action in range(state.shape[1]) 
-                                               if np.any(state[:,action]==0)] if not game.is_terminal else []
-    
+        if game.is_terminal:
+            game.all_legal_actions: list[int] = []
+        else:
+            filled = x_bits | o_bits
+            game.all_legal_actions = [action for action, top
+                                      in enumerate(geometry(*shape)[1])
+                                      if not filled & top]
+
+    @property
+    def state(game) -> np.ndarray:
+        if game._state is None:
+            rows, cols = game.shape
+            height = rows + 1
+            board = np.zeros(game.shape)
+            for bits, player in ((game.x_bits, 1), (game.o_bits, -1)):
+                while bits:
+                    low = bits & -bits
+                    c, h = divmod(low.bit_length() - 1, height)
+                    board[rows - 1 - h, c] = player
+                    bits ^= low
+            game._state = board
+        return game._state
+
+    @property
+    def num_actions(game) -> int:
+        return game.shape[1]
+
+    def action_index(game, action: int) -> int:
+        """Position of action in an evaluator's prior vector."""
+        return action
+
+    def canonical(game) -> tuple:
+        """The key shared by this position and its mirror image (the smaller of the two)."""
+        return min(game.key, (mirror(game.x_bits, game.shape), mirror(game.o_bits, game.shape), game.shape))
+
     def transition(game, action: int) -> 'Connect4State':
-        new_state = game.state.copy()
-        for i,row_entry in enumerate(reversed(new_state[:,action])):
-            if row_entry == 0:
-                new_state[game.state.shape[0]-i-1,action] = game.player
-                break
-        return Connect4.get_state(new_state)
-    
-    def game_result(game) -> int | None:
-        def check_4by4(view: np.ndarray):
-            horiz_sums: set[int] = set(view.sum(axis=1).tolist())
-            vert_sums: set[int]  = set(view.sum(axis=0).tolist())
-            diag_sums: set[int]  = {view.trace(), view[::-1].trace()}
-            all_sums: set[int] = horiz_sums | vert_sums | diag_sums
-            
-            if 4 in all_sums:      return {1:1, -1:-1} # Player 1 wins
-            if -4 in all_sums:     return {1:-1, -1:1} # Player -1 wins
-            if np.all(game.state): return {1:0, -1:0} # Tie 
-            else: return None                   # No result
-        
-        return next((result for result in map(check_4by4,(game.state[i:i+4,j:j+4] 
-            for (i, j) in product(range(game.state.shape[0]-3), range(game.state.shape[1]-3))))
-            if result is not None), None)
+        filled = game.x_bits | game.o_bits
+        rows, cols = game.shape
+        move = (filled + geometry(rows, cols)[0][action]) & ~filled
+        if game.player == 1:
+            key = (game.x_bits | move, game.o_bits, game.shape)
+            zobrist = game.zobrist ^ zobrist_table(cols * (rows + 1))[0][move.bit_length() - 1]
+        else:
+            key = (game.x_bits, game.o_bits | move, game.shape)
+            zobrist = game.zobrist ^ zobrist_table(cols * (rows + 1))[1][move.bit_length() - 1]
+        child = game.cache.get(zobrist, key)
+        if child is None:
+            child = game.cache.put(zobrist, game._child(key, zobrist, move, action))
+        return child
+
+    def _child(game, key: tuple, zobrist: int, move: int, action: int) -> 'Connect4State':
+        """Build the state after `move` from this one. Only lines through the new
+        disc can have been completed, and only the column just played can fill up."""
+        child = Connect4State.__new__(Connect4State)
+        child.x_bits, child.o_bits, child.shape = key
+        child.key = key
+        child.zobrist = zobrist
+        child._state = None
+        child.cache = game.cache
+        child.balance = game.balance + game.player
+        child.player = 1 if child.balance <= 0 else -1
+        _, tops, _, shifts = geometry(*game.shape)
+        mover_bits = child.x_bits if game.player == 1 else child.o_bits
+        legal = game.all_legal_actions  # shared with the parent, never mutated
+        if move & tops[action]:
+            legal = [a for a in legal if a != action]
+        if four_through(mover_bits, move, shifts):
+            child.result = X_WINS if game.player == 1 else O_WINS
+        else:
+            child.result = None if legal else TIE
+        child.is_terminal = child.result is not None
+        child.all_legal_actions = legal if not child.is_terminal else []
+        return child
+
+    batch_rollout = staticmethod(batch_rollout)
+
+    def scratch(game) -> 'Connect4Scratch':
+        """A mutable copy of this position for throwaway playouts."""
+        return Connect4Scratch(game)
+
+    def game_result(game) -> dict | None:
+        _, _, board, shifts = geometry(*game.shape)
+        if has_four(game.x_bits, shifts): return X_WINS
+        if has_four(game.o_bits, shifts): return O_WINS
+        if game.x_bits | game.o_bits == board: return TIE
+        return None                                   # No result
 
     def __str__(game):
         return str(game.state)
-    
+
     def __hash__(game):
-        return hash(tuple(game.state.flat))
+        return game.zobrist
 
     def __eq__(game, other):
         if isinstance(other, Connect4State):
-            return np.array_equal(game.state, other.state)
+            return game.key == other.key
         return False
 
+    def __reduce__(game):
+        # pickle the position only; the receiving process interns it in its own cache
+        return (Connect4.get_key, (game.key,))
+
+class Connect4Scratch:
+    """Mutable Connect4 simulator for rollouts.
+    Moves are applied to the bitboards in place and never create or intern a Connect4State;
+    `reset` reloads it from another state so one instance can serve every rollout of a search."""
+    __slots__ = ('x_bits', 'o_bits', 'balance', 'player', 'legal_actions',
+                 'bottoms', 'tops', 'shifts', 'bottom', 'board', 'height')
+
+    def __init__(sim, game: Connect4State):
+        sim.legal_actions: list[int] = []
+        sim.reset(game)
+
+    def reset(sim, game: Connect4State):
+        sim.bottoms, sim.tops, sim.board, sim.shifts = geometry(*game.shape)
+        sim.bottom: int = sum(sim.bottoms)
+        sim.height: int = game.shape[0] + 1
+        sim.x_bits: int = game.x_bits
+        sim.o_bits: int = game.o_bits
+        sim.balance: int = game.balance
+        sim.player: int = game.player
+        sim.legal_actions[:] = game.all_legal_actions
+
+    def play(sim, action: int) -> dict | None:
+        """Drop the player's disc in `action`. Returns the result if that ended the game."""
+        filled = sim.x_bits | sim.o_bits
+        move = (filled + sim.bottoms[action]) & ~filled
+        if move & sim.tops[action]:
+            sim.legal_actions.remove(action)
+        mover = sim.player
+        if mover == 1:
+            sim.x_bits |= move
+            bits = sim.x_bits
+        else:
+            sim.o_bits |= move
+            bits = sim.o_bits
+        sim.balance += mover
+        sim.player = 1 if sim.balance <= 0 else -1
+        if four_through(bits, move, sim.shifts):
+            return X_WINS if mover == 1 else O_WINS
+        return None if sim.legal_actions else TIE
+
+    def winning_action(sim, player: int) -> int | None:
+        """A column where `player` would complete four with their next disc, if there is one."""
+        filled = sim.x_bits | sim.o_bits
+        wins = threats(sim.x_bits if player == 1 else sim.o_bits, sim.shifts) & (filled + sim.bottom) & sim.board
+        if not wins:
+            return None
+        return ((wins & -wins).bit_length() - 1) // sim.height
+
+    def heuristic(sim) -> float:
+        """Estimate in [-1, 1] for player 1: the balance of the two players' open threats
+        (empty cells that would complete four)."""
+        empty = sim.board & ~(sim.x_bits | sim.o_bits)
+        x = (threats(sim.x_bits, sim.shifts) & empty).bit_count()
+        o = (threats(sim.o_bits, sim.shifts) & empty).bit_count()
+        return (x - o) / (x + o + 1)
+
 class Connect4:
     """Class to manage Connect4 states and cache."""
-    game_states: dict[np.ndarray, Connect4State]= {}
+    cache: StateCache = StateCache()
+
+    @classmethod
+    def get_state(cls, state: np.ndarray, cache: StateCache | None = None) -> Connect4State:
+        cache = cls.cache if cache is None else cache
+        game = Connect4State(state)
+        interned = cache.get(game.zobrist, game.key)
+        if interned is None:
+            game.cache = cache
+            interned = cache.put(game.zobrist, game)
+        return interned
 
     @classmethod
-    def get_state(cls, state: np.ndarray) -> Connect4State:
-        state_tuple = tuple(state.flat)
-        if state_tuple not in cls.game_states:
-            cls.game_states[state_tuple] = Connect4State(state)
-        return cls.game_states[state_tuple]
+    def get_key(cls, key: tuple, cache: StateCache | None = None) -> Connect4State:
+        """Interned state for a (x_bits, o_bits, shape) key."""
+        cache = cls.cache if cache is None else cache
+        x_bits, o_bits, (rows, cols) = key
+        zobrist = zobrist_hash(x_bits, o_bits, zobrist_table(cols * (rows + 1)))
+        game = cache.get(zobrist, key)
+        if game is None:
+            game = Connect4State.from_bits(*key)
+            game.cache = cache
+            cache.put(zobrist, game)
+        return game
 
     @classmethod
     def reset_cache(cls):
-        cls.game_states = {}
\ No newline at end of file
+        cls.cache.clear()
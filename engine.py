@@ -0,0 +1,68 @@
+"""What every search engine (MCTS, MCGS and their compact and parallel variants) does the same
+way on top of its own nodes. An engine provides get_node(), node_key() and `nodes`; lookup() and
+reroot() are the hooks an engine with another node layout (see nodestore.py) overrides."""
+from typing import Any
+
+GameState = Any
+
+class Engine:
+    def lookup(tree, game_state: GameState):
+        """The node of game_state, or None if it is not in the tree/graph."""
+        return tree.nodes.get(tree.node_key(game_state))
+
+    def children_by_action(tree, node) -> dict[Any, Any]:
+        """Map each legal action at node to the child it leads to, for children already in the tree."""
+        game = node.game_state
+        children = set(node.children)
+        by_action = {}
+        for action in game.all_legal_actions:
+            child = tree.lookup(game.transition(action))
+            if child is not None and child in children:
+                by_action[action] = child
+        return by_action
+
+    def advance(tree, action_or_state):
+        """Make the child reached by `action_or_state` (a legal action at the root, or the game
+        state it leads to) the new root. Its subtree/subgraph and statistics are kept; every node
+        no longer reachable from it is dropped, and its game state un-interned from the cache."""
+        game = tree.root.game_state
+        if not isinstance(action_or_state, type(game)):
+            action_or_state = game.transition(action_or_state)
+        for game_state in tree.reroot(action_or_state):
+            cache = getattr(game_state, 'cache', None)
+            if cache is not None:
+                cache.discard(game_state)
+        return tree.root
+
+    def reroot(tree, game_state: GameState) -> list[GameState]:
+        """Make game_state's node the root and keep only the nodes reachable from it.
+        Returns the game states of the dropped nodes."""
+        tree.root = tree.get_node(game_state)
+        # the root must be the real position, not a mirror image of it, for its actions to be the real ones
+        tree.root.game_state = game_state
+        reachable = {tree.node_key(game_state): tree.root}
+        stack = [tree.root]
+        while stack:
+            for child in stack.pop().children:
+                key = tree.node_key(child.game_state)
+                if key not in reachable:
+                    reachable[key] = child
+                    stack.append(child)
+        dropped = [tree.nodes[key].game_state for key in tree.nodes.keys() - reachable.keys()]
+        tree.nodes = reachable
+        return dropped
+
+    def prove(tree, node) -> bool:
+        """MCTS-Solver: a node is a proven loss (for the player who moved into it) if one of its
+        children is a proven win for the player to move, and otherwise proven once all of its
+        children are, with the value of the best of them."""
+        if node.proven is None and node.is_expanded:
+            values = [child.proven for child in node.children]
+            if 1 in values:
+                node.proven = -1
+            elif None not in values and not node.untried:
+                node.proven = -max(values)
+        return node.proven is not None
+
+    def solved(tree) -> bool:
+        return tree.solver and tree.root.proven is not None
@@ -0,0 +1,85 @@
+"""Batched leaf evaluators.
+An evaluator replaces random rollouts with a value/policy estimate. MCTS and MCGS (with
+evaluator=...) call it on a batch of leaf states at once:
+
+    values, priors = evaluator(states)
+
+`values[i]` is the value of states[i] in [-1, 1] for the player to move there, and `priors[i]`
+a probability vector over the game's `num_actions` actions (indexed by state.action_index),
+zero on illegal actions. The search collects the batch under virtual loss, evaluates it in one
+call, then sets the priors of the new parent -> child edges and backpropagates the values."""
+from typing import Any
+import math
+import numpy as np
+
+GameState = Any
+
+def legal_mask(states: list[GameState]) -> np.ndarray:
+    """(K, num_actions) boolean mask of the legal actions of every state."""
+    mask = np.zeros((len(states), states[0].num_actions), dtype=bool)
+    for row, game in zip(mask, states):
+        row[[game.action_index(action) for action in game.all_legal_actions]] = True
+    return mask
+
+class MLPEvaluator:
+    """Reference value/policy network on the CPU: board (from the mover's point of view) ->
+    tanh hidden layer -> tanh value head and softmax policy head, masked to the legal actions.
+    Weights are random (seeded) unless given as a dict of arrays W1, b1, Wv, bv, Wp, bp."""
+    def __init__(evaluator, inputs: int, num_actions: int, hidden: int = 64,
+                 seed: int | None = None, weights: dict | None = None):
+        if weights is None:
+            rng = np.random.default_rng(seed)
+            weights = {'W1': rng.normal(0., 1 / math.sqrt(inputs), (inputs, hidden)), 'b1': np.zeros(hidden),
+                       'Wv': rng.normal(0., 1 / math.sqrt(hidden), hidden), 'bv': np.zeros(()),
+                       'Wp': rng.normal(0., 1 / math.sqrt(hidden), (hidden, num_actions)), 'bp': np.zeros(num_actions)}
+        evaluator.weights: dict = weights
+
+    @classmethod
+    def for_state(cls, game: GameState, **kwargs) -> 'MLPEvaluator':
+        """A network sized for game's board and actions."""
+        return cls(game.state.size, game.num_actions, **kwargs)
+
+    def __call__(evaluator, states: list[GameState]) -> tuple[np.ndarray, np.ndarray]:
+        w = evaluator.weights
+        x = np.stack([game.state.ravel() * game.player for game in states])
+        h = np.tanh(x @ w['W1'] + w['b1'])
+        values = np.tanh(h @ w['Wv'] + w['bv'])
+        logits = np.where(legal_mask(states), h @ w['Wp'] + w['bp'], -np.inf)
+        priors = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return values, priors / priors.sum(axis=1, keepdims=True)
+
+class RolloutEvaluator:
+    """Heuristic evaluator: the mean result of `playouts` random games from each state (played
+    together with the game's batch_rollout), with uniform priors over the legal actions."""
+    def __init__(evaluator, playouts: int = 16, rng: np.random.Generator | None = None):
+        evaluator.playouts: int = playouts
+        evaluator.rng = np.random.default_rng() if rng is None else rng
+
+    def __call__(evaluator, states: list[GameState]) -> tuple[np.ndarray, np.ndarray]:
+        boards = np.repeat(np.stack([game.state for game in states]), evaluator.playouts, axis=0)
+        results = states[0].batch_rollout(boards, evaluator.rng).reshape(len(states), evaluator.playouts)
+        values = results.mean(axis=1) * np.array([game.player for game in states])
+        mask = legal_mask(states)
+        return values, mask / mask.sum(axis=1, keepdims=True)
+
+class TableEvaluator:
+    """Exact evaluator backed by a solver.ValueTable: each state's perfect-play value, with the
+    priors spread evenly over its perfect-play actions. States missing from the table are sent
+    to `fallback` (another evaluator), or raise KeyError without one."""
+    def __init__(evaluator, table, fallback=None):
+        evaluator.table = table
+        evaluator.fallback = fallback
+
+    def __call__(evaluator, states: list[GameState]) -> tuple[np.ndarray, np.ndarray]:
+        values = np.zeros(len(states))
+        priors = np.zeros((len(states), states[0].num_actions))
+        missing = [i for i, game in enumerate(states) if game not in evaluator.table]
+        if missing:
+            if evaluator.fallback is None:
+                raise KeyError(f"{len(missing)} positions not in the value table")
+            values[missing], priors[missing] = evaluator.fallback([states[i] for i in missing])
+        for i, game in enumerate(states):
+            if i not in missing:
+                values[i] = evaluator.table.value(game)
+                priors[i, [game.action_index(action) for action in evaluator.table.best_actions(game)]] = 1.
+        return values, priors / priors.sum(axis=1, keepdims=True)
@@ -0,0 +1,29 @@
+"""Expansion policies: how many children a node gets, and when.
+Eager (the default) creates every child of a leaf at once and rolls each unvisited one out
+before selection picks one, so a Connect4 expansion costs 7 rollouts. Lazy creates one
+child per visit of the node, in random order, and rolls out only that child; ProgressiveWidening
+also caps a node with N visits at ceil(c * N ** alpha) children, so wide nodes keep
+revisiting their best children instead of trying every action once. The lazy policies are
+used through MCTS/MCGS(expansion=...)."""
+import math
+
+class Eager:
+    """Create and roll out every child of a leaf when it is expanded."""
+    lazy: bool = False
+
+class Lazy:
+    """Create one new child each time a node is visited, until every action has been tried."""
+    lazy: bool = True
+
+    def width(policy, N: int) -> float:
+        """Most children a node with N visits may have."""
+        return math.inf
+
+class ProgressiveWidening(Lazy):
+    """Lazy expansion capped at ceil(c * N ** alpha) children for a node with N visits."""
+    def __init__(policy, c: float = 1., alpha: float = .5):
+        policy.c: float = c
+        policy.alpha: float = alpha
+
+    def width(policy, N: int) -> float:
+        return math.ceil(policy.c * max(N, 1) ** policy.alpha)
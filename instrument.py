@@ -0,0 +1,178 @@
+"""Per-phase instrumentation of a search.
+instrument(tree) wraps the phase methods of one MCTS/MCGS instance (select, expand, rollout,
+backprop, the evaluator, ...) with timing and counting shims, set as instance attributes; the
+engine classes are never touched, so a search that is not instrumented pays nothing, and
+detach() removes the shims again.
+
+    inst = instrument(mcgs, every=1000, callback=export)  # export(stats) every 1000 playouts
+    mcgs.search(10_000)
+    inst.stats()  # or pull a snapshot whenever you like
+
+Phase times are exclusive: the rollouts and backprops that eager expansion runs for every
+new child count as 'rollout' and 'backprop', not as 'expand'. Not thread safe, so do not
+instrument a TreeParallelMCTS."""
+from collections import Counter
+from typing import Any, Callable
+import time
+
+PHASES = {'select': 'select',
+          'expand': 'expand', 'expand_lazy': 'expand', 'expand_priors': 'expand',
+          'rollout': 'rollout', 'batch_rollout': 'rollout',
+          'backprop': 'backprop', 'backprop_batch': 'backprop', 'backprop_value': 'backprop'}
+
+class CountingRandom:
+    """Stands in for the search's rng and counts choice() calls: one per ply of a slow rollout."""
+    def __init__(proxy, rng):
+        proxy.rng = rng
+        proxy.choices: int = 0
+
+    def choice(proxy, sequence):
+        proxy.choices += 1
+        return proxy.rng.choice(sequence)
+
+    def __getattr__(proxy, name: str):
+        return getattr(proxy.rng, name)
+
+class Instrumentation:
+    def __init__(inst, tree, every: int = 0, callback: Callable[[dict], Any] | None = None):
+        inst.tree = tree
+        inst.every: int = every        # call callback(stats()) every this many playouts (0: never)
+        inst.callback = callback
+        inst.reset()
+        inst.attach()
+
+    def reset(inst):
+        inst.playouts: int = 0
+        inst.time: dict[str, float] = dict.fromkeys(['run', 'select', 'expand', 'rollout', 'backprop', 'evaluate'], 0.)
+        inst.path_length: Counter = Counter()     # nodes on the selected path -> playouts
+        inst.rollout_length: Counter = Counter()  # plies -> rollouts (scalar rollouts only)
+        inst.fan_out: Counter = Counter()         # children after an expansion -> expansions
+        inst.expansions: int = 0
+        inst._nodes_start: int = len(inst.tree.nodes)  # nodes created = growth of tree.nodes since then
+        inst.parent_updates: int = 0              # MCGS: parent running sums touched by update()
+        inst._nested: list[float] = []            # time spent in nested phases, per open phase
+        cache = getattr(inst.tree.root.game_state, 'cache', None)
+        inst._cache_start = (cache.hits, cache.misses) if cache is not None else (0, 0)
+
+    def attach(inst):
+        tree = inst.tree
+        for name, phase in PHASES.items():
+            if hasattr(tree, name):
+                setattr(tree, name, inst._timed(phase, getattr(tree, name)))
+        tree.select = inst._counted_select(tree.select)
+        tree.expand = inst._counted_expand(tree.expand)
+        tree.rollout = inst._counted_rollout(tree.rollout)
+        if hasattr(tree, 'expand_priors'):
+            tree.expand_priors = inst._counted_expand_priors(tree.expand_priors)
+        if hasattr(tree, 'update'):
+            tree.update = inst._counted_update(tree.update)
+        if getattr(tree, 'evaluator', None) is not None:
+            tree.evaluator = inst._timed('evaluate', tree.evaluator)
+        tree.run = inst._counted_run(inst._timed('run', tree.run))
+        inst.rng = CountingRandom(tree.rng) if hasattr(tree, 'rng') else None
+        if inst.rng is not None:
+            tree.rng = inst.rng
+
+    def detach(inst):
+        """Remove every shim; the tree runs at full speed again."""
+        tree = inst.tree
+        for name in list(PHASES) + ['update', 'run']:
+            tree.__dict__.pop(name, None)
+        if getattr(tree, 'evaluator', None) is not None and hasattr(tree.evaluator, '__wrapped__'):
+            tree.evaluator = tree.evaluator.__wrapped__
+        if inst.rng is not None:
+            tree.rng = inst.rng.rng
+
+    def _timed(inst, phase: str, method: Callable) -> Callable:
+        nested = inst._nested
+        def timed(*args, **kwargs):
+            nested.append(0.)
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                inst.time[phase] += elapsed - nested.pop()
+                if nested:
+                    nested[-1] += elapsed
+        timed.__wrapped__ = method
+        return timed
+
+    def _counted_run(inst, run: Callable) -> Callable:
+        def counted(*args, **kwargs):
+            result = run(*args, **kwargs)
+            inst.playouts += 1
+            if inst.every and inst.callback is not None and inst.playouts % inst.every == 0:
+                inst.callback(inst.stats())
+            return result
+        return counted
+
+    def _counted_select(inst, select: Callable) -> Callable:
+        def counted(*args, **kwargs):
+            path = select(*args, **kwargs)
+            inst.path_length[len(path)] += 1
+            return path
+        return counted
+
+    def _counted_expand(inst, expand: Callable) -> Callable:
+        view = getattr(inst.tree, 'view', lambda node: node)  # compact engines pass node ids
+        def counted(path, *args, **kwargs):
+            node = view(path[-1])
+            children = len(node.children)
+            result = expand(path, *args, **kwargs)
+            if len(node.children) > children:
+                inst.expansions += 1
+                inst.fan_out[len(node.children)] += 1
+            return result
+        return counted
+
+    def _counted_expand_priors(inst, expand_priors: Callable) -> Callable:
+        def counted(node, *args, **kwargs):
+            expand_priors(node, *args, **kwargs)
+            inst.expansions += 1
+            inst.fan_out[len(node.children)] += 1
+        return counted
+
+    def _counted_rollout(inst, rollout: Callable) -> Callable:
+        policy = getattr(inst.tree, 'rollout_policy', None)
+        def counted(*args, **kwargs):
+            plies = policy.plies if policy is not None else 0
+            choices = inst.rng.choices if inst.rng is not None else 0
+            result = rollout(*args, **kwargs)
+            if policy is not None and inst.tree.fast_rollout:
+                inst.rollout_length[policy.plies - plies] += 1
+            elif inst.rng is not None:  # the slow path makes one choice per ply
+                inst.rollout_length[inst.rng.choices - choices] += 1
+            return result
+        return counted
+
+    def _counted_update(inst, update: Callable) -> Callable:
+        def counted(node, *args, **kwargs):
+            inst.parent_updates += len(node.parents)
+            return update(node, *args, **kwargs)
+        return counted
+
+    def stats(inst) -> dict:
+        """Snapshot of everything measured since the tree was instrumented (or reset())."""
+        cache = getattr(inst.tree.root.game_state, 'cache', None)
+        hits, misses = (cache.hits - inst._cache_start[0], cache.misses - inst._cache_start[1]) if cache is not None else (0, 0)
+        phases = {phase: seconds for phase, seconds in inst.time.items() if phase != 'run'}
+        return {'playouts': inst.playouts, 'time': {**phases, 'other': inst.time['run'] - sum(phases.values()),
+                                                    'total': inst.time['run']},
+                'path_length': dict(sorted(inst.path_length.items())),
+                'rollout_length': dict(sorted(inst.rollout_length.items())),
+                'expansions': inst.expansions, 'fan_out': dict(sorted(inst.fan_out.items())),
+                'nodes': len(inst.tree.nodes), 'nodes_created': len(inst.tree.nodes) - inst._nodes_start,
+                'parent_updates': inst.parent_updates,
+                'cache_hits': hits, 'cache_misses': misses,
+                'cache_hit_rate': hits / (hits + misses) if hits + misses else None}
+
+    def __enter__(inst):
+        return inst
+
+    def __exit__(inst, *exc_info):
+        inst.detach()
+
+def instrument(tree, every: int = 0, callback: Callable[[dict], Any] | None = None) -> Instrumentation:
+    """Start instrumenting tree; see Instrumentation.stats() and detach()."""
+    return Instrumentation(tree, every, callback)
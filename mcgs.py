@@ -1,6 +1,14 @@
 from typing import Any
+from itertools import repeat
+import math
 import random
+import time
 import numpy as np
+from selection import PUCT
+from expansion import Eager
+from rollout import RandomRollout
+from budget import SearchResult, budgeted_search
+from engine import Engine
 
 GameState = Any
 
@@ -12,85 +20,322 @@ class MCGSNode:
         node.N: int = 0  # Visit count
         node.Q: float = 0.0  # Regularized value
         node.child_to_edge_visits: dict[MCGSNode, int] = {}  # child node -> edge visits
+        node.priors: dict[MCGSNode, float] = {}  # child node -> evaluator prior of the edge (1 if empty)
+        node.parents: dict[MCGSNode, None] = {}  # every node that has an edge into this one
+        node.edge_visits: int = 0  # running sum of child_to_edge_visits.values()
+        node.child_value: float = 0.0  # running sum of child.Q * edge_visits over all children
         node.results = {1: 0, -1: 0, 0: 0}
+        # statistics seeded from an opening book (see book.py), counted as earlier visits
+        node.book_N: int = 0
+        node.book_value: float = 0.0  # book Q * book_N
+        node.book_results: dict | None = None
+        # game value proven by the solver, for the player who moved into this node
+        node.proven: int | None = -game_state.result[game_state.player] if game_state.is_terminal else None
+        node.untried: list | None = None # actions without an edge yet, under lazy expansion
 
     @property
     def children(node):
         return node.child_to_edge_visits.keys()
 
-class MCGS:
-    def __init__(tree, game_state: GameState):
-        tree.root: MCGSNode = MCGSNode(game_state)
-        tree.nodes: dict[Any, MCGSNode] = {game_state: tree.root}
+class MCGS(Engine):
+    node_bytes: int = 1000  # measured ~960 bytes per node for Connect4, state included
+    def __init__(tree, game_state: GameState, fast_rollout: bool = True, batch_size: int = 1,
+                 scorer=None, solver: bool = False, symmetry: bool = False, book=None,
+                 evaluator=None, leaf_batch: int = 8, leaf_timeout: float | None = None, expansion=None,
+                 rng=None, rollout_policy=None):
+        tree.book = book # warm start: positions found in this Book start with its statistics
+        tree.root: MCGSNode = tree.new_node(game_state)
+        # with symmetry=True positions are keyed by game_state.canonical(), so mirror images share a node
+        tree.symmetry: bool = symmetry
+        tree.nodes: dict[Any, MCGSNode] = {tree.node_key(game_state): tree.root}
+        tree.fast_rollout: bool = fast_rollout and hasattr(game_state, 'scratch')
+        tree.scratch = None # mutable simulator reused by every fast rollout
+        if batch_size > 1 and not hasattr(game_state, 'batch_rollout'):
+            raise ValueError(f"{type(game_state).__name__} has no batch_rollout")
+        tree.batch_size: int = batch_size # playouts per leaf, averaged into one utility estimate
+        tree.rng = random if rng is None else rng # a random.Random for reproducible searches; by default the global one
+        # NumPy generator of the batched rollouts, seeded from rng so that a seeded search is reproducible
+        tree.batch_rng = np.random.default_rng(None if rng is None else rng.getrandbits(64))
+        tree.rollout_policy = RandomRollout() if rollout_policy is None else rollout_policy # see rollout.py
+        tree.scorer = PUCT(c=1.) if scorer is None else scorer # see selection.py
+        tree.solver: bool = solver # propagate proven wins/losses/draws and stop searching them
+        tree.evaluator = evaluator # batched value/policy function replacing rollouts, see evaluate.py
+        tree.leaf_batch: int = leaf_batch # leaves per evaluator call
+        tree.leaf_timeout: float | None = leaf_timeout # seconds to spend collecting one batch
+        tree.expansion = Eager() if expansion is None else expansion # see expansion.py
+        if tree.expansion.lazy and evaluator is not None:
+            raise ValueError("evaluator searches expand every child with its prior; use the eager expansion")
+
+    def node_key(tree, game_state: GameState):
+        return game_state.canonical() if tree.symmetry else game_state
 
     def get_node(tree, game_state: GameState) -> MCGSNode:
-        """Retrieve or create a new MCGSNode for the given game state."""
-        if game_state not in tree.nodes:
-            tree.nodes[game_state] = MCGSNode(game_state=game_state)
-        return tree.nodes[game_state]
+        """Retrieve or create a new MCGSNode for the given game state.
+        Under symmetry the node keeps the first of the equivalent states it was reached by."""
+        key = tree.node_key(game_state)
+        if key not in tree.nodes:
+            tree.nodes[key] = tree.new_node(game_state)
+        return tree.nodes[key]
+
+    def new_node(tree, game_state: GameState) -> MCGSNode:
+        """A fresh node, seeded from the book if it has the position. A seeded node has N > 0, so
+        expansion does not roll it out."""
+        node = MCGSNode(game_state=game_state)
+        entry = tree.book.lookup(game_state) if tree.book is not None else None
+        if entry is not None:
+            node.N = node.book_N = entry.N
+            node.Q = entry.Q
+            node.book_value = entry.Q * entry.N
+            node.results = dict(entry.results)
+            node.book_results = entry.results
+        return node
+
+    def add_edge(tree, parent: MCGSNode, child: MCGSNode, visits: int = 1):
+        """Create the parent -> child edge with `visits` visits."""
+        parent.child_to_edge_visits[child] = visits
+        parent.edge_visits += visits
+        parent.child_value += child.Q * visits
+        child.parents[parent] = None
+
+    def visit_edge(tree, parent: MCGSNode, child: MCGSNode):
+        parent.child_to_edge_visits[child] += 1
+        parent.edge_visits += 1
+        parent.child_value += child.Q
+
+    def unvisit_edge(tree, parent: MCGSNode, child: MCGSNode):
+        """Take back a visit_edge() whose playout is dropped before anything was updated."""
+        parent.child_to_edge_visits[child] -= 1
+        parent.edge_visits -= 1
+        parent.child_value -= child.Q
+
+    def update(tree, node: MCGSNode, reward: float):
+        """Recompute N and the regularized Q of node from its running sums, 
+        and push the change in Q into the running sums of all of its parents."""
+        node.N = 1 + node.edge_visits + node.book_N
+        Q = -(1/node.N)*(reward + node.child_value - node.book_value)
+        delta = Q - node.Q
+        node.Q = Q
+        if delta:
+            for parent in node.parents:
+                parent.child_value += delta * parent.child_to_edge_visits[node]
+
+    def reroot(tree, game_state: GameState) -> list[GameState]:
+        """Engine.reroot, also forgetting the dropped parents of every node kept."""
+        dropped = super().reroot(game_state)
+        for node in tree.nodes.values():
+            for parent in [parent for parent in node.parents if tree.node_key(parent.game_state) not in tree.nodes]:
+                del node.parents[parent]
+        return dropped
+
+    def visits(tree, parent: MCGSNode, child: MCGSNode) -> int:
+        """How often selection went from parent to child."""
+        return parent.child_to_edge_visits[child]
 
     def best_child(tree, node: MCGSNode) -> MCGSNode:
-            return max([child for child in node.children], key=lambda x: tree.PUCT(node,x))
+        edges = node.child_to_edge_visits
+        if tree.solver:
+            edges = {child: visits for child, visits in edges.items() if child.proven is None} or edges
+        priors = node.priors
+        P = [priors[child] for child in edges] if priors else repeat(1.)
+        return tree.scorer.best(node.N, edges, [child.Q for child in edges], edges.values(), P)
 
     def select(tree) -> list[MCGSNode]:
         """MCGS Selection.
         The tree selects the most promising node until it reaches an unexpanded node"""
         path = [tree.root]
-        while path[-1].is_expanded and not path[-1].is_terminal:
+        while path[-1].is_expanded and not path[-1].is_terminal and not (path[-1].untried and tree.widen(path[-1])):
             next_node = tree.best_child(path[-1])
-            path[-1].child_to_edge_visits[next_node] += 1
+            tree.visit_edge(path[-1], next_node)
             path.append(next_node)
         return path
 
+    def widen(tree, node) -> bool:
+        """True when selection should stop at the expanded node and give it a new child."""
+        return bool(node.untried) and len(node.children) < tree.expansion.width(node.N)
+
     def expand(tree, path: list[MCGSNode]) -> list[MCGSNode]:
         """MCGS Expansion.
         The unexpanded node is expanded and the most promising child is returned to be rolled out."""
         expanding_node = path[-1]
         if expanding_node.is_terminal:
             return path
+        elif tree.expansion.lazy:
+            return tree.expand_lazy(path)
         else:
             game = expanding_node.game_state
-            for action in game.all_legal_actions:
-                child_node = tree.get_node(game.transition(action))
-                expanding_node.child_to_edge_visits[child_node] = 1
+            children = [tree.get_node(game.transition(action)) for action in game.all_legal_actions]
+            children = list(dict.fromkeys(children)) # symmetric actions lead to the same node
+            if tree.batch_size > 1:
+                unvisited = [child_node for child_node in children if child_node.N == 0]
+                batches = dict(zip(unvisited, tree.batch_rollout(unvisited)))
+            for child_node in children:
+                tree.add_edge(expanding_node, child_node)
                 if child_node.N == 0:
-                    reward = tree.rollout(child_node)
-                    tree.backprop(path + [child_node], reward)
+                    if tree.batch_size > 1:
+                        tree.backprop_batch(path + [child_node], batches[child_node])
+                    else:
+                        reward = tree.rollout(child_node)
+                        tree.backprop(path + [child_node], reward)
             expanding_node.is_expanded = True
             return path + [tree.best_child(expanding_node)]
 
+    def expand_lazy(tree, path: list[MCGSNode]) -> list[MCGSNode]:
+        """Lazy expansion: add one new edge out of path[-1] and return the path along it (for its
+        child alone to be rolled out). Actions are tried in random order."""
+        node = path[-1]
+        if not node.is_expanded:
+            node.untried = list(node.game_state.all_legal_actions)
+            tree.rng.shuffle(node.untried)
+            node.is_expanded = True
+        while node.untried:
+            child = tree.get_node(node.game_state.transition(node.untried.pop()))
+            if child not in node.child_to_edge_visits: # symmetric actions lead to the same node
+                tree.add_edge(node, child)
+                return path + [child]
+        child = tree.best_child(node)
+        tree.visit_edge(node, child)
+        return path + [child]
+
+    def expand_priors(tree, node: MCGSNode, priors: np.ndarray):
+        """Expansion for evaluator searches: add an unvisited edge to each child, weighted by the
+        evaluator's prior, without rolling the children out."""
+        game = node.game_state
+        for action in game.all_legal_actions:
+            child = tree.get_node(game.transition(action))
+            node.priors[child] = node.priors.get(child, 0.) + float(priors[game.action_index(action)])
+        for child in node.priors:
+            tree.add_edge(node, child, visits=0)
+        node.is_expanded = True
+
     def rollout(tree, node: MCGSNode) -> dict:
         """Estimate the utility of a non-terminal game state.
         Detach game from given MCGSNode, Simluate until end state and return reward"""
         game = node.game_state
+        if game.is_terminal:
+            return game.result
+        if tree.fast_rollout:
+            return tree.scratch_rollout(game)
         while not game.is_terminal:
-            action = random.choice(game.all_legal_actions)
+            action = tree.rng.choice(game.all_legal_actions)
             game = game.transition(action)
         reward = game.result
         return reward
 
+    def scratch_rollout(tree, game: GameState) -> dict:
+        """Play the rollout on the game's mutable scratch simulator. 
+        No intermediate game states are built or interned."""
+        if tree.scratch is None:
+            tree.scratch = game.scratch()
+        else:
+            tree.scratch.reset(game)
+        return tree.rollout_policy(tree.scratch, tree.rng)
+
+    def batch_rollout(tree, nodes: list[MCGSNode]) -> list[dict]:
+        """Simulate batch_size playouts from every node in one vectorized call. For each node returns
+        how many playouts ended in each reward, from the perspective of the node's player."""
+        if not nodes:
+            return []
+        boards = np.stack([node.game_state.state for node in nodes])
+        results = nodes[0].game_state.batch_rollout(np.repeat(boards, tree.batch_size, axis=0), tree.batch_rng)
+        counts = []
+        for node, values in zip(nodes, results.reshape(len(nodes), tree.batch_size)):
+            values = values * node.game_state.player
+            counts.append({reward: int(np.count_nonzero(values == reward)) for reward in (1, -1, 0)})
+        return counts
+
     def backprop(tree, path: list[MCGSNode], reward: int):
         """Update all nodes on the search path with the reward signal recieved from rollout"""
         reward = reward[path[-1].game_state.player]
         for node in reversed(path):
-            node.N = 1 + sum(node.child_to_edge_visits.values())
-            node.Q = -(1/node.N)*(reward + sum(child.Q * edge_visits for (child, edge_visits) in node.child_to_edge_visits.items()))
+            tree.update(node, reward)
             node.results[reward] += 1
             reward = -reward
+        if tree.solver:
+            for node in reversed(path):
+                tree.prove(node)
+
+    def backprop_batch(tree, path: list[MCGSNode], counts: dict):
+        """Update the search path with a batch of playouts from path[-1]. Their mean reward is 
+        used as the leaf's utility and every playout is counted in results."""
+        reward = sum(r * count for r, count in counts.items()) / sum(counts.values())
+        for node in reversed(path):
+            tree.update(node, reward)
+            for r, count in counts.items():
+                node.results[r] += count
+            reward = -reward
+            counts = {-r: count for r, count in counts.items()}
+        if tree.solver:
+            for node in reversed(path):
+                tree.prove(node)
         
+    def backprop_value(tree, path: list[MCGSNode], value: float):
+        """Update the search path with an evaluator's value of path[-1], for the player to move there."""
+        for node in reversed(path):
+            tree.update(node, value)
+            value = -value
+        if tree.solver:
+            for node in reversed(path):
+                tree.prove(node)
+
+    def run_evaluator(tree):
+        """Run up to leaf_batch selections (stopping early at the timeout, or when a leaf is picked
+        twice), evaluate their leaves in one evaluator call, then expand and backpropagate every
+        path. Terminal leaves are backpropagated at once with the game result. Selection counts
+        each edge visit as it goes, which steers the next selections of the batch elsewhere
+        before any value comes back (MCGS's virtual loss)."""
+        deadline = None if tree.leaf_timeout is None else time.monotonic() + tree.leaf_timeout
+        paths, leaves = [], {}
+        for _ in range(tree.leaf_batch):
+            path = tree.select()
+            leaf = path[-1]
+            if leaf.is_terminal:
+                tree.backprop(path, leaf.game_state.result)
+            elif leaf in leaves:  # the batch has run out of new leaves; drop this path
+                for parent, child in zip(path, path[1:]):
+                    tree.unvisit_edge(parent, child)
+                break
+            else:
+                paths.append(path)
+                leaves[leaf] = None
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+        if not leaves:
+            return
+        values, priors = tree.evaluator([leaf.game_state for leaf in leaves])
+        for leaf, value, prior in zip(leaves, values, priors):
+            tree.expand_priors(leaf, prior)
+            leaves[leaf] = float(value)
+        for path in paths:
+            tree.backprop_value(path, leaves[path[-1]])
+
     def run(tree):
         """Perform one playout from the given node."""
+        if tree.evaluator is not None:
+            return tree.run_evaluator()
         path = tree.select()
         path = tree.expand(path)
-        reward = tree.rollout(path[-1])
-        tree.backprop(path, reward)
+        if tree.batch_size > 1:
+            tree.backprop_batch(path, tree.batch_rollout(path[-1:])[0])
+        else:
+            reward = tree.rollout(path[-1])
+            tree.backprop(path, reward)
     
     def PUCT(tree, parent, node, c_puct=1.):
         #P_sa = len(parent.child_to_edge_visits)
         N_sa = parent.child_to_edge_visits[node]
-        return node.Q + c_puct * 1 * np.sqrt(parent.N) / (1 + N_sa)
+        return node.Q + c_puct * 1 * math.sqrt(parent.N) / (1 + N_sa)
+
+    def max_visits_per_run(tree) -> int:
+        """Most edge visits a root child can gain in one run()."""
+        return tree.leaf_batch if tree.evaluator is not None else 1
+
+    def memory_estimate(tree) -> int:
+        """Rough bytes held by the graph, nodes and their game states."""
+        return len(tree.nodes) * tree.node_bytes
 
-    def search(tree, n: int):
-        """Perform n playouts from the root node."""
-        for _ in range(n):
-            tree.run()
+    def search(tree, n: int | None = None, deadline: float | None = None, max_nodes: int | None = None,
+               max_bytes: int | None = None, check_every: int = 64, stop_early: bool = True) -> SearchResult:
+        """Perform n playouts from the root node, or fewer when the deadline (a time.monotonic()
+        timestamp), node count or byte budget is reached or the most visited root child can no
+        longer be overtaken; budgets are checked every check_every playouts. See budget.py."""
+        return budgeted_search(tree, n, deadline, max_nodes, max_bytes, check_every, stop_early)
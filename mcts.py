@@ -1,6 +1,14 @@
 from typing import Any
+from itertools import repeat
+import math
 import random
+import time
 import numpy as np
+from selection import PUCT
+from expansion import Eager
+from rollout import RandomRollout
+from budget import SearchResult, budgeted_search
+from engine import Engine
 
 GameState = Any
 
@@ -13,64 +21,171 @@ class MCTSNode:
         node.children: list['MCTSNode'] = []
         node.N: int = 0                  # number of visits
         node.W: int = 0                  # sum of all rewards 
-        node.P: float = 1.               # transition probablity of reaching this state
+        node.priors: dict['MCTSNode', float] = {}  # child node -> evaluator prior of the edge (1 if empty)
         node.results = {1: 0, -1: 0, 0: 0}
+        # game value proven by the solver, for the player who moved into this node
+        node.proven: int | None = -game_state.result[game_state.player] if game_state.is_terminal else None
+        node.untried: list | None = None # actions without a child yet, under lazy expansion
     
     @property
     def Q(self) -> float:
-        return self.W / self.N #average value of node
+        return self.W / self.N if self.N else 0. #average value of node
 
-class MCTS:
-    def __init__(tree, game_state: GameState):
+class MCTS(Engine):
+    node_bytes: int = 1000  # measured ~930 bytes per node for Connect4, state included
+    def __init__(tree, game_state: GameState, fast_rollout: bool = True, batch_size: int = 1,
+                 scorer=None, solver: bool = False, symmetry: bool = False,
+                 evaluator=None, leaf_batch: int = 8, leaf_timeout: float | None = None, expansion=None,
+                 rng=None, rollout_policy=None):
         tree.root: MCTSNode = MCTSNode(game_state)
-        tree.nodes: dict[GameState, MCTSNode] = {game_state: tree.root}
+        # with symmetry=True positions are keyed by game_state.canonical(), so mirror images share a node
+        tree.symmetry: bool = symmetry
+        tree.nodes: dict[GameState, MCTSNode] = {tree.node_key(game_state): tree.root}
+        tree.fast_rollout: bool = fast_rollout and hasattr(game_state, 'scratch')
+        tree.scratch = None # mutable simulator reused by every fast rollout
+        if batch_size > 1 and not hasattr(game_state, 'batch_rollout'):
+            raise ValueError(f"{type(game_state).__name__} has no batch_rollout")
+        tree.batch_size: int = batch_size # playouts per leaf, simulated together in NumPy
+        tree.rng = random if rng is None else rng # a random.Random for reproducible searches; by default the global one
+        # NumPy generator of the batched rollouts, seeded from rng so that a seeded search is reproducible
+        tree.batch_rng = np.random.default_rng(None if rng is None else rng.getrandbits(64))
+        tree.rollout_policy = RandomRollout() if rollout_policy is None else rollout_policy # see rollout.py
+        tree.scorer = PUCT(c=3., root_visits=True) if scorer is None else scorer # see selection.py
+        tree.solver: bool = solver # propagate proven wins/losses/draws and stop searching them
+        tree.evaluator = evaluator # batched value/policy function replacing rollouts, see evaluate.py
+        tree.leaf_batch: int = leaf_batch # leaves per evaluator call
+        tree.leaf_timeout: float | None = leaf_timeout # seconds to spend collecting one batch
+        tree.expansion = Eager() if expansion is None else expansion # see expansion.py
+        if tree.expansion.lazy and evaluator is not None:
+            raise ValueError("evaluator searches expand every child with its prior; use the eager expansion")
     
+    def node_key(tree, game_state: GameState):
+        return game_state.canonical() if tree.symmetry else game_state
+
     def get_node(tree, game_state: GameState) -> MCTSNode:
-        """Retrieve or create a new MCTSNode for the given game state."""
-        if game_state not in tree.nodes:
-            tree.nodes[game_state] = MCTSNode(game_state=game_state)
-        return tree.nodes[game_state]
+        """Retrieve or create a new MCTSNode for the given game state.
+        Under symmetry the node keeps the first of the equivalent states it was reached by."""
+        key = tree.node_key(game_state)
+        if key not in tree.nodes:
+            tree.nodes[key] = MCTSNode(game_state=game_state)
+        return tree.nodes[key]
+
+    def visits(tree, parent: MCTSNode, child: MCTSNode) -> int:
+        """How often selection went from parent to child."""
+        return child.N
 
     def best_child(tree, node: MCTSNode) -> MCTSNode:
-        return max([child for child in node.children], key=tree.PUCT)
+        children = node.children
+        if tree.solver:
+            children = [child for child in children if child.proven is None] or children
+        parent_N = tree.root.N if tree.scorer.root_visits else node.N
+        priors = node.priors
+        P = [priors[child] for child in children] if priors else repeat(1.)
+        return tree.scorer.best(parent_N, children, [child.Q for child in children],
+                                [child.N for child in children], P)
 
     def select(tree) -> list[MCTSNode]:
         """MCTS Selection.
         The tree selects the most promising node until it reaches an unexpanded node"""
         node = tree.root 
         path = [node]
-        while node.is_expanded and not node.is_terminal:
+        while node.is_expanded and not node.is_terminal and not (node.untried and tree.widen(node)):
             node = tree.best_child(node)
             path.append(node)
         return path
 
+    def widen(tree, node) -> bool:
+        """True when selection should stop at the expanded node and give it a new child."""
+        return bool(node.untried) and len(node.children) < tree.expansion.width(node.N)
+
     def expand(tree, path: list[MCTSNode]) -> list[MCTSNode]:
         """MCTS Expansion.
         The unexpanded node is expanded and the most promising child is returned to be rolled out."""
         expanding_node = path[-1]
         if expanding_node.is_terminal:
             return path
+        elif tree.expansion.lazy:
+            return tree.expand_lazy(path)
         else:
             game = expanding_node.game_state
-            for action in game.all_legal_actions:
-                child_node = tree.get_node(game.transition(action))
+            children = [tree.get_node(game.transition(action)) for action in game.all_legal_actions]
+            children = list(dict.fromkeys(children)) # symmetric actions lead to the same node
+            if tree.batch_size > 1:
+                unvisited = [child_node for child_node in children if child_node.N == 0]
+                batches = dict(zip(unvisited, tree.batch_rollout(unvisited)))
+            for child_node in children:
                 if child_node.N == 0:
-                    reward = tree.rollout(child_node)
-                    tree.backprop(path + [child_node], reward)
+                    if tree.batch_size > 1:
+                        tree.backprop_batch(path + [child_node], batches[child_node])
+                    else:
+                        reward = tree.rollout(child_node)
+                        tree.backprop(path + [child_node], reward)
                 expanding_node.children.append(child_node)
             expanding_node.is_expanded = True
             return path + [tree.best_child(expanding_node)]
 
+    def expand_lazy(tree, path: list[MCTSNode]) -> list[MCTSNode]:
+        """Lazy expansion: give path[-1] one new child and return the path to it (for it alone
+        to be rolled out). Actions are tried in random order."""
+        node = path[-1]
+        if not node.is_expanded:
+            node.untried = list(node.game_state.all_legal_actions)
+            tree.rng.shuffle(node.untried)
+            node.is_expanded = True
+        while node.untried:
+            child = tree.get_node(node.game_state.transition(node.untried.pop()))
+            if child not in node.children: # symmetric actions lead to the same node
+                node.children.append(child)
+                return path + [child]
+        return path + [tree.best_child(node)]
+
+    def expand_priors(tree, node: MCTSNode, priors: np.ndarray):
+        """Expansion for evaluator searches: create node's children with the evaluator's priors,
+        without rolling them out."""
+        game = node.game_state
+        for action in game.all_legal_actions:
+            child = tree.get_node(game.transition(action))
+            node.priors[child] = node.priors.get(child, 0.) + float(priors[game.action_index(action)])
+        node.children.extend(node.priors)
+        node.is_expanded = True
+
     def rollout(tree, node: MCTSNode) -> int:
         """MCTS Rollout.
         Detach game from given MCTSNode, Simluate until end state and return reward"""
         game = node.game_state
+        if game.is_terminal:
+            return game.result
+        if tree.fast_rollout:
+            return tree.scratch_rollout(game)
         while not game.is_terminal:
-            action = random.choice(game.all_legal_actions)
+            action = tree.rng.choice(game.all_legal_actions)
             game = game.transition(action)
         reward = game.result
         return reward
 
+    def scratch_rollout(tree, game: GameState) -> dict:
+        """Play the rollout on the game's mutable scratch simulator. 
+        No intermediate game states are built or interned."""
+        if tree.scratch is None:
+            tree.scratch = game.scratch()
+        else:
+            tree.scratch.reset(game)
+        return tree.rollout_policy(tree.scratch, tree.rng)
+
+    def batch_rollout(tree, nodes: list[MCTSNode]) -> list[dict]:
+        """Batched MCTS Rollout.
+        Simulate batch_size playouts from every node in one vectorized call. For each node returns
+        how many playouts ended in each reward, from the perspective of the node's player."""
+        if not nodes:
+            return []
+        boards = np.stack([node.game_state.state for node in nodes])
+        results = nodes[0].game_state.batch_rollout(np.repeat(boards, tree.batch_size, axis=0), tree.batch_rng)
+        counts = []
+        for node, values in zip(nodes, results.reshape(len(nodes), tree.batch_size)):
+            values = values * node.game_state.player
+            counts.append({reward: int(np.count_nonzero(values == reward)) for reward in (1, -1, 0)})
+        return counts
+
     def backprop(tree, path: list[MCTSNode], reward: dict) -> None:
         """MCTS Backropagation. 
         The reward from this terminal state must be propagated up stream to update MCTS behavior"""
@@ -80,30 +195,113 @@ class MCTS:
             node.N += 1
             node.results[value] += 1
             value = -value
+        if tree.solver:
+            for node in reversed(path):
+                tree.prove(node)
+
+    def backprop_batch(tree, path: list[MCTSNode], counts: dict) -> None:
+        """MCTS Backpropagation of a whole batch of playouts from path[-1].
+        `counts` maps each reward (for the player at path[-1]) to how many playouts ended with it."""
+        value = sum(reward * count for reward, count in counts.items())
+        visits = sum(counts.values())
+        for node in reversed(path):
+            node.W -= value
+            node.N += visits
+            for reward, count in counts.items():
+                node.results[reward] += count
+            value = -value
+            counts = {-reward: count for reward, count in counts.items()}
+        if tree.solver:
+            for node in reversed(path):
+                tree.prove(node)
     
+    def backprop_value(tree, path: list[MCTSNode], value: float) -> None:
+        """Backpropagate an evaluator's value of path[-1], for the player to move there."""
+        for node in reversed(path):
+            node.W -= value
+            node.N += 1
+            value = -value
+        if tree.solver:
+            for node in reversed(path):
+                tree.prove(node)
+
     def UCB(tree, node: MCTSNode, c_param=2) -> float:
         """Returns (U)pper (C)onfidence (B)ound score for MCTSNode"""
-        return node.Q + c_param * np.sqrt(np.log(node.parent.N)/node.N)
+        return node.Q + c_param * math.sqrt(math.log(node.parent.N)/node.N)
 
-    def PUCT(tree, node: MCTSNode, c_param=3) -> float:
-        """Returns (P)olynomial (U)pper (C)onfidence score for (T)rees for MCTSNode"""
-        U = c_param * node.P * np.sqrt(tree.root.N) / (1 + node.N)
+    def PUCT(tree, parent: MCTSNode, node: MCTSNode, c_param=3) -> float:
+        """Returns (P)olynomial (U)pper (C)onfidence score for (T)rees for the edge parent -> node"""
+        U = c_param * parent.priors.get(node, 1.) * math.sqrt(tree.root.N) / (1 + node.N)
         return node.Q + U 
 
+    def run_evaluator(tree):
+        """Run up to leaf_batch selections (stopping early at the timeout, or when a leaf is picked
+        twice), evaluate their leaves in one evaluator call, then expand and backpropagate every
+        path. Terminal leaves are backpropagated at once with the game result.
+        While a batch is collected every node on its paths carries a virtual loss of one lost
+        visit, so the following selections spread out over other leaves."""
+        deadline = None if tree.leaf_timeout is None else time.monotonic() + tree.leaf_timeout
+        paths, leaves = [], {}
+        for _ in range(tree.leaf_batch):
+            path = tree.select()
+            leaf = path[-1]
+            if leaf.is_terminal:
+                tree.backprop(path, leaf.game_state.result)
+            elif leaf in leaves:  # the batch has run out of new leaves; drop this path
+                break
+            else:
+                for node in path[1:]:
+                    node.N += 1
+                    node.W -= 1
+                paths.append(path)
+                leaves[leaf] = None
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+        if not leaves:
+            return
+        values, priors = tree.evaluator([leaf.game_state for leaf in leaves])
+        for leaf, value, prior in zip(leaves, values, priors):
+            tree.expand_priors(leaf, prior)
+            leaves[leaf] = float(value)
+        for path in paths:
+            for node in path[1:]:
+                node.N -= 1
+                node.W += 1
+            tree.backprop_value(path, leaves[path[-1]])
+
     def run(tree):
         """Perform one (1) entire sequence of MCTS. 
         In my version (for small branching factors), all child nodes are expanded at the same time.
         This is just better (unless you have 1 million actions, but why are you using MCTS), 
         but prove me wrong."""
+        if tree.evaluator is not None:
+            return tree.run_evaluator()
         path = tree.select() #SELECTION 
         path = tree.expand(path) # EXPANSION
-        reward = tree.rollout(path[-1]) # ROLLOUT
-        tree.backprop(path, reward) # BACKPROP
+        if tree.batch_size > 1:
+            counts = tree.batch_rollout(path[-1:])[0] # ROLLOUT (batch_size playouts at once)
+            tree.backprop_batch(path, counts) # BACKPROP
+        else:
+            reward = tree.rollout(path[-1]) # ROLLOUT
+            tree.backprop(path, reward) # BACKPROP
+
+    def max_visits_per_run(tree) -> int:
+        """Most visits a root child can gain in one run(): its own playout plus one per child
+        of an expansion below it (legal moves only shrink in these games)."""
+        if tree.evaluator is not None:
+            return tree.leaf_batch
+        if tree.expansion.lazy:
+            return tree.batch_size
+        return (1 + len(tree.root.game_state.all_legal_actions)) * tree.batch_size
+
+    def memory_estimate(tree) -> int:
+        """Rough bytes held by the tree, nodes and their game states."""
+        return len(tree.nodes) * tree.node_bytes
 
-    def search(tree, n):
+    def search(tree, n: int | None = None, deadline: float | None = None, max_nodes: int | None = None,
+               max_bytes: int | None = None, check_every: int = 64, stop_early: bool = True) -> SearchResult:
         """Perform n MCTS runs from the root. This is equivalent to MCTS 'thinking' or 'searching'
-        the space for a good action."""
-        for i in range(n):
-            if i % 1000 == 0:
-                print(f"run {i}")
-            tree.run()
\ No newline at end of file
+        the space for a good action. Stops sooner when the deadline (a time.monotonic() timestamp),
+        node count or byte budget is reached, or when the most visited root child can no longer be
+        overtaken; budgets are checked every check_every runs. See budget.py."""
+        return budgeted_search(tree, n, deadline, max_nodes, max_bytes, check_every, stop_early)
\ No newline at end of file
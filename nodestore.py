@@ -0,0 +1,340 @@
+from typing import Any
+import numpy as np
+from mcts import MCTS
+from mcgs import MCGS
+
+GameState = Any
+
+TERMINAL, EXPANDED = 1, 2
+RESULT_COLUMN = {1: 0, -1: 1, 0: 2}  # column of NodeStore.results for each reward
+
+class NodeStore:
+    """Struct-of-arrays storage for search nodes.
+    Node statistics live in preallocated NumPy arrays indexed by node id. The children of a node
+    are stored CSR-style: they occupy edges[child_start[i] : child_start[i] + child_count[i]],
+    with edge_visits holding the visit count of each of those edges. Since a node is expanded
+    all at once, its children are always contiguous. Arrays double in size when full."""
+
+    def __init__(store, capacity: int = 1024):
+        store.size: int = 0
+        store.edge_size: int = 0
+        store.states: list[GameState] = []          # node id -> game state
+        store.ids: dict[GameState, int] = {}        # game state -> node id
+        store.N = np.zeros(capacity, dtype=np.int64)
+        store.W = np.zeros(capacity, dtype=np.float64)  # sum of rewards (MCTS)
+        store.Q = np.zeros(capacity, dtype=np.float64)  # regularized value (MCGS)
+        store.P = np.ones(capacity, dtype=np.float64)
+        store.flags = np.zeros(capacity, dtype=np.uint8)
+        store.results = np.zeros((capacity, 3), dtype=np.int64)
+        store.child_start = np.zeros(capacity, dtype=np.int64)
+        store.child_count = np.zeros(capacity, dtype=np.int64)
+        store.edges = np.zeros(capacity, dtype=np.int64)
+        store.edge_visits = np.zeros(capacity, dtype=np.int64)
+
+    def add(store, game_state: GameState) -> int:
+        """Return the id of game_state, allocating a node for it if needed."""
+        node = store.ids.get(game_state)
+        if node is None:
+            node = store.size
+            if node == len(store.N):
+                store._grow_nodes()
+            store.states.append(game_state)
+            store.ids[game_state] = node
+            store.flags[node] = TERMINAL if game_state.is_terminal else 0
+            store.size += 1
+        return node
+
+    def set_children(store, node: int, children: list[int]):
+        start, end = store.edge_size, store.edge_size + len(children)
+        while end > len(store.edges):
+            store.edges = np.concatenate([store.edges, np.zeros_like(store.edges)])
+            store.edge_visits = np.concatenate([store.edge_visits, np.zeros_like(store.edge_visits)])
+        store.edges[start:end] = children
+        store.child_start[node] = start
+        store.child_count[node] = len(children)
+        store.edge_size = end
+
+    def children(store, node: int) -> np.ndarray:
+        start = store.child_start[node]
+        return store.edges[start:start + store.child_count[node]]
+
+    def _grow_nodes(store):
+        for name in ('N', 'W', 'Q', 'P', 'flags', 'results', 'child_start', 'child_count'):
+            array = getattr(store, name)
+            grown = np.zeros((2 * len(array),) + array.shape[1:], dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(store, name, grown)
+        store.P[store.size:] = 1.
+
+    def nbytes(store) -> int:
+        """Bytes held by the arrays (not counting the game states themselves)."""
+        arrays = (store.N, store.W, store.Q, store.P, store.flags, store.results,
+                  store.child_start, store.child_count, store.edges, store.edge_visits)
+        return sum(array.nbytes for array in arrays)
+
+class NodeView:
+    """Read-only object view of one node in a NodeStore, for inspecting a compact search
+    the same way as an MCTSNode/MCGSNode (`root.children`, `child.Q`, `child.game_state`)."""
+    __slots__ = ('store', 'id')
+
+    def __init__(view, store: NodeStore, id: int):
+        view.store = store
+        view.id = id
+
+    @property
+    def game_state(view) -> GameState:
+        return view.store.states[view.id]
+
+    @property
+    def is_terminal(view) -> bool:
+        return bool(view.store.flags[view.id] & TERMINAL)
+
+    @property
+    def is_expanded(view) -> bool:
+        return bool(view.store.flags[view.id] & EXPANDED)
+
+    @property
+    def N(view) -> int:
+        return int(view.store.N[view.id])
+
+    @property
+    def W(view) -> float:
+        return float(view.store.W[view.id])
+
+    @property
+    def P(view) -> float:
+        return float(view.store.P[view.id])
+
+    @property
+    def results(view) -> dict:
+        return {reward: int(view.store.results[view.id, column]) for reward, column in RESULT_COLUMN.items()}
+
+    @property
+    def children(view) -> list['NodeView']:
+        return [type(view)(view.store, int(child)) for child in view.store.children(view.id)]
+
+    @property
+    def child_to_edge_visits(view) -> dict['NodeView', int]:
+        start = view.store.child_start[view.id]
+        visits = view.store.edge_visits[start:start + view.store.child_count[view.id]]
+        return dict(zip(view.children, visits.tolist()))
+
+    def __eq__(view, other):
+        return isinstance(other, NodeView) and view.store is other.store and view.id == other.id
+
+    def __hash__(view):
+        return hash(view.id)
+
+class MCTSNodeView(NodeView):
+    __slots__ = ()
+
+    @property
+    def Q(view) -> float:
+        return view.W / view.N
+
+class MCGSNodeView(NodeView):
+    __slots__ = ()
+
+    @property
+    def Q(view) -> float:
+        return float(view.store.Q[view.id])
+
+class CompactNodes:
+    """Mixin that puts an MCTS/MCGS search on a NodeStore. Nodes are integer ids into the
+    store; `tree.root` is a live NodeView of node 0. Rollouts are the engine's own."""
+    View = NodeView
+    state_bytes: int = 150  # rough size of one game state
+
+    def __init__(tree, game_state: GameState, capacity: int = 1024, **kwargs):
+        if kwargs.get('symmetry'):
+            raise ValueError("compact searches key nodes by game state and do not merge symmetric positions")
+        if kwargs.get('book') is not None:
+            raise ValueError("compact searches cannot be warm-started from a book")
+        if kwargs.get('evaluator') is not None:
+            raise ValueError("compact searches only support rollouts")
+        if getattr(kwargs.get('expansion'), 'lazy', False):
+            raise ValueError("compact searches only support eager expansion")
+        if kwargs.get('solver'):
+            raise ValueError("compact searches do not store proven values")
+        super().__init__(game_state, **kwargs)
+        tree.store: NodeStore = NodeStore(capacity)
+        tree.store.add(game_state)
+        tree.nodes = tree.store.ids
+        tree.root = tree.view(0)
+
+    def view(tree, node: int) -> NodeView:
+        return tree.View(tree.store, node)
+
+    def get_node(tree, game_state: GameState) -> int:
+        return tree.store.add(game_state)
+
+    def rollout(tree, node: int) -> dict:
+        return super().rollout(tree.view(node))
+
+    def batch_rollout(tree, nodes: list[int]) -> list[dict]:
+        return super().batch_rollout([tree.view(node) for node in nodes])
+
+    def lookup(tree, game_state: GameState) -> NodeView | None:
+        node = tree.nodes.get(game_state)
+        return None if node is None else tree.view(node)
+
+    def memory_estimate(tree) -> int:
+        return tree.store.nbytes() + len(tree.store.states) * tree.state_bytes
+
+    def reroot(tree, game_state: GameState) -> list[GameState]:
+        """A NodeStore cannot drop nodes, so the nodes reachable from the new root are copied,
+        statistics and edges included, into a fresh store with the new root as node 0."""
+        old = tree.store
+        order = [old.add(game_state)]  # old ids, breadth first from the new root
+        new_ids = {order[0]: 0}
+        for node in order:
+            for child in old.children(node).tolist():
+                if child not in new_ids:
+                    new_ids[child] = len(order)
+                    order.append(child)
+        store = NodeStore(len(old.N))
+        for node in order:
+            store.add(old.states[node])
+        kept = np.array(order)
+        for name in ('N', 'W', 'Q', 'P', 'flags', 'results'):
+            getattr(store, name)[:len(kept)] = getattr(old, name)[kept]
+        for node in order:
+            start, count = old.child_start[node], old.child_count[node]
+            if count:
+                store.set_children(new_ids[node], [new_ids[child] for child in old.children(node).tolist()])
+                store.edge_visits[store.child_start[new_ids[node]]:store.edge_size] = old.edge_visits[start:start + count]
+        tree.store = store
+        tree.nodes = store.ids
+        tree.root = tree.view(0)
+        return [old.states[node] for node in set(range(old.size)) - new_ids.keys()]
+
+    def is_open(tree, node: int) -> bool:
+        """True while selection should keep descending through node."""
+        flags = tree.store.flags[node]
+        return bool(flags & EXPANDED) and not flags & TERMINAL
+
+class CompactMCTS(CompactNodes, MCTS):
+    """MCTS on a NodeStore. A node's children are scored with one vectorized expression
+    (the scorer's array_scores) and backprop updates the whole path with fancy indexing."""
+    View = MCTSNodeView
+
+    def best_child(tree, node: int) -> int:
+        store = tree.store
+        children = store.children(node)
+        N = store.N[children]
+        parent_N = store.N[0] if tree.scorer.root_visits else store.N[node]
+        scores = tree.scorer.array_scores(parent_N, store.W[children] / N, N, store.P[children], store.results[children])
+        return int(children[np.argmax(scores)])
+
+    def select(tree) -> list[int]:
+        node = 0
+        path = [node]
+        while tree.is_open(node):
+            node = tree.best_child(node)
+            path.append(node)
+        return path
+
+    def expand(tree, path: list[int]) -> list[int]:
+        store = tree.store
+        expanding_node = path[-1]
+        if store.flags[expanding_node] & TERMINAL:
+            return path
+        game = store.states[expanding_node]
+        children = [store.add(game.transition(action)) for action in game.all_legal_actions]
+        unvisited = [child for child in children if store.N[child] == 0]
+        if tree.batch_size > 1:
+            for child, counts in zip(unvisited, tree.batch_rollout(unvisited)):
+                tree.backprop_batch(path + [child], counts)
+        else:
+            for child in unvisited:
+                tree.backprop(path + [child], tree.rollout(child))
+        store.set_children(expanding_node, children)
+        store.flags[expanding_node] |= EXPANDED
+        return path + [tree.best_child(expanding_node)]
+
+    def backprop(tree, path: list[int], reward: dict) -> None:
+        value = reward[tree.store.states[path[-1]].player]
+        tree.backprop_batch(path, {value: 1})
+
+    def backprop_batch(tree, path: list[int], counts: dict) -> None:
+        store = tree.store
+        path = np.array(path[::-1])
+        signs = np.where(np.arange(len(path)) % 2 == 0, 1, -1)
+        store.W[path] -= signs * sum(reward * count for reward, count in counts.items())
+        store.N[path] += sum(counts.values())
+        for reward, count in counts.items():
+            if reward == 0:
+                store.results[path, 2] += count
+            else:
+                store.results[path, np.where(signs * reward > 0, 0, 1)] += count
+
+class CompactMCGS(CompactNodes, MCGS):
+    """MCGS on a NodeStore. A node's children are scored with one vectorized expression,
+    and backprop recomputes N and the regularized Q of each path node from its CSR slice of
+    edge visits with one dot product."""
+    View = MCGSNodeView
+
+    def best_edge(tree, node: int) -> int:
+        """Index into store.edges of the best child edge of node."""
+        store = tree.store
+        start = store.child_start[node]
+        end = start + store.child_count[node]
+        children = store.edges[start:end]
+        scores = tree.scorer.array_scores(store.N[node], store.Q[children], store.edge_visits[start:end],
+                                          store.P[children], store.results[children])
+        return int(start + np.argmax(scores))
+
+    def best_child(tree, node: int) -> int:
+        return int(tree.store.edges[tree.best_edge(node)])
+
+    def select(tree) -> list[int]:
+        store = tree.store
+        node = 0
+        path = [node]
+        while tree.is_open(node):
+            edge = tree.best_edge(node)
+            store.edge_visits[edge] += 1
+            node = int(store.edges[edge])
+            path.append(node)
+        return path
+
+    def expand(tree, path: list[int]) -> list[int]:
+        store = tree.store
+        expanding_node = path[-1]
+        if store.flags[expanding_node] & TERMINAL:
+            return path
+        game = store.states[expanding_node]
+        children = [store.add(game.transition(action)) for action in game.all_legal_actions]
+        unvisited = [child for child in children if store.N[child] == 0]
+        if tree.batch_size > 1:
+            batches = dict(zip(unvisited, tree.batch_rollout(unvisited)))
+        store.set_children(expanding_node, children)
+        start = store.child_start[expanding_node]
+        for i, child in enumerate(children):
+            store.edge_visits[start + i] = 1
+            store.child_count[expanding_node] = i + 1  # edges appear one at a time, as in MCGS
+            if store.N[child] == 0:
+                if tree.batch_size > 1:
+                    tree.backprop_batch(path + [child], batches[child])
+                else:
+                    tree.backprop(path + [child], tree.rollout(child))
+        store.flags[expanding_node] |= EXPANDED
+        return path + [tree.best_child(expanding_node)]
+
+    def backprop(tree, path: list[int], reward: dict):
+        value = reward[tree.store.states[path[-1]].player]
+        tree.backprop_batch(path, {value: 1})
+
+    def backprop_batch(tree, path: list[int], counts: dict):
+        store = tree.store
+        reward = sum(r * count for r, count in counts.items()) / sum(counts.values())
+        for node in reversed(path):
+            start = store.child_start[node]
+            end = start + store.child_count[node]
+            visits = store.edge_visits[start:end]
+            store.N[node] = 1 + visits.sum()
+            store.Q[node] = -(1/store.N[node])*(reward + store.Q[store.edges[start:end]] @ visits)
+            for r, count in counts.items():
+                store.results[node, RESULT_COLUMN[r]] += count
+            reward = -reward
+            counts = {-r: count for r, count in counts.items()}
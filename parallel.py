@@ -0,0 +1,234 @@
+from typing import Any
+import itertools
+import multiprocessing
+import os
+import random
+import threading
+import time
+import numpy as np
+from mcts import MCTS, MCTSNode
+from budget import SearchResult, exhausted, search_result
+
+GameState = Any
+
+def search_root(engine: type, engine_kwargs: dict, game_state: GameState, n: int, seed: int) -> dict:
+    """Worker task: run an independent search from game_state and report per-action root statistics."""
+    tree = engine(game_state, rng=random.Random(seed), **engine_kwargs)
+    tree.search(n)
+    return {action: (tree.visits(tree.root, child), child.Q, dict(child.results))
+            for action, child in tree.children_by_action(tree.root).items()}
+
+class RootStatistics:
+    """Per-action statistics of the root, merged over every worker's search."""
+    def __init__(stats):
+        stats.N: dict[Any, int] = {}     # action -> visits
+        stats.W: dict[Any, float] = {}   # action -> summed value, for the player choosing the action
+        stats.results: dict[Any, dict] = {}
+
+    def merge(stats, worker_stats: dict):
+        for action, (N, Q, results) in worker_stats.items():
+            stats.N[action] = stats.N.get(action, 0) + N
+            stats.W[action] = stats.W.get(action, 0.) + Q * N
+            merged = stats.results.setdefault(action, {1: 0, -1: 0, 0: 0})
+            for reward, count in results.items():
+                merged[reward] += count
+
+    @property
+    def Q(stats) -> dict[Any, float]:
+        return {action: stats.W[action] / N if N else 0. for action, N in stats.N.items()}
+
+    @property
+    def best_action(stats) -> Any:
+        """The most visited action (the 'robust child')."""
+        return max(stats.N, key=stats.N.get)
+
+class RootParallel:
+    """Root-parallel search: `workers` processes each run an independent MCTS/MCGS from the same
+    root with their own seed, and the root statistics of all of them are merged into one decision.
+    The pool is created once and reused by every call to search(); close() it when done (or use
+    it as a context manager). Game states are pickled as bare positions, so the workers intern
+    them in their own caches and the parent's caches are never sent."""
+    def __init__(search, engine: type = MCTS, workers: int | None = None, seed: int | None = None,
+                 mp_context: str | None = None, **engine_kwargs):
+        search.engine: type = engine
+        search.engine_kwargs: dict = engine_kwargs
+        search.workers: int = workers or os.cpu_count()
+        search.seeds = np.random.SeedSequence(seed)
+        search.pool = multiprocessing.get_context(mp_context).Pool(search.workers)
+
+    def search(search, game_state: GameState, n: int) -> RootStatistics:
+        """Run n playouts in every worker and merge their root statistics."""
+        seeds = [int(child.generate_state(1)[0]) for child in search.seeds.spawn(search.workers)]
+        tasks = [(search.engine, search.engine_kwargs, game_state, n, seed) for seed in seeds]
+        stats = RootStatistics()
+        for worker_stats in search.pool.starmap(search_root, tasks):
+            stats.merge(worker_stats)
+        return stats
+
+    def close(search):
+        search.pool.close()
+        search.pool.join()
+
+    def __enter__(search):
+        return search
+
+    def __exit__(search, *exc_info):
+        search.close()
+
+class TreeParallelMCTS(MCTS):
+    """Tree-parallel MCTS: `workers` threads run playouts on one shared tree.
+
+    Concurrency model:
+    - Every node carries an RLock guarding its N/W/results, its children list and its
+      is_expanded flag. A thread holds at most one node lock at a time, except during
+      expansion, where it holds the expanding node's lock while that node's children are
+      rolled out and backpropagated (the lock is reentrant so those backprops can take it).
+      Backprop takes the path's locks one at a time, so with moves that cannot repeat a
+      position (no cycles in the tree) no two threads can wait on each other.
+    - Selection reads child statistics without their locks (a slightly stale value only
+      changes which child gets explored) and applies a virtual loss to the chosen child
+      under its lock: N += virtual_loss, W -= virtual_loss, so concurrent threads see the
+      path as worse and spread out. backprop() takes the virtual loss back off every node
+      it was added to before adding the real reward.
+    - Interning new states touches the shared StateCache, so transitions during expansion
+      are serialized by one cache lock. Rollouts run on a per-thread scratch simulator and
+      take no locks at all, as do batched NumPy rollouts. The slow rollout path
+      (fast_rollout=False, or a game without a scratch simulator) would intern every state it
+      plays through, so it is rejected.
+    Under the GIL the threads interleave rather than overlap, so playouts/sec stays about flat
+    from 1 to 8 workers (see bench_parallel.py); the locking is what makes the shared tree
+    correct on a free-threaded interpreter. For CPU scaling today use RootParallel."""
+    def __init__(tree, game_state: GameState, workers: int = 4, virtual_loss: int = 1, **kwargs):
+        super().__init__(game_state, **kwargs)
+        if tree.expansion.lazy or tree.evaluator is not None:
+            raise ValueError("tree-parallel search only supports eager expansion with rollouts")
+        if tree.solver:
+            raise ValueError("tree-parallel search does not prove positions")
+        if not tree.fast_rollout and tree.batch_size == 1:
+            raise ValueError("tree-parallel search needs the scratch-simulator rollouts (fast_rollout=True)")
+        tree.workers: int = workers
+        tree.virtual_loss: int = virtual_loss
+        tree.cache_lock = threading.Lock()
+        tree.local = threading.local()  # per-thread scratch simulator
+        tree.root.lock = threading.RLock()
+
+    def get_node(tree, game_state: GameState) -> MCTSNode:
+        key = tree.node_key(game_state)
+        node = tree.nodes.get(key)
+        if node is None:
+            node = MCTSNode(game_state=game_state)
+            node.lock = threading.RLock()
+            tree.nodes[key] = node
+        return node
+
+    def add_virtual_loss(tree, node: MCTSNode):
+        with node.lock:
+            node.N += tree.virtual_loss
+            node.W -= tree.virtual_loss
+
+    def select(tree) -> list[MCTSNode]:
+        node = tree.root
+        path = [node]
+        while True:
+            with node.lock:
+                if not node.is_expanded or node.is_terminal:
+                    return path
+                node = tree.best_child(node)
+            tree.add_virtual_loss(node)
+            path.append(node)
+
+    def expand(tree, path: list[MCTSNode]) -> list[MCTSNode]:
+        expanding_node = path[-1]
+        with expanding_node.lock:
+            if expanding_node.is_terminal:
+                return path
+            if not expanding_node.is_expanded: # another thread may have expanded it while we waited
+                game = expanding_node.game_state
+                with tree.cache_lock:
+                    children = [tree.get_node(game.transition(action)) for action in game.all_legal_actions]
+                children = list(dict.fromkeys(children)) # symmetric actions lead to the same node
+                unvisited = [child_node for child_node in children if child_node.N == 0]
+                if tree.batch_size > 1:
+                    for child_node, counts in zip(unvisited, tree.batch_rollout(unvisited)):
+                        tree.backprop_batch(path + [child_node], counts, virtual=False)
+                else:
+                    for child_node in unvisited:
+                        reward = tree.rollout(child_node)
+                        tree.backprop(path + [child_node], reward, virtual=False)
+                expanding_node.children.extend(children)
+                expanding_node.is_expanded = True
+            child_node = tree.best_child(expanding_node)
+        tree.add_virtual_loss(child_node)
+        return path + [child_node]
+
+    def scratch_rollout(tree, game: GameState) -> dict:
+        sim = getattr(tree.local, 'scratch', None)
+        if sim is None:
+            sim = tree.local.scratch = game.scratch()
+        else:
+            sim.reset(game)
+        return tree.rollout_policy(sim, tree.rng)  # every thread shares the policy, so its stats are approximate
+
+    def backprop(tree, path: list[MCTSNode], reward: dict, virtual: bool = True) -> None:
+        """Backpropagate reward; with virtual=True also remove the virtual loss that selection
+        put on every node of the path below the root."""
+        value = reward[path[-1].game_state.player]
+        for node in reversed(path):
+            with node.lock:
+                if virtual and node is not path[0]:
+                    node.N -= tree.virtual_loss
+                    node.W += tree.virtual_loss
+                node.W -= value
+                node.N += 1
+                node.results[value] += 1
+            value = -value
+
+    def backprop_batch(tree, path: list[MCTSNode], counts: dict, virtual: bool = True) -> None:
+        value = sum(reward * count for reward, count in counts.items())
+        visits = sum(counts.values())
+        for node in reversed(path):
+            with node.lock:
+                if virtual and node is not path[0]:
+                    node.N -= tree.virtual_loss
+                    node.W += tree.virtual_loss
+                node.W -= value
+                node.N += visits
+                for reward, count in counts.items():
+                    node.results[reward] += count
+            value = -value
+            counts = {-reward: count for reward, count in counts.items()}
+
+    def run(tree):
+        path = tree.select()
+        path = tree.expand(path)
+        if tree.batch_size > 1:
+            tree.backprop_batch(path, tree.batch_rollout(path[-1:])[0])
+        else:
+            tree.backprop(path, tree.rollout(path[-1]))
+
+    def search(tree, n: int | None = None, deadline: float | None = None, max_nodes: int | None = None,
+               max_bytes: int | None = None, check_every: int = 64, stop_early: bool = True) -> SearchResult:
+        """Perform up to n playouts, shared among the worker threads, with the budgets of
+        MCTS.search. Whichever thread finishes a multiple of check_every playouts checks the
+        budgets and stops every thread; the threads finish their current playout first."""
+        if n is None and deadline is None and max_nodes is None and max_bytes is None:
+            raise ValueError("search needs a playout count or a budget")
+        start = time.monotonic()
+        tickets, finished = itertools.count(), itertools.count(1)
+        stop = threading.Event()
+        stopped_by = ['playouts']
+        def work():
+            while not stop.is_set() and (n is None or next(tickets) < n):
+                tree.run()
+                playouts = next(finished)
+                if playouts % check_every == 0:
+                    reason = exhausted(tree, playouts, start, n, deadline, max_nodes, max_bytes, stop_early)
+                    if reason is not None and not stop.is_set():
+                        stopped_by[0] = reason
+                        stop.set()
+        threads = [threading.Thread(target=work) for _ in range(tree.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return search_result(tree, next(finished) - 1, start, stopped_by[0])
@@ -0,0 +1,79 @@
+"""Rollout policies: how the scratch simulator plays a leaf out.
+A policy is called as policy(sim, rng) on a game's scratch simulator (see Connect4Scratch) and
+returns the reward of the playout. RandomRollout (the default) plays uniformly random moves to
+the end of the game. TacticalRollout plays an immediate win when it has one, blocks the
+opponent's immediate win otherwise, and only then moves at random; with a `cutoff` it stops
+after that many plies and scores the position with the simulator's heuristic, so Connect4
+playouts no longer have to fill the board. It uses the simulator's winning_action(player)
+and heuristic(). Used through MCTS/MCGS(rollout_policy=...).
+
+Every policy counts its playouts, plies and time, so the cost and length of its playouts can
+be compared (stats()). Batched NumPy rollouts (batch_size > 1) and the slow path without a
+scratch simulator (fast_rollout=False) are always uniformly random."""
+import random
+import time
+from typing import Any
+
+Simulator = Any
+
+class RandomRollout:
+    """Uniformly random moves until the game ends."""
+    def __init__(policy):
+        policy.reset()
+
+    def reset(policy):
+        policy.rollouts: int = 0
+        policy.plies: int = 0
+        policy.seconds: float = 0.
+
+    def __call__(policy, sim: Simulator, rng=random) -> dict:
+        start = time.perf_counter()
+        reward, plies = policy.play(sim, rng)
+        policy.seconds += time.perf_counter() - start
+        policy.rollouts += 1
+        policy.plies += plies
+        return reward
+
+    def play(policy, sim: Simulator, rng) -> tuple[dict, int]:
+        """Play sim out; return the reward and the number of plies played."""
+        reward = None
+        plies = 0
+        while reward is None:
+            reward = sim.play(rng.choice(sim.legal_actions))
+            plies += 1
+        return reward, plies
+
+    def stats(policy) -> dict:
+        rollouts = max(policy.rollouts, 1)
+        return {'rollouts': policy.rollouts, 'mean_length': policy.plies / rollouts,
+                'mean_seconds': policy.seconds / rollouts}
+
+class TacticalRollout(RandomRollout):
+    """Win if possible, else block the opponent's immediate win, else move at random. After
+    `cutoff` plies (if given) the playout stops and is scored from sim.heuristic(), an estimate
+    in [-1, 1] for player 1: an even position (h == 0) is a draw, any other counts as a win for
+    player 1 with probability (1 + h) / 2, so results stay wins, losses and draws and the
+    expected reward is the heuristic. Tic-tac-toe's heuristic is always 0, so there every cut
+    playout is a draw."""
+    def __init__(policy, cutoff: int | None = None):
+        policy.cutoff: int | None = cutoff
+        super().__init__()
+
+    def play(policy, sim: Simulator, rng) -> tuple[dict, int]:
+        reward = None
+        plies = 0
+        while reward is None:
+            if plies == policy.cutoff:
+                h = sim.heuristic()
+                if h == 0:
+                    return {1: 0, -1: 0}, plies
+                winner = 1 if rng.random() < (1 + h) / 2 else -1
+                return {1: winner, -1: -winner}, plies
+            action = sim.winning_action(sim.player)
+            if action is None:
+                action = sim.winning_action(-sim.player)
+            if action is None:
+                action = rng.choice(sim.legal_actions)
+            reward = sim.play(action)
+            plies += 1
+        return reward, plies
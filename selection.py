@@ -0,0 +1,81 @@
+"""Child scoring kernels for selection.
+A scorer picks the best of a node's children in one pass. `best` is a tight pure-Python loop
+that hoists everything that only depends on the parent out of the loop and uses `math`
+instead of scalar NumPy calls. `array_scores` scores a whole child set as NumPy arrays for
+the NodeStore engines. In both, Q is the child's value for the player choosing it, N the
+visits of the edge to it and P its prior."""
+import math
+import numpy as np
+
+class PUCT:
+    """(P)redictor (U)pper (C)onfidence bound for (T)rees: Q + c * P * sqrt(parent N) / (1 + N).
+    MCTS has always scaled exploration by the root's visits; root_visits=True keeps that."""
+    def __init__(scorer, c: float = 3., root_visits: bool = False):
+        scorer.c: float = c
+        scorer.root_visits: bool = root_visits
+
+    def best(scorer, parent_N: int, children, Q, N, P):
+        c, sqrt_N = scorer.c, math.sqrt(parent_N)
+        best_child, best_score = None, -math.inf
+        for child, q, n, p in zip(children, Q, N, P):
+            score = q + c * p * sqrt_N / (1 + n)
+            if score > best_score:
+                best_child, best_score = child, score
+        return best_child
+
+    def array_scores(scorer, parent_N: int, Q, N, P, results) -> np.ndarray:
+        return Q + scorer.c * P * np.sqrt(parent_N) / (1 + N)
+
+class UCB1:
+    """Q + c * sqrt(ln(parent N) / N). Unvisited children are tried first."""
+    def __init__(scorer, c: float = 2., root_visits: bool = False):
+        scorer.c: float = c
+        scorer.root_visits: bool = root_visits
+
+    def best(scorer, parent_N: int, children, Q, N, P):
+        c, log_N = scorer.c, math.log(parent_N) if parent_N > 1 else 0.
+        best_child, best_score = None, -math.inf
+        for child, q, n in zip(children, Q, N):
+            if n == 0:
+                return child
+            score = q + c * math.sqrt(log_N / n)
+            if score > best_score:
+                best_child, best_score = child, score
+        return best_child
+
+    def array_scores(scorer, parent_N: int, Q, N, P, results) -> np.ndarray:
+        log_N = math.log(parent_N) if parent_N > 1 else 0.
+        with np.errstate(divide='ignore'):
+            return np.where(N == 0, np.inf, Q + scorer.c * np.sqrt(log_N / N))
+
+class UCB1Tuned:
+    """UCB1-Tuned (Auer et al. 2002): Q + c * sqrt(ln(parent N) / N * min(1, V)), where
+    V = var + sqrt(2 ln(parent N) / N) is an upper bound on the reward variance. Rewards are
+    -1/0/1, so the mean square reward of a child is (wins + losses) / plays; 1 bounds the
+    variance of rewards in [-1, 1]."""
+    def __init__(scorer, c: float = 1., root_visits: bool = False):
+        scorer.c: float = c
+        scorer.root_visits: bool = root_visits
+
+    def best(scorer, parent_N: int, children, Q, N, P):
+        c, log_N = scorer.c, math.log(parent_N) if parent_N > 1 else 0.
+        best_child, best_score = None, -math.inf
+        for child, q, n in zip(children, Q, N):
+            if n == 0:
+                return child
+            results = child.results
+            plays = results[1] + results[-1] + results[0]
+            variance = (results[1] + results[-1]) / plays - q * q if plays else 1.
+            bound = min(1., variance + math.sqrt(2 * log_N / n))
+            score = q + c * math.sqrt(log_N / n * bound)
+            if score > best_score:
+                best_child, best_score = child, score
+        return best_child
+
+    def array_scores(scorer, parent_N: int, Q, N, P, results) -> np.ndarray:
+        log_N = math.log(parent_N) if parent_N > 1 else 0.
+        plays = results.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variance = np.where(plays > 0, (results[:, 0] + results[:, 1]) / plays - Q * Q, 1.)
+            bound = np.minimum(1., variance + np.sqrt(2 * log_N / N))
+            return np.where(N == 0, np.inf, Q + scorer.c * np.sqrt(log_N / N * bound))
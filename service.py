@@ -0,0 +1,148 @@
+"""Asyncio analysis service: answers position-analysis requests from a pool of warm MCGS graphs.
+
+    service = AnalysisService(max_graphs=16)
+    async for answer in service.analyze(game_state, playouts=10_000):
+        print(answer.best_move, answer.playouts)  # progressively better SearchResults
+
+Searches run on the event loop in cooperative slices of `slice_playouts` playouts, so one
+long analysis never blocks the others. Requests for a position that is already being searched
+join that search instead of starting their own. Finished graphs stay warm in a bounded LRU pool
+keyed by their root position: asking again for the same position continues from the playouts
+already done, and asking for a position reached from a warm graph's root moves that graph to
+it (MCGS.advance) instead of starting cold. handle() is the same thing for JSON-style request
+dicts, for embedding behind a request/response API."""
+from collections import OrderedDict
+from typing import Any, AsyncIterator
+import asyncio
+import copy
+import time
+import numpy as np
+from connect4 import Connect4
+from tictactoe import TicTacToe
+from mcgs import MCGS
+from budget import SearchResult, search_result
+
+GameState = Any
+
+GAMES = {'connect4': Connect4, 'tictactoe': TicTacToe}
+
+class WarmGraph:
+    """A search graph in the pool, with the playouts done since its root became the root."""
+    def __init__(graph, tree):
+        graph.tree = tree
+        graph.playouts: int = 0
+        graph.elapsed: float = 0.
+
+class Job:
+    """One running search, shared by every request for its position."""
+    def __init__(job, graph: WarmGraph, target: int):
+        job.graph: WarmGraph = graph
+        job.target: int = target  # search until the graph has this many playouts
+        job.subscribers: list[asyncio.Queue] = []
+        job.task: asyncio.Task | None = None
+
+    def publish(job, answer: SearchResult | Exception, final: bool):
+        for queue in job.subscribers:
+            queue.put_nowait((answer, final))
+
+class AnalysisService:
+    def __init__(service, max_graphs: int = 8, slice_playouts: int = 256, engine: type = MCGS, **engine_kwargs):
+        service.max_graphs: int = max_graphs
+        service.slice_playouts: int = slice_playouts
+        service.engine: type = engine
+        service.engine_kwargs: dict = engine_kwargs
+        service.graphs: OrderedDict[GameState, WarmGraph] = OrderedDict()  # root position -> graph, LRU order
+        service.jobs: dict[GameState, Job] = {}  # in-flight searches by root position
+
+    def warm_graph(service, game_state: GameState) -> WarmGraph:
+        """The pool's graph for game_state: its own, one that reached it (advanced to it), or a new one."""
+        graph = service.graphs.get(game_state)
+        if graph is None:
+            for root, other in service.graphs.items():
+                tree = other.tree
+                if root not in service.jobs and tree.node_key(game_state) in tree.nodes:
+                    del service.graphs[root]
+                    tree.advance(game_state)
+                    graph = other
+                    graph.playouts, graph.elapsed = 0, 0.
+                    break
+            else:
+                graph = WarmGraph(service.engine(game_state, **service.engine_kwargs))
+            service.graphs[game_state] = graph
+        service.graphs.move_to_end(game_state)
+        service.evict()
+        return graph
+
+    def evict(service):
+        """Drop least recently used graphs beyond max_graphs, never one that is being searched."""
+        idle = [root for root in service.graphs if root not in service.jobs]
+        for root in idle[:max(len(service.graphs) - service.max_graphs, 0)]:
+            del service.graphs[root]
+
+    def answer(service, graph: WarmGraph, stopped_by: str) -> SearchResult:
+        result = search_result(graph.tree, graph.playouts, time.monotonic(), stopped_by)
+        result.elapsed = graph.elapsed  # summed over every slice, not since this answer
+        return result
+
+    async def run(service, game_state: GameState, job: Job):
+        graph, tree = job.graph, job.graph.tree
+        try:
+            while graph.playouts < job.target and not tree.solved():
+                start = time.perf_counter()
+                result = tree.search(min(service.slice_playouts, job.target - graph.playouts), stop_early=False)
+                graph.playouts += result.playouts
+                graph.elapsed += time.perf_counter() - start
+                job.publish(service.answer(graph, 'slice'), final=False)
+                await asyncio.sleep(0)  # let other searches and requests run
+            job.publish(service.answer(graph, 'solved' if tree.solved() else 'playouts'), final=True)
+        except Exception as error:
+            job.publish(error, final=True)
+        finally:
+            del service.jobs[game_state]
+            service.evict()
+
+    async def analyze(service, game_state: GameState, playouts: int) -> AsyncIterator[SearchResult]:
+        """Stream answers for game_state until its graph has `playouts` playouts (or is solved);
+        the last answer yielded is the final one."""
+        job = service.jobs.get(game_state)
+        if job is None:
+            graph = service.warm_graph(game_state)
+            if graph.playouts >= playouts or graph.tree.solved():  # already done by earlier requests
+                yield service.answer(graph, 'solved' if graph.tree.solved() else 'playouts')
+                return
+            job = service.jobs[game_state] = Job(graph, playouts)
+            job.task = asyncio.create_task(service.run(game_state, job))
+        else:
+            job.target = max(job.target, playouts)
+            service.graphs.move_to_end(game_state)
+        queue = asyncio.Queue()
+        job.subscribers.append(queue)
+        try:
+            while True:
+                answer, final = await queue.get()
+                if isinstance(answer, Exception):
+                    raise answer
+                if not final and answer.playouts >= playouts:  # done for this request, not the job
+                    answer = copy.copy(answer)
+                    answer.stopped_by, final = 'playouts', True
+                yield answer
+                if final:
+                    return
+        finally:
+            job.subscribers.remove(queue)
+
+    async def best(service, game_state: GameState, playouts: int) -> SearchResult:
+        """The final answer of analyze()."""
+        async for answer in service.analyze(game_state, playouts):
+            pass
+        return answer
+
+    async def handle(service, request: dict) -> AsyncIterator[dict]:
+        """analyze() for a request {'game': 'connect4' or 'tictactoe', 'board': nested lists,
+        'playouts': n}, streaming JSON-ready answer dicts."""
+        game_state = GAMES[request['game']].get_state(np.array(request['board'], dtype=float))
+        async for answer in service.analyze(game_state, int(request['playouts'])):
+            yield {'best_move': answer.best_move, 'playouts': answer.playouts, 'nodes': answer.nodes,
+                   'visits': [[action, visits] for action, visits in answer.visits.items()],
+                   'values': [[action, value] for action, value in answer.values.items()],
+                   'solved': answer.solved, 'final': answer.stopped_by != 'slice'}
@@ -0,0 +1,52 @@
+import random
+import numpy as np
+from cache import StateCache
+from connect4 import Connect4
+from tictactoe import TicTacToe
+from mcts import MCTS
+from mcgs import MCGS
+
+def reachable(root) -> set:
+    seen, stack = {root}, [root]
+    while stack:
+        for child in stack.pop().children:
+            if child not in seen:
+                seen.add(child)
+                stack.append(child)
+    return seen
+
+def test_advance_keeps_the_played_subtree():
+    for engine in (MCTS, MCGS):
+        random.seed(0)
+        mcts = engine(game_state=TicTacToe.get_state(np.zeros((3, 3))))
+        mcts.search(200)
+        child = mcts.children_by_action(mcts.root)[(1, 1)]
+        N, Q, subtree = child.N, child.Q, reachable(child)
+        assert mcts.advance((1, 1)) is child is mcts.root
+        assert (child.N, child.Q) == (N, Q)
+        assert set(mcts.nodes.values()) == subtree
+        if engine is MCGS:
+            assert all(parent in subtree for node in subtree for parent in node.parents)
+
+def test_advance_by_state_and_to_an_unsearched_position():
+    root = TicTacToe.get_state(np.zeros((3, 3)))
+    mcts = MCTS(game_state=root)
+    mcts.search(1)
+    grandchild = root.transition((0, 0)).transition((2, 2))
+    mcts.advance(grandchild)
+    assert mcts.root.game_state == grandchild and mcts.root.N == 0
+    assert list(mcts.nodes) == [grandchild]
+
+def test_memory_stays_flat_over_a_game():
+    cache = StateCache()
+    for engine in (MCTS, MCGS):
+        random.seed(1)
+        mcts = engine(game_state=Connect4.get_state(np.zeros((6, 7)), cache=cache))
+        sizes = []
+        while not mcts.root.is_terminal:
+            mcts.search(100)
+            sizes.append(len(mcts.nodes))
+            best = max(mcts.root.children, key=lambda child: mcts.visits(mcts.root, child))
+            mcts.advance(best.game_state)
+        assert max(sizes) < 3 * sizes[0]
+        assert len(cache) <= max(sizes) + 100
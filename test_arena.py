@@ -0,0 +1,33 @@
+import json
+import numpy as np
+from tictactoe import TicTacToe
+from mcts import MCTS
+from mcgs import MCGS
+from arena import Arena, Player, MatchResult, play_game, wilson
+
+def test_wilson_interval():
+    lo, hi = wilson(50, 100)
+    assert lo < .5 < hi and np.isclose(.5 - lo, hi - .5)
+    assert wilson(0, 10)[0] == 0. and 0 < wilson(0, 10)[1] < .4
+    assert MatchResult('a', 'b', 6, 2, 2, 60.).score == .7
+
+def test_play_game_alternates_colors_and_is_seeded():
+    start = TicTacToe.get_state(np.zeros((3, 3)))
+    a, b = Player(MCTS, 50), Player(MCGS, 50, reuse_tree=False)
+    first, second = play_game(0, a, b, start, seed=1), play_game(1, a, b, start, seed=1)
+    assert first['a_first'] and not second['a_first'] and first['a_color'] == -second['a_color']
+    again = play_game(0, a, b, start, seed=1)
+    assert {**again, 'seconds': None} == {**first, 'seconds': None}  # same seed, same game
+    assert len(first['moves']) == len(first['seconds']) == len(first['playouts'])
+    assert first['score'] in (1, 0, -1)
+
+def test_arena_streams_games(tmp_path):
+    path = tmp_path / 'match.jsonl'
+    start = TicTacToe.get_state(np.zeros((3, 3)))
+    with Arena(Player(MCTS, 200), Player(MCGS, 200), start, workers=2, seed=0) as arena:
+        result = arena.play(6, path)
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert result.games == len(records) == 6
+    assert sorted(record['game'] for record in records) == list(range(6))
+    assert result.wins == sum(record['score'] == 1 for record in records)
+    assert result.draws >= 4 and result.games_per_min > 0  # tic-tac-toe is a draw with decent play
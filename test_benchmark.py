@@ -0,0 +1,38 @@
+import json
+import random
+import numpy as np
+from benchmark import compare, main, run_case
+from tictactoe import TicTacToe
+from mcgs import MCGS
+
+DETERMINISTIC = ('nodes', 'cache_size', 'best_move', 'correct')
+
+def test_seeded_cases_are_reproducible():
+    state = random.getstate()
+    for engine in ('MCTS', 'MCGS'):
+        first, second = (run_case('connect4/O_can_win', engine, 100, seed=3) for _ in range(2))
+        assert {key: first[key] for key in DETERMINISTIC} == {key: second[key] for key in DETERMINISTIC}
+        assert first['correct'] and first['p50_ms'] <= first['p99_ms']
+    assert random.getstate() == state  # the global generator was never touched
+
+def test_injected_rng_decides_the_search():
+    def visits(seed: int) -> list:
+        mcgs = MCGS(game_state=TicTacToe.get_state(np.zeros((3, 3))), rng=random.Random(seed))
+        mcgs.search(200, stop_early=False)
+        return [mcgs.visits(mcgs.root, child) for child in mcgs.root.children]
+    random.seed(1)
+    first = visits(0)
+    random.seed(2)
+    assert visits(0) == first
+
+def test_json_results_can_be_compared(tmp_path):
+    path = tmp_path / 'results.json'
+    main(['--playouts', '20', '--positions', 'tictactoe/almost_won', '--json', str(path)])
+    results = json.loads(path.read_text())
+    assert [case['engine'] for case in results['cases']] == ['MCTS', 'MCGS']
+    assert compare(results, results) == []
+    slower = json.loads(path.read_text())
+    for case in slower['cases']:
+        case['playouts_per_sec'] /= 2
+        case['best_move'] = [0, 2]
+    assert len(compare(slower, results)) == 4
@@ -0,0 +1,52 @@
+import pickle
+import random
+import numpy as np
+from book import merge_book
+from connect4 import Connect4State
+from tictactoe import TicTacToe
+from mcgs import MCGS
+
+def searched(n: int = 300, **kwargs) -> MCGS:
+    random.seed(0)
+    mcgs = MCGS(game_state=Connect4State(state=np.zeros((6, 7))), **kwargs)
+    mcgs.search(n, stop_early=False)
+    return mcgs
+
+def test_book_holds_the_graph_statistics(tmp_path):
+    mcgs = searched()
+    book = merge_book(mcgs, tmp_path / 'c4.book')
+    assert len(book) == len(mcgs.nodes)
+    for node in mcgs.nodes.values():
+        entry = book.lookup(node.game_state)
+        assert entry.N == node.N and np.isclose(entry.Q, node.Q) and entry.results == node.results
+        assert entry.edges == {child.game_state.zobrist: visits for child, visits in node.child_to_edge_visits.items()}
+    assert book.lookup(TicTacToe.get_state(np.zeros((3, 3)))) is None
+    assert set(book.moves(mcgs.root.game_state)) == set(range(7))
+
+def test_merge_sums_positions_found_in_both(tmp_path):
+    mcgs = searched()
+    merge_book(mcgs, tmp_path / 'c4.book')
+    book = merge_book(mcgs, tmp_path / 'c4.book')
+    assert len(book) == len(mcgs.nodes)
+    entry = book.lookup(mcgs.root.game_state)
+    assert entry.N == 2 * mcgs.root.N and np.isclose(entry.Q, mcgs.root.Q)
+    assert entry.results == {reward: 2 * count for reward, count in mcgs.root.results.items()}
+
+def test_warm_start_seeds_nodes_and_is_not_merged_twice(tmp_path):
+    book = merge_book(searched(), tmp_path / 'c4.book')
+    entry = book.lookup(Connect4State(state=np.zeros((6, 7))))
+    cold, warm = searched(100), searched(100, book=book)
+    assert warm.root.N == entry.N + cold.root.N
+    assert all(child.N >= book.lookup(child.game_state).N for child in warm.root.children)
+    # the book's positions are not rolled out again
+    assert sum(warm.root.results.values()) - sum(entry.results.values()) < sum(cold.root.results.values())
+    book = merge_book(warm, tmp_path / 'c4.book')
+    assert book.lookup(warm.root.game_state).N == warm.root.N
+
+def test_book_pickles_as_its_path(tmp_path):
+    book = merge_book(searched(50), tmp_path / 'c4.book')
+    copy = pickle.loads(pickle.dumps(book))
+    assert copy.path == book.path and isinstance(copy.keys, np.memmap)
+    assert len(pickle.dumps(book)) < 200
+    root = Connect4State(state=np.zeros((6, 7)))
+    assert copy.lookup(root).N == book.lookup(root).N
@@ -0,0 +1,46 @@
+import time
+import numpy as np
+import pytest
+from connect4 import Connect4State
+from tictactoe import TicTacToe
+from mcts import MCTS
+from mcgs import MCGS
+from nodestore import CompactMCTS
+
+def test_search_reports_root_statistics():
+    for engine in (MCTS, MCGS, CompactMCTS):
+        mcts = engine(game_state=TicTacToe.get_state(np.zeros((3, 3))))
+        result = mcts.search(100, stop_early=False)
+        assert result.playouts == 100 and result.stopped_by == 'playouts'
+        assert result.nodes == len(mcts.nodes)
+        assert len(result.visits) == 9 and result.best_move == max(result.visits, key=result.visits.get)
+        assert set(result.values) == set(result.visits)
+
+def test_search_stops_at_deadline():
+    mcts = MCGS(game_state=Connect4State(state=np.zeros((6, 7))))
+    result = mcts.search(deadline=time.monotonic() + 0.2, stop_early=False, check_every=8)
+    assert result.stopped_by == 'deadline'
+    assert 0.2 <= result.elapsed < 1.
+
+def test_search_stops_at_node_and_byte_budgets():
+    for engine in (MCTS, MCGS):
+        mcts = engine(game_state=Connect4State(state=np.zeros((6, 7))))
+        result = mcts.search(10_000, max_nodes=500, stop_early=False, check_every=1)
+        assert result.stopped_by == 'max_nodes' and 500 <= result.nodes < 520
+        mcts = engine(game_state=Connect4State(state=np.zeros((6, 7))))
+        result = mcts.search(10_000, max_bytes=200 * mcts.node_bytes, stop_early=False, check_every=1)
+        assert result.stopped_by == 'max_bytes' and mcts.memory_estimate() >= 200 * mcts.node_bytes
+
+def test_search_stops_when_the_leader_cannot_be_overtaken():
+    almost_won = TicTacToe.get_state(np.array([
+        [1,-1,0],
+        [1,1,-1],
+        [-1,0,0]]))
+    mcts = MCGS(game_state=almost_won)
+    result = mcts.search(5000, check_every=16)
+    assert result.stopped_by == 'decided' and result.playouts < 5000
+    assert result.best_move == (2, 2)
+
+def test_search_needs_a_budget():
+    with pytest.raises(ValueError):
+        MCTS(game_state=TicTacToe.get_state(np.zeros((3, 3)))).search()
@@ -0,0 +1,43 @@
+import gc
+import random
+import numpy as np
+from cache import StateCache
+from connect4 import Connect4
+from tictactoe import TicTacToe
+from mcts import MCTS
+
+def test_cache_is_bounded_and_counts_evictions():
+    cache = StateCache(max_size=10)
+    game = Connect4.get_state(np.zeros((6, 7)), cache=cache)
+    random.seed(0)
+    for _ in range(20):
+        state = game
+        while not state.is_terminal:
+            state = state.transition(random.choice(state.all_legal_actions))
+    del state
+    gc.collect()
+    stats = cache.stats()
+    assert stats['size'] == 10
+    assert stats['misses'] > 10 and stats['evictions'] >= stats['misses'] - 10
+    assert len(cache) <= 11  # the LRU window plus the root we still hold
+
+def test_states_held_by_live_nodes_stay_interned():
+    cache = StateCache(max_size=5)
+    mcts = MCTS(game_state=TicTacToe.get_state(np.zeros((3, 3)), cache=cache))
+    mcts.search(20)
+    assert cache.evictions > 0
+    for game_state, node in mcts.nodes.items():
+        assert cache.get(game_state.zobrist, game_state.key) is node.game_state
+    del mcts
+    gc.collect()
+    assert len(cache) <= 5
+
+def test_lru_keeps_recently_used_states():
+    cache = StateCache(max_size=2)
+    root = TicTacToe.get_state(np.zeros((3, 3)), cache=cache)
+    a = root.transition((0, 0)).zobrist
+    cache.get(root.zobrist)  # root is now the most recent, a is the least recent
+    b = root.transition((1, 1)).zobrist
+    gc.collect()
+    assert a not in cache and b in cache and root.zobrist in cache
+    assert cache.hits == 1 and cache.evictions == 1
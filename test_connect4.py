@@ -0,0 +1,50 @@
+import random
+import numpy as np
+from connect4 import Connect4, Connect4State
+
+def test_bitboard_round_trips_board():
+    board = np.array([
+        [0., 0., 0., 0., 0., 0., 0.],
+        [0., 0., 0., 1., 0., 0., 0.],
+        [0., 0., 0., -1., 0., 0., 0.],
+        [0., 0., -1., 1., 0., 0., 0.],
+        [0., 0., -1, 1., 1., 0., 0.],
+        [0., 0., -1, 1, -1, 0., 0.]])
+    game = Connect4State(state=board)
+    assert np.array_equal(Connect4State.from_bits(*game.key).state, board)
+    assert game.player == 1
+    assert game.all_legal_actions == list(range(7))
+    assert game.result is None
+
+def test_wins_in_every_direction():
+    lines = [[(5, 0), (5, 1), (5, 2), (5, 3)],   # horizontal
+             [(5, 6), (4, 6), (3, 6), (2, 6)],   # vertical
+             [(5, 0), (4, 1), (3, 2), (2, 3)],   # diagonal /
+             [(2, 3), (3, 4), (4, 5), (5, 6)]]   # diagonal \
+    for line in lines:
+        board = np.zeros((6, 7))
+        for cell in line:
+            board[cell] = -1
+        game = Connect4State(state=board)
+        assert game.result == {1: -1, -1: 1}
+        assert game.is_terminal and game.all_legal_actions == []
+
+def test_full_column_is_not_legal():
+    Connect4.reset_cache()
+    game = Connect4.get_state(np.zeros((6, 7)))
+    for _ in range(6):
+        game = game.transition(0)
+    assert 0 not in game.all_legal_actions
+    assert np.array_equal(game.state[:, 0], [-1, 1, -1, 1, -1, 1])
+    assert game is Connect4.get_state(game.state.copy())
+
+def test_incremental_transition_matches_full_scan():
+    random.seed(0)
+    for _ in range(50):
+        game = Connect4.get_state(np.zeros((6, 7)))
+        while not game.is_terminal:
+            game = game.transition(random.choice(game.all_legal_actions))
+            rescanned = Connect4State(state=game.state.copy())
+            assert game.result == rescanned.result
+            assert game.player == rescanned.player
+            assert game.all_legal_actions == rescanned.all_legal_actions
@@ -0,0 +1,87 @@
+import numpy as np
+from connect4 import Connect4State
+from tictactoe import TicTacToe
+from mcts import MCTS
+from mcgs import MCGS
+from evaluate import MLPEvaluator, RolloutEvaluator
+
+almost_won = np.array([
+    [1,-1,0],
+    [1,1,-1],
+    [-1,0,0]])
+
+class Counting:
+    """Wraps an evaluator and records the size of every batch it is called with."""
+    def __init__(counting, evaluator):
+        counting.evaluator = evaluator
+        counting.batches = []
+
+    def __call__(counting, states):
+        counting.batches.append(len(states))
+        return counting.evaluator(states)
+
+def test_mlp_priors_cover_only_legal_actions():
+    board = np.zeros((6, 7))
+    board[:, 2] = [1, -1, 1, -1, 1, -1]
+    game = Connect4State(state=board)
+    evaluator = MLPEvaluator.for_state(game, seed=0)
+    values, priors = evaluator([game, game.transition(0)])
+    assert values.shape == (2,) and np.all(np.abs(values) <= 1)
+    assert priors.shape == (2, 7) and np.allclose(priors.sum(axis=1), 1)
+    assert np.all(priors[:, 2] == 0) and np.all(priors[:, [0, 1, 3, 4, 5, 6]] > 0)
+
+def test_search_evaluates_leaves_in_batches_and_uses_priors():
+    game = TicTacToe.get_state(np.zeros((3, 3)))
+    for engine in (MCTS, MCGS):
+        evaluator = Counting(MLPEvaluator.for_state(game, seed=0))
+        mcts = engine(game_state=game, evaluator=evaluator, leaf_batch=8)
+        mcts.search(50, stop_early=False)
+        assert max(evaluator.batches) == 8 and len(evaluator.batches) <= 50
+        _, (priors,) = evaluator.evaluator([game])
+        children = mcts.children_by_action(mcts.root)
+        P = {action: mcts.root.priors[child] for action, child in children.items()}
+        assert all(np.isclose(P[action], priors[game.action_index(action)]) for action in children)
+
+def test_transposed_children_keep_each_parents_prior():
+    empty = TicTacToe.get_state(np.zeros((3, 3)))
+    for engine in (MCTS, MCGS):
+        mcts = engine(game_state=empty, evaluator=RolloutEvaluator(1, np.random.default_rng(0)))
+        first = mcts.get_node(empty.transition((0, 0)).transition((1, 1)))
+        second = mcts.get_node(empty.transition((2, 2)).transition((1, 1)))
+        shared = mcts.get_node(first.game_state.transition((2, 2)))
+        assert shared is mcts.get_node(second.game_state.transition((0, 0)))
+        mcts.expand_priors(first, np.eye(9)[8])   # all of first's prior on (2, 2)
+        mcts.expand_priors(second, np.eye(9)[2])  # none of second's
+        assert first.priors[shared] == 1. and second.priors[shared] == 0.
+        first.N = second.N = mcts.root.N = 1
+        assert mcts.best_child(first) is shared and mcts.best_child(second) is not shared
+
+def test_virtual_loss_is_removed():
+    mcts = MCTS(game_state=Connect4State(state=np.zeros((6, 7))),
+                evaluator=MLPEvaluator(42, 7, seed=0), leaf_batch=16)
+    mcts.search(50, stop_early=False)
+    assert all(abs(node.W) <= node.N for node in mcts.nodes.values())
+    assert mcts.root.N == sum(child.N for child in mcts.root.children) + 1  # the root was evaluated once
+
+def test_colliding_paths_are_dropped():
+    mcgs = MCGS(game_state=Connect4State(state=np.zeros((6, 7))),
+                evaluator=MLPEvaluator(42, 7, seed=0), leaf_batch=16)
+    mcgs.search(50, stop_early=False)
+    visited = [node for node in mcgs.nodes.values() if node.N]
+    for node in visited:
+        assert node.edge_visits == sum(node.child_to_edge_visits.values())
+        assert node.N == 1 + node.edge_visits
+    assert mcgs.root.edge_visits == len(visited) - 1  # every path reached a leaf evaluated only once
+
+def test_search_with_an_evaluator_finds_the_win():
+    for engine in (MCTS, MCGS):
+        mcts = engine(game_state=TicTacToe.get_state(almost_won),
+                      evaluator=RolloutEvaluator(16, np.random.default_rng(0)), leaf_batch=4)
+        assert mcts.search(100, stop_early=False).best_move == (2, 2)
+
+def test_timeout_flushes_small_batches():
+    evaluator = Counting(RolloutEvaluator(4, np.random.default_rng(0)))
+    mcgs = MCGS(game_state=Connect4State(state=np.zeros((6, 7))), evaluator=evaluator,
+                leaf_batch=64, leaf_timeout=0.)
+    mcgs.search(20, stop_early=False)
+    assert set(evaluator.batches) == {1}
@@ -0,0 +1,52 @@
+import math
+import random
+import numpy as np
+import pytest
+from connect4 import Connect4State
+from tictactoe import TicTacToe
+from mcts import MCTS
+from mcgs import MCGS
+from parallel import TreeParallelMCTS
+from evaluate import RolloutEvaluator
+from expansion import Lazy, ProgressiveWidening
+
+almost_won = np.array([
+    [1,-1,0],
+    [1,1,-1],
+    [-1,0,0]])
+
+def test_lazy_run_rolls_out_one_child():
+    for engine, root_N in ((MCTS, 1), (MCGS, 2)):  # eager: 8; MCGS also counts the edge
+        mcts = engine(game_state=Connect4State(state=np.zeros((6, 7))), expansion=Lazy())
+        mcts.search(1)
+        assert mcts.root.N == root_N and len(mcts.root.children) == 1
+
+def test_lazy_tries_every_action_before_revisiting():
+    random.seed(0)
+    mcts = MCTS(game_state=Connect4State(state=np.zeros((6, 7))), expansion=Lazy())
+    mcts.search(7, stop_early=False)
+    assert len(mcts.root.children) == 7 and all(child.N == 1 for child in mcts.root.children)
+
+def test_progressive_widening_caps_children():
+    random.seed(0)
+    for engine in (MCTS, MCGS):
+        mcts = engine(game_state=Connect4State(state=np.zeros((6, 7))), expansion=ProgressiveWidening(c=1., alpha=.25))
+        mcts.search(200, stop_early=False)
+        for node in mcts.nodes.values():
+            assert len(node.children) <= max(1, math.ceil(node.N ** .25))
+        assert len(mcts.root.children) < 7
+
+def test_lazy_searches_find_the_win():
+    for engine in (MCTS, MCGS):
+        for expansion in (Lazy(), ProgressiveWidening()):
+            random.seed(0)
+            mcts = engine(game_state=TicTacToe.get_state(almost_won), expansion=expansion, solver=True)
+            result = mcts.search(500, stop_early=False)
+            assert result.best_move == (2, 2) and result.solved == 1
+
+def test_lazy_expansion_needs_rollouts():
+    game = TicTacToe.get_state(np.zeros((3, 3)))
+    with pytest.raises(ValueError):
+        MCGS(game_state=game, expansion=Lazy(), evaluator=RolloutEvaluator())
+    with pytest.raises(ValueError):
+        TreeParallelMCTS(game_state=game, expansion=Lazy())
@@ -0,0 +1,53 @@
+import random
+import numpy as np
+from cache import StateCache
+from connect4 import Connect4State
+from tictactoe import TicTacToe
+from mcts import MCTS
+from mcgs import MCGS
+from nodestore import CompactMCTS
+from evaluate import RolloutEvaluator
+from expansion import Lazy
+from instrument import instrument
+
+def test_stats_count_every_phase():
+    for engine in (MCTS, MCGS):
+        mcts = engine(game_state=TicTacToe.get_state(np.zeros((3, 3)), cache=StateCache()), rng=random.Random(0))
+        inst = instrument(mcts)
+        for _ in range(50):
+            mcts.run()
+        stats = inst.stats()
+        assert stats['playouts'] == 50 and sum(stats['path_length'].values()) == 50
+        assert all(stats['time'][phase] > 0 for phase in ('select', 'expand', 'rollout', 'backprop'))
+        assert abs(sum(v for k, v in stats['time'].items() if k != 'total') - stats['time']['total']) < 1e-9
+        # eager expansion rolls out every new child as well as the selected leaf
+        assert sum(stats['rollout_length'].values()) >= 50 and stats['expansions'] > 0
+        assert stats['nodes_created'] == len(mcts.nodes) - 1 == stats['nodes'] - 1
+        assert 0 < stats['cache_hit_rate'] <= 1
+        assert (stats['parent_updates'] > 0) == (engine is MCGS)
+
+def test_callback_every_k_playouts():
+    mcts = MCGS(game_state=Connect4State(state=np.zeros((6, 7))), expansion=Lazy())
+    snapshots = []
+    instrument(mcts, every=10, callback=snapshots.append)
+    mcts.search(35, stop_early=False)
+    assert [stats['playouts'] for stats in snapshots] == [10, 20, 30]
+
+def test_detach_restores_the_engine():
+    mcts = MCTS(game_state=Connect4State(state=np.zeros((6, 7))), evaluator=RolloutEvaluator(4), rng=random.Random(0))
+    rng, evaluator = mcts.rng, mcts.evaluator
+    with instrument(mcts) as inst:
+        mcts.search(20, stop_early=False)
+        assert inst.stats()['time']['evaluate'] > 0 and inst.stats()['expansions'] > 0
+    assert not {'run', 'select', 'expand', 'rollout', 'get_node'} & vars(mcts).keys()
+    assert mcts.rng is rng and mcts.evaluator is evaluator
+    mcts.search(5, stop_early=False)
+    assert inst.stats()['playouts'] == 20
+
+def test_compact_engines():
+    mcts = CompactMCTS(game_state=Connect4State(state=np.zeros((6, 7))))
+    inst = instrument(mcts)
+    mcts.search(20, stop_early=False)
+    stats = inst.stats()
+    assert stats['expansions'] > 0 and stats['fan_out'] == {7: stats['expansions']}
+    assert stats['nodes_created'] == len(mcts.nodes) - 1 > 0
@@ -0,0 +1,34 @@
+import random
+import numpy as np
+from connect4 import Connect4State
+from tictactoe import TicTacToe
+from mcgs import MCGS
+
+class CheckedMCGS(MCGS):
+    """MCGS that checks every incremental update against the full re-summing formula."""
+    def backprop(tree, path, reward):
+        super().backprop(path, reward)
+        reward = reward[path[-1].game_state.player]
+        for node in reversed(path):
+            N = 1 + sum(node.child_to_edge_visits.values())
+            Q = -(1/N)*(reward + sum(child.Q * edge_visits for (child, edge_visits) in node.child_to_edge_visits.items()))
+            assert node.N == N
+            assert abs(node.Q - Q) < 1e-9
+            reward = -reward
+
+def assert_running_sums_match(mcgs: MCGS):
+    for node in mcgs.nodes.values():
+        assert node.edge_visits == sum(node.child_to_edge_visits.values())
+        expected = sum(child.Q * edge_visits for (child, edge_visits) in node.child_to_edge_visits.items())
+        assert abs(node.child_value - expected) < 1e-9
+        for child in node.children:
+            assert node in child.parents
+
+def test_incremental_backprop_matches_full_sums():
+    roots = [TicTacToe.get_state(np.zeros((3, 3))), Connect4State(state=np.zeros((6, 7)))]
+    for seed in range(5):
+        random.seed(seed)
+        for root in roots:
+            mcgs = CheckedMCGS(game_state=root)
+            mcgs.search(300)
+            assert_running_sums_match(mcgs)
@@ -0,0 +1,55 @@
+import random
+import numpy as np
+from connect4 import Connect4State
+from tictactoe import TicTacToe
+from mcts import MCTS
+from mcgs import MCGS
+from nodestore import CompactMCTS, CompactMCGS
+
+def test_compact_engines_match_object_engines():
+    roots = [TicTacToe.get_state(np.zeros((3, 3))), Connect4State(state=np.zeros((6, 7)))]
+    for root in roots:
+        for engine, compact in ((MCTS, CompactMCTS), (MCGS, CompactMCGS)):
+            random.seed(0)
+            reference = engine(game_state=root)
+            reference.search(200)
+            random.seed(0)
+            mcts = compact(game_state=root, capacity=16)  # small capacity to exercise growth
+            mcts.search(200)
+            assert len(mcts.nodes) == len(reference.nodes)
+            assert mcts.root.N == reference.root.N
+            assert mcts.root.results == reference.root.results
+            for child, expected in zip(mcts.root.children, reference.root.children):
+                assert child.game_state == expected.game_state
+                assert abs(child.Q - expected.Q) < 1e-9
+
+def test_compact_mcts_chooses_winning_move():
+    one_move_to_win = np.array([
+        [1,-1,0],
+        [1,1,-1],
+        [-1,0,0]])
+    mcts = CompactMCTS(game_state=TicTacToe.get_state(one_move_to_win))
+    mcts.search(50)
+    winning_move = max(mcts.root.children, key=lambda child: child.Q)
+    assert winning_move.game_state.state[2,2] == 1
+
+def test_compact_advance_matches_object_engines():
+    for engine, compact in ((MCTS, CompactMCTS), (MCGS, CompactMCGS)):
+        random.seed(0)
+        reference = engine(game_state=Connect4State(state=np.zeros((6, 7))))
+        reference.search(300, stop_early=False)
+        random.seed(0)
+        mcts = compact(game_state=Connect4State(state=np.zeros((6, 7))), capacity=16)
+        mcts.search(300, stop_early=False)
+        for action in (3, 2):
+            reference.advance(action)
+            root = mcts.advance(action)
+            assert root.game_state == reference.root.game_state and root.N == reference.root.N
+            assert len(mcts.nodes) == len(reference.nodes) == mcts.store.size
+        random.seed(1)
+        reference.search(200, stop_early=False)
+        random.seed(1)
+        mcts.search(200, stop_early=False)
+        assert mcts.root.N == reference.root.N and mcts.root.results == reference.root.results
+        for child, expected in zip(mcts.root.children, reference.root.children):
+            assert child.game_state == expected.game_state and abs(child.Q - expected.Q) < 1e-9
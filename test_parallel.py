@@ -0,0 +1,78 @@
+import pickle
+import time
+import numpy as np
+import pytest
+from connect4 import Connect4, Connect4State
+from tictactoe import TicTacToe
+from mcts import MCTS
+from mcgs import MCGS
+from parallel import RootParallel, TreeParallelMCTS
+from arena import Player, play_game
+
+def test_states_pickle_without_their_cache():
+    for game in (Connect4State(state=np.zeros((6, 7))).transition(3),
+                 TicTacToe.get_state(np.zeros((3, 3))).transition((1, 1))):
+        data = pickle.dumps(game)
+        assert b'StateCache' not in data
+        assert pickle.loads(data) == game
+
+def test_root_parallel_merges_worker_statistics():
+    one_move_to_win = np.array([
+        [1,-1,0],
+        [1,1,-1],
+        [-1,0,0]])
+    almost_won = TicTacToe.get_state(one_move_to_win)
+    with RootParallel(engine=MCGS, workers=2, seed=0) as search:
+        for _ in range(2):  # the pool is reused across searches
+            stats = search.search(almost_won, 50)
+            assert set(stats.N) == {(0, 2), (2, 1), (2, 2)}
+            assert stats.best_action == (2, 2)
+            assert stats.Q[(2, 2)] == max(stats.Q.values())
+
+def test_root_parallel_blocks_connect4_win():
+    board = np.array([
+        [0., 0., 0., 0., 0., 0., 0.],
+        [0., 0., 0., 1., 0., 0., 0.],
+        [0., 0., 0., -1., 0., 0., 0.],
+        [0., 0., -1., 1., 0., 0., 0.],
+        [0., 0., -1, 1., 1., 0., 0.],
+        [0., 0., -1, 1, -1, 0., 0.]])
+    with RootParallel(engine=MCTS, workers=2, seed=1) as search:
+        stats = search.search(Connect4.get_state(board), 200)
+    assert sum(stats.N.values()) >= 2 * 200
+    assert stats.best_action == 2
+
+def test_tree_parallel_removes_all_virtual_loss():
+    for batch_size in (1, 4):
+        mcts = TreeParallelMCTS(game_state=Connect4State(state=np.zeros((6, 7))), workers=4, batch_size=batch_size)
+        mcts.search(200)
+        for node in mcts.nodes.values():
+            assert node.N == sum(node.results.values())
+            assert node.W == node.results[-1] - node.results[1]
+
+def test_tree_parallel_rejects_slow_rollouts():
+    game = Connect4State(state=np.zeros((6, 7)))
+    with pytest.raises(ValueError):
+        TreeParallelMCTS(game_state=game, fast_rollout=False)
+    TreeParallelMCTS(game_state=game, fast_rollout=False, batch_size=4).search(20)  # batched rollouts intern nothing
+
+def test_tree_parallel_picks_winning_move():
+    one_move_to_win = np.array([
+        [1,-1,0],
+        [1,1,-1],
+        [-1,0,0]])
+    mcts = TreeParallelMCTS(game_state=TicTacToe.get_state(one_move_to_win), workers=4)
+    mcts.search(50)
+    winning_move = max(mcts.root.children, key=lambda child: child.Q)
+    assert winning_move.game_state.state[2,2] == 1
+
+def test_tree_parallel_search_honours_budgets():
+    mcts = TreeParallelMCTS(game_state=Connect4State(state=np.zeros((6, 7))), workers=4)
+    result = mcts.search(300, stop_early=False)
+    assert result.playouts == 300 and result.stopped_by == 'playouts' and result.best_move in range(7)
+    result = mcts.search(max_nodes=len(mcts.nodes) + 50, check_every=8)
+    assert result.stopped_by == 'max_nodes' and result.playouts < 300
+    result = mcts.search(deadline=time.monotonic() + .05, stop_early=False)
+    assert result.stopped_by == 'deadline'
+    game = play_game(0, Player(TreeParallelMCTS, 30, workers=2), Player(MCTS, 30), TicTacToe.get_state(np.zeros((3, 3))), 0)
+    assert game['score'] in (1, 0, -1)
@@ -0,0 +1,120 @@
+import random
+import numpy as np
+from cache import StateCache
+from connect4 import Connect4
+from tictactoe import TicTacToe
+from mcts import MCTS
+from mcgs import MCGS
+from rollout import TacticalRollout
+
+def test_scratch_rollout_matches_interned_rollout():
+    roots = [Connect4.get_state(np.zeros((6, 7))), TicTacToe.get_state(np.zeros((3, 3)))]
+    for root in roots:
+        for engine in (MCTS, MCGS):
+            tree = engine(game_state=root)
+            for seed in range(50):
+                random.seed(seed)
+                fast = tree.rollout(tree.root)
+                tree.fast_rollout = False
+                random.seed(seed)
+                slow = tree.rollout(tree.root)
+                tree.fast_rollout = True
+                assert fast == slow
+
+def test_scratch_rollout_does_not_touch_the_cache():
+    cache = StateCache()
+    mcts = MCTS(game_state=Connect4.get_state(np.zeros((6, 7)), cache=cache))
+    misses = cache.misses
+    for _ in range(100):
+        mcts.rollout(mcts.root)
+    assert cache.misses == misses and len(cache) == 1
+
+def test_batch_rollout_scores_finished_boards():
+    c4 = np.zeros((6, 7))
+    c4[5, :4] = 1
+    assert Connect4.get_state(c4).batch_rollout(np.stack([c4, -c4])).tolist() == [1, -1]
+    draw = np.array([[1, -1, 1], [1, -1, -1], [-1, 1, 1]])
+    assert TicTacToe.get_state(draw).batch_rollout(draw[None]).tolist() == [0]
+
+def test_batch_rollout_matches_random_playout_odds():
+    results = TicTacToe.get_state(np.zeros((3, 3))).batch_rollout(
+        np.zeros((20000, 3, 3)), np.random.default_rng(0))
+    assert abs(np.mean(results == 1) - 0.585) < 0.02   # first player wins ~58.5% of random games
+    assert abs(np.mean(results == 0) - 0.127) < 0.02
+
+def test_batched_search_counts_every_playout():
+    for engine in (MCTS, MCGS):
+        mcts = engine(game_state=TicTacToe.get_state(np.zeros((3, 3))), batch_size=4)
+        mcts.search(1)
+        assert sum(mcts.root.results.values()) == 10 * 4
+
+def test_batched_search_picks_winning_move():
+    one_move_to_win = np.array([
+        [1,-1,0],
+        [1,1,-1],
+        [-1,0,0]])
+    for engine in (MCTS, MCGS):
+        mcts = engine(game_state=TicTacToe.get_state(one_move_to_win), batch_size=16)
+        mcts.search(20)
+        children = mcts.root.children if engine is MCTS else mcts.root.child_to_edge_visits
+        winning_move = max(children, key=lambda child: child.Q)
+        assert winning_move.game_state.state[2,2] == 1
+
+def test_winning_action_matches_brute_force():
+    rng = random.Random(0)
+    for root in (Connect4.get_state(np.zeros((6, 7))), TicTacToe.get_state(np.zeros((3, 3)))):
+        for _ in range(200):
+            game = root
+            for _ in range(rng.randrange(9)):
+                if game.is_terminal:
+                    break
+                game = game.transition(rng.choice(game.all_legal_actions))
+            if game.is_terminal:
+                continue
+            sim = game.scratch()
+            wins = [action for action in game.all_legal_actions if game.transition(action).is_terminal
+                    and game.transition(action).result[game.player] == 1]
+            assert (sim.winning_action(game.player) is None) == (not wins)
+            assert sim.winning_action(game.player) in wins or not wins
+            assert -1 <= sim.heuristic() <= 1
+
+def test_tactical_rollouts_block_and_win():
+    O_can_win = Connect4.get_state(np.array([
+        [0., 0., 0., 0., 0., 0., 0.],
+        [0., 0., 0., 1., 0., 0., 0.],
+        [0., 0., 0., -1., 0., 0., 0.],
+        [0., 0., -1., 1., 0., 0., 0.],
+        [0., 0., -1, 1., 1., 0., 0.],
+        [0., 0., -1, 1, -1, 0., 0.]]))
+    for engine in (MCTS, MCGS):
+        tree = engine(game_state=O_can_win, rollout_policy=TacticalRollout(), rng=random.Random(0))
+        assert tree.search(30, stop_early=False).best_move == 2
+    for seed in range(10):  # X's first reply is always the block on column 2, height 3
+        sim = O_can_win.scratch()
+        TacticalRollout(cutoff=1)(sim, random.Random(seed))
+        assert sim.x_bits & ~O_can_win.x_bits == 1 << (2 * 7 + 3)
+
+def test_cutoff_bounds_rollout_length():
+    policy = TacticalRollout(cutoff=8)
+    mcts = MCTS(game_state=Connect4.get_state(np.zeros((6, 7))), rollout_policy=policy, rng=random.Random(0))
+    mcts.search(100, stop_early=False)
+    stats = policy.stats()
+    assert stats['rollouts'] > 100 and stats['mean_length'] <= 8 and stats['mean_seconds'] > 0
+    default = MCTS(game_state=Connect4.get_state(np.zeros((6, 7))), rng=random.Random(0))
+    default.search(100, stop_early=False)
+    assert default.rollout_policy.stats()['mean_length'] > 8
+
+def test_even_cutoffs_are_draws():
+    for game in (Connect4.get_state(np.zeros((6, 7))), TicTacToe.get_state(np.zeros((3, 3)))):
+        for seed in range(10):
+            assert TacticalRollout(cutoff=0)(game.scratch(), random.Random(seed)) == {1: 0, -1: 0}
+    mcts = MCTS(game_state=TicTacToe.get_state(np.zeros((3, 3))), rollout_policy=TacticalRollout(cutoff=2),
+                rng=random.Random(0))
+    mcts.search(200, stop_early=False)
+    assert mcts.root.results[0] > 0
+
+def test_seeded_batched_search_is_reproducible():
+    for engine in (MCTS, MCGS):
+        results = [engine(game_state=Connect4.get_state(np.zeros((6, 7))), rng=random.Random(0),
+                          batch_size=4).search(30, stop_early=False).visits for _ in range(2)]
+        assert results[0] == results[1]
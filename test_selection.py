@@ -0,0 +1,50 @@
+import random
+import numpy as np
+from tictactoe import TicTacToe
+from mcts import MCTS
+from mcgs import MCGS
+from nodestore import CompactMCTS
+from selection import PUCT, UCB1, UCB1Tuned
+
+class Child:
+    def __init__(child, N, wins, losses):
+        child.N, child.P = N, 1.
+        child.results = {1: wins, -1: losses, 0: N - wins - losses}
+        child.Q = (wins - losses) / N
+
+def test_loop_and_array_kernels_agree():
+    random.seed(0)
+    for _ in range(100):
+        children = []
+        for _ in range(random.randint(1, 20)):
+            N = random.randint(1, 50)
+            wins = random.randint(0, N)
+            children.append(Child(N, wins, random.randint(0, N - wins)))
+        parent_N = sum(child.N for child in children) + 1
+        Q = np.array([child.Q for child in children])
+        N = np.array([child.N for child in children])
+        P = np.ones(len(children))
+        results = np.array([[c.results[1], c.results[-1], c.results[0]] for c in children])
+        for scorer in (PUCT(), UCB1(), UCB1Tuned()):
+            chosen = scorer.best(parent_N, children, Q.tolist(), N.tolist(), P.tolist())
+            scores = scorer.array_scores(parent_N, Q, N, P, results)
+            assert scores[children.index(chosen)] == scores.max()
+
+def test_puct_matches_the_per_child_formula():
+    random.seed(1)
+    mcts = MCTS(game_state=TicTacToe.get_state(np.zeros((3, 3))))
+    mcts.search(100)
+    node = mcts.root
+    assert mcts.best_child(node) is max(node.children, key=lambda child: mcts.PUCT(node, child))
+
+def test_every_scorer_finds_the_winning_move():
+    one_move_to_win = np.array([
+        [1,-1,0],
+        [1,1,-1],
+        [-1,0,0]])
+    for scorer in (PUCT(), UCB1(), UCB1Tuned()):
+        for engine in (MCTS, MCGS, CompactMCTS):
+            mcts = engine(game_state=TicTacToe.get_state(one_move_to_win), scorer=scorer)
+            mcts.search(50)
+            winning_move = max(mcts.root.children, key=lambda child: child.Q)
+            assert winning_move.game_state.state[2,2] == 1
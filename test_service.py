@@ -0,0 +1,63 @@
+import asyncio
+import json
+import numpy as np
+from connect4 import Connect4
+from tictactoe import TicTacToe
+from service import AnalysisService
+
+one_move_to_win = np.array([
+    [0., 0., 0., 0., 0., 0., 0.],
+    [0., 0., 0., 0., 0., 0., 0.],
+    [0., 0., 0., 0., 0., 0., 0.],
+    [0., 0., 0., 1., 0., 0., 0.],
+    [0., 0., -1, 1., 0., 0., 0.],
+    [0., 0., -1, 1, -1, 0., 0.]])
+
+async def collect(service, game_state, playouts):
+    return [answer async for answer in service.analyze(game_state, playouts)]
+
+def test_streams_progressively_and_finds_the_win():
+    service = AnalysisService(slice_playouts=100)
+    answers = asyncio.run(collect(service, Connect4.get_state(one_move_to_win), 500))
+    assert [answer.playouts for answer in answers] == [100, 200, 300, 400, 500]
+    assert all(answer.stopped_by == 'slice' for answer in answers[:-1]) and answers[-1].stopped_by == 'playouts'
+    assert answers[-1].best_move == 3
+
+def test_identical_requests_share_one_search():
+    async def main():
+        service = AnalysisService(slice_playouts=50)
+        game = Connect4.get_state(np.zeros((6, 7)))
+        first, second = await asyncio.gather(collect(service, game, 200), collect(service, game, 400))
+        return service, first, second
+    service, first, second = asyncio.run(main())
+    assert len(service.graphs) == 1 and not service.jobs
+    assert first[-1].playouts == 200 and second[-1].playouts == 400
+    # the second request saw the slices of the one shared search, not a search of its own
+    assert [answer.playouts for answer in second] == [50, 100, 150, 200, 250, 300, 350, 400]
+
+def test_follow_up_requests_reuse_warm_graphs():
+    async def main():
+        service = AnalysisService(max_graphs=2, slice_playouts=100)
+        game = TicTacToe.get_state(np.zeros((3, 3)))
+        await service.best(game, 300)
+        again = await collect(service, game, 300)  # already searched: answered at once
+        child = game.transition((1, 1))
+        warm = service.graphs[game].tree.nodes[service.graphs[game].tree.node_key(child)].N
+        follow_up = await service.best(child, 100)
+        nodes = len(service.graphs[child].tree.nodes)
+        for i in range(3):  # fill the pool with unrelated positions
+            await service.best(Connect4.get_state(np.zeros((6, 7 + i))), 100)
+        return service, again, warm, follow_up, nodes
+    service, again, warm, follow_up, nodes = asyncio.run(main())
+    assert len(again) == 1 and again[0].playouts == 300
+    assert warm > 0 and follow_up.playouts == 100 and nodes > 100  # advanced, kept its subgraph
+    assert len(service.graphs) == 2
+
+def test_handle_returns_json_ready_answers():
+    async def main():
+        service = AnalysisService(slice_playouts=100)
+        request = {'game': 'tictactoe', 'board': [[1, -1, 0], [1, 1, -1], [-1, 0, 0]], 'playouts': 200}
+        return [answer async for answer in service.handle(request)]
+    answers = asyncio.run(main())
+    assert [answer['final'] for answer in answers] == [False, True]
+    assert json.loads(json.dumps(answers[-1]))['best_move'] == [2, 2]
@@ -0,0 +1,83 @@
+import random
+import numpy as np
+import pytest
+from connect4 import Connect4State
+from tictactoe import TicTacToe
+from mcts import MCTS
+from mcgs import MCGS
+from nodestore import CompactMCTS, CompactMCGS
+from parallel import TreeParallelMCTS
+from evaluate import TableEvaluator
+from solver import ValueTable, solve
+
+def test_solver_proves_a_win_in_one():
+    almost_won = TicTacToe.get_state(np.array([
+        [1,-1,0],
+        [1,1,-1],
+        [-1,0,0]]))
+    for engine in (MCTS, MCGS):
+        mcts = engine(game_state=almost_won, solver=True)
+        result = mcts.search(5000, stop_early=False)
+        assert result.stopped_by == 'solved' and result.playouts < 5000
+        assert result.solved == 1 and result.best_move == (2, 2)
+
+def test_solver_stops_searching_a_solved_position():
+    cant_lose = np.array([
+    [ 0, -1, 0, -1,  1, -1,  0],
+    [-1,  1, 0,  1, -1,  1, -1],
+    [-1,  1, 1,  1, -1,  -1, 1],
+    [ 1, -1,  1, -1,  1, -1,  1],
+    [ 1, -1,  1, -1,  1, -1,  1],
+    [-1,  1, -1,  1, -1,  1, -1]
+    ])
+    mcts = MCTS(game_state=Connect4State(state=cant_lose), solver=True)
+    result = mcts.search(1000, stop_early=False)
+    assert result.stopped_by == 'solved' and result.playouts < 100
+    assert result.solved in (0, 1) and mcts.root.results[-1] == 0
+
+def test_solver_proves_tictactoe_is_a_draw():
+    mcgs = MCGS(game_state=TicTacToe.get_state(np.zeros((3, 3))), solver=True)
+    result = mcgs.search(100_000, stop_early=False)
+    assert result.stopped_by == 'solved' and result.solved == 0
+
+def test_solved_best_move_keeps_the_proven_value():
+    table = solve(TicTacToe.get_state(np.zeros((3, 3))))
+    game = TicTacToe.get_state(np.array([[0, 1, 0], [1, -1, 0], [0, 0, 0]]))
+    for seed in range(40):
+        random.seed(seed)
+        result = MCGS(game_state=game, solver=True).search(100_000, stop_early=False)
+        assert result.solved == table.value(game) == 0
+        assert result.best_move in [action for action in game.all_legal_actions
+                                    if -table.value(game.transition(action)) == result.solved]
+
+def test_solver_is_off_by_default():
+    mcts = MCTS(game_state=TicTacToe.get_state(np.zeros((3, 3))))
+    result = mcts.search(200, stop_early=False)
+    assert result.stopped_by == 'playouts' and result.solved is None
+
+def test_value_table_solves_tictactoe(tmp_path):
+    empty = TicTacToe.get_state(np.zeros((3, 3)))
+    table = solve(empty)
+    assert len(table) == 5478 and table.lookup(empty) == (0, 9)
+    almost_won = TicTacToe.get_state(np.array([[1, -1, 0], [1, 1, -1], [-1, 0, 0]]))
+    assert table.lookup(almost_won) == (1, 1) and table.best_actions(almost_won) == [(2, 2)]
+    table.save(tmp_path / 'tictactoe.npz')
+    loaded = ValueTable.load(tmp_path / 'tictactoe.npz')
+    assert loaded.shape == (3, 3) and loaded.entries == table.entries
+    assert Connect4State(state=np.zeros((6, 7))) not in loaded
+
+def test_table_evaluator_is_exact():
+    table = solve(TicTacToe.get_state(np.zeros((3, 3))))
+    for engine in (MCTS, MCGS):
+        game = TicTacToe.get_state(np.zeros((3, 3)))
+        values, priors = TableEvaluator(table)([game])
+        assert values[0] == 0 and np.isclose(priors.sum(), 1.) and priors[0, game.action_index((1, 1))] > 0
+        mcts = engine(game_state=game, evaluator=TableEvaluator(table), leaf_batch=4)
+        result = mcts.search(200, stop_early=False)
+        assert result.best_move in table.best_actions(game)
+
+def test_engines_without_proofs_reject_the_solver():
+    game = TicTacToe.get_state(np.zeros((3, 3)))
+    for engine in (CompactMCTS, CompactMCGS, TreeParallelMCTS):
+        with pytest.raises(ValueError):
+            engine(game_state=game, solver=True)
@@ -0,0 +1,59 @@
+import random
+import numpy as np
+from connect4 import Connect4State
+from tictactoe import TicTacToe
+from mcts import MCTS
+from mcgs import MCGS
+
+def all_states(state) -> set:
+    seen, stack = set(), [state]
+    while stack:
+        state = stack.pop()
+        if state not in seen:
+            seen.add(state)
+            stack.extend(state.transition(action) for action in state.all_legal_actions)
+    return seen
+
+def test_tictactoe_has_765_positions_up_to_symmetry():
+    states = all_states(TicTacToe.get_state(np.zeros((3, 3))))
+    assert len(states) == 5478
+    assert len({state.canonical() for state in states}) == 765
+
+def test_tictactoe_canonical_key_is_the_smallest_image():
+    game = TicTacToe.get_state(np.array([[1, -1, 0], [0, 1, 0], [0, 0, 0]]))
+    images = [np.rot90(board, turns) for board in (game.state, game.state.T) for turns in range(4)]
+    assert game.canonical() == min(TicTacToe.get_state(image).key for image in images)
+
+def test_connect4_mirror_images_share_a_key():
+    game = Connect4State(state=np.zeros((6, 7)))
+    left, right = game.transition(1).transition(2), game.transition(5).transition(4)
+    assert left is not right and left.canonical() == right.canonical() == min(left.key, right.key)
+
+def test_symmetric_search_merges_equivalent_nodes():
+    empty = TicTacToe.get_state(np.zeros((3, 3)))
+    for engine in (MCTS, MCGS):
+        random.seed(0)
+        mcts = engine(game_state=empty, symmetry=True)
+        mcts.search(300, stop_early=False)
+        assert len(mcts.root.children) == 3  # corner, edge, centre
+        assert set(mcts.children_by_action(mcts.root)) == set(empty.all_legal_actions)
+        assert len(mcts.nodes) == len({node.game_state.canonical() for node in mcts.nodes.values()})
+
+def test_advance_reports_real_actions_under_symmetry():
+    empty = TicTacToe.get_state(np.zeros((3, 3)))
+    mcgs = MCGS(game_state=empty, symmetry=True)
+    mcgs.search(300, stop_early=False)
+    mcgs.advance((2, 2))  # merged with whichever corner was expanded first
+    assert mcgs.root.game_state is empty.transition((2, 2))
+    result = mcgs.search(300, stop_early=False)
+    assert set(result.visits) == set(mcgs.root.game_state.all_legal_actions)
+
+def test_connect4_graph_shrinks():
+    empty = Connect4State(state=np.zeros((6, 7)))
+    sizes = []
+    for symmetry in (False, True):
+        random.seed(0)
+        mcgs = MCGS(game_state=empty, symmetry=symmetry)
+        mcgs.search(1000, stop_early=False)
+        sizes.append(len({node.game_state.canonical() for node in mcgs.nodes.values()}) / len(mcgs.nodes))
+    assert sizes[0] < 0.8 and sizes[1] == 1.
@@ -0,0 +1,21 @@
+import random
+import numpy as np
+from tictactoe import TicTacToe, TicTacToeState
+
+def test_incremental_transition_matches_full_scan():
+    random.seed(0)
+    for _ in range(200):
+        game = TicTacToe.get_state(np.zeros((3, 3)))
+        while not game.is_terminal:
+            game = game.transition(random.choice(game.all_legal_actions))
+            rescanned = TicTacToeState(state=game.state.copy())
+            assert game.key == rescanned.key
+            assert game.result == rescanned.result
+            assert game.player == rescanned.player
+            assert game.all_legal_actions == rescanned.all_legal_actions
+
+def test_scratch_starts_from_the_bitmasks():
+    game = TicTacToe.get_state(np.array([[1, -1, 0], [0, 1, 0], [-1, 0, 0]]))
+    sim = game.scratch()
+    assert (sim.rows, sim.cols, sim.diags) == ([0, 1, -1], [0, 0, 0], [2, 0])
+    assert sim.winning_action(1) == (2, 2) and sim.winning_action(-1) is None
@@ -0,0 +1,51 @@
+import csv
+import io
+import json
+import random
+import numpy as np
+from connect4 import Connect4State
+from mcts import MCTS
+from mcgs import MCGS
+from visualize import walk, write_dot, write_edges, export
+
+def search(engine, n=300):
+    mcts = engine(game_state=Connect4State(state=np.zeros((6, 7))), rng=random.Random(0))
+    mcts.search(n, stop_early=False)
+    return mcts
+
+def test_walk_visits_each_node_once_without_recursion():
+    mcgs = search(MCGS, 2000)
+    nodes = list(walk(mcgs.root))
+    assert len(nodes) == len(mcgs.nodes)
+    assert [node_id for node_id, *_ in nodes] == list(range(len(nodes)))
+    edges = sum(len(edges) for *_, edges in nodes)
+    assert edges == sum(len(node.children) for node in mcgs.nodes.values())
+
+def test_walk_filters():
+    mcts = search(MCTS)
+    for node_id, node, depth, edges in walk(mcts.root, max_depth=2, min_visits=5, top_k=2):
+        assert depth <= 2 and len(edges) <= 2 and (depth < 2 or not edges)
+        assert all(visits >= 5 and child.N == visits for _, child, visits in edges)
+        if depth < 2:
+            kept = sorted((visits for *_, visits in edges), reverse=True)
+            assert kept == sorted((child.N for child in node.children if child.N >= 5), reverse=True)[:2]
+
+def test_edge_lists_carry_edge_visits():
+    mcgs = search(MCGS)
+    file = io.StringIO()
+    write_edges(mcgs.root, file, 'csv', max_depth=1)
+    rows = list(csv.DictReader(io.StringIO(file.getvalue())))
+    assert sorted(int(row['visits']) for row in rows) == sorted(mcgs.root.child_to_edge_visits.values())
+    file = io.StringIO()
+    write_edges(mcgs.root, file, 'json', max_depth=1)
+    assert [int(row['visits']) for row in rows] == [edge['visits'] for edge in json.loads(file.getvalue())]
+
+def test_dot_export(tmp_path):
+    mcts = search(MCTS)
+    export(mcts.root, tmp_path / 'tree.dot', top_k=1, labels=False)
+    lines = (tmp_path / 'tree.dot').read_text().splitlines()
+    assert lines[0] == 'digraph game_tree {' and lines[-1] == '}'
+    assert sum('->' in line for line in lines) == sum(1 for line in lines if '[label="N=' in line) - 1
+    file = io.StringIO()
+    write_dot(mcts.root, file, max_depth=0)
+    assert '->' not in file.getvalue() and 'player 1' in file.getvalue()
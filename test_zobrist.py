@@ -0,0 +1,54 @@
+import gc
+import random
+import numpy as np
+import connect4
+import tictactoe
+from cache import StateCache
+from connect4 import Connect4
+from tictactoe import TicTacToe
+from mcts import MCTS
+from zobrist import zobrist_hash, zobrist_table
+
+def zeroed_table(cells: int) -> tuple:
+    return (0,) * cells, (0,) * cells
+
+def test_incremental_keys_match_full_hashes():
+    random.seed(0)
+    for game, cells in ((Connect4.get_state(np.zeros((6, 7))), 7 * (6 + 1)), (TicTacToe.get_state(np.zeros((3, 3))), 9)):
+        while not game.is_terminal:
+            game = game.transition(random.choice(game.all_legal_actions))
+            assert game.zobrist == zobrist_hash(game.x_bits, game.o_bits, zobrist_table(cells))
+
+def test_colliding_keys_still_intern_distinct_positions(monkeypatch):
+    monkeypatch.setattr(tictactoe, 'zobrist_table', zeroed_table)
+    cache = StateCache()
+    root = TicTacToe.get_state(np.zeros((3, 3)), cache=cache)
+    seen, stack = {}, [root]  # keyed by the exact position: a set of states would be quadratic here
+    while stack:
+        state = stack.pop()
+        if state.key not in seen:
+            seen[state.key] = state
+            stack.extend(state.transition(action) for action in state.all_legal_actions)
+    assert len(seen) == 5478 and len(cache) == 5478
+    assert cache.collisions == 5477
+    for state in seen.values():
+        assert TicTacToe.get_state(state.state, cache=cache) is state
+    a = root.transition((0, 0)).transition((1, 1)).transition((2, 2))
+    assert a is root.transition((2, 2)).transition((1, 1)).transition((0, 0))
+
+def test_state_stored_under_its_exact_key_keeps_its_identity(monkeypatch):
+    monkeypatch.setattr(connect4, 'zobrist_table', zeroed_table)
+    cache = StateCache(max_size=0)
+    root = Connect4.get_state(np.zeros((6, 7)), cache=cache)
+    a, b = root.transition(0), root.transition(1)  # a takes the shared slot, b its exact key
+    assert cache.collisions == 2  # the root took the slot first
+    del root, a
+    gc.collect()
+    assert Connect4.get_state(np.zeros((6, 7)), cache=cache).transition(1) is b
+
+def test_search_with_colliding_keys(monkeypatch):
+    monkeypatch.setattr(connect4, 'zobrist_table', zeroed_table)
+    random.seed(0)
+    mcts = MCTS(game_state=Connect4.get_state(np.zeros((6, 7)), cache=StateCache()))
+    mcts.search(100, stop_early=False)
+    assert len({node.game_state.key for node in mcts.nodes.values()}) == len(mcts.nodes)
@@ -1,93 +1,305 @@
-import numpy as np
-from itertools import product
-
-class TicTacToeState:
-    """A tictactoe state is the state of a tic tac toe board. Tictactoe is perfect information."""
-    __slots__ = ('state','player','all_legal_actions','result','is_terminal')
-    
-    def __init__(game, state: np.ndarray):
-        game.state: np.ndarray = state
-        game.player = 1 if np.sum(state) <= 0 else -1
-        game.result = game.game_result()
-        game.is_terminal = True if game.result is not None else False
-        game.all_legal_actions: list[tuple] = [action for 
-                                                action in product(*[range(dim) for dim in state.shape])
-                                                if state[action] == 0] if not game.is_terminal else []
-    
-    def transition(game, action: tuple) -> 'TicTacToeState':
-        new_state = game.state.copy()
-        new_state[action] = game.player
-        return TicTacToe.get_state(new_state)
-    
-    def game_result(game) -> int | None:
-        """ this property should return 
-        1 if player #1 wins 
-        -1 if player #2 wins 
-        0 if there is a draw 
-        None if result is unknown
-        """
-        board = game.state
-        three_in_a_row = 3
-        rowsum = np.sum(board, 0)
-        colsum = np.sum(board, 1)
-        diag_sum_tl = board.trace()
-        diag_sum_tr = board[::-1].trace()
-
-        player_one_wins = any(rowsum == three_in_a_row)
-        player_one_wins |= any(colsum == three_in_a_row)
-        player_one_wins |= (diag_sum_tl == three_in_a_row)
-        player_one_wins |= (diag_sum_tr == three_in_a_row)
-
-        if player_one_wins:
-            return {1:1, -1:-1}
-
-        player_two_wins = any(rowsum == -three_in_a_row)
-        player_two_wins |= any(colsum == -three_in_a_row)
-        player_two_wins |= (diag_sum_tl == -three_in_a_row)
-        player_two_wins |= (diag_sum_tr == -three_in_a_row)
-
-        if player_two_wins:
-            return {1:-1, -1:1}
-
-        if np.all(board != 0):
-            return {1:0, -1:0}
-
-        return None
-    
-    def __str__(game):
-        return str(game.state)
-    
-    def __hash__(game):
-        return hash(tuple(game.state.flat)) 
-
-    def __eq__(game, other):
-        if isinstance(other, TicTacToeState):
-            return np.array_equal(game.state, other.state)
-        return False
-
-class TicTacToe:
-    """Class to manage TicTacToe states and cache."""
-    game_states: dict[np.ndarray, TicTacToeState]= {}
-
-    @classmethod
-    def get_state(cls, state: np.ndarray) -> TicTacToeState:
-        state_tuple = tuple(state.flat)
-        if state_tuple not in cls.game_states:
-            cls.game_states[state_tuple] = TicTacToeState(state)
-        return cls.game_states[state_tuple]
-
-    @classmethod
-    def reset_cache(cls):
-        cls.game_states = {}
-
-def test_tic_tac_toe():
-    def all_states(state: TicTacToeState):
-        """Generate all states of tictactoe. The number of valid states is 5478. """
-        yield state   
-        for action in state.all_legal_actions:
-            new_state = state.transition(action)
-            yield from all_states(new_state)
-    empty_board = np.zeros((3, 3))
-    new_game = TicTacToe.get_state(empty_board)
-    assert len(set(all_states(new_game))) == 5478
-
+import numpy as np
+from functools import lru_cache
+from itertools import product
+from cache import StateCache
+from zobrist import zobrist_hash, zobrist_table
+
+def batch_rollout(boards: np.ndarray, rng: np.random.Generator | None = None) -> np.ndarray:
+    """Play a uniformly random game to the end from each of K boards at once.
+    `boards` is a stacked (K, n, n) array; boards are packed into bitmasks so a ply is a 
+    few vector ops for all K games. Returns a length-K array with 1 where player 1 won,
+    -1 where player -1 won and 0 for draws."""
+    rng = np.random.default_rng() if rng is None else rng
+    k, n, _ = boards.shape
+    cells = (1 << np.arange(n * n, dtype=np.int64))
+    index = cells.reshape(n, n)
+    lines = np.array([index[r].sum() for r in range(n)] + [index[:, c].sum() for c in range(n)] +
+                     [index.trace(), index[::-1].trace()], dtype=np.int64)
+    full = int(cells.sum())
+    flat = boards.reshape(k, n * n)
+    x_bits = (cells * (flat > 0)).sum(axis=1)
+    o_bits = (cells * (flat < 0)).sum(axis=1)
+    balance = flat.sum(axis=1).astype(np.int64)
+
+    def three(bits: np.ndarray) -> np.ndarray:
+        return ((bits[:, None] & lines[None, :]) == lines).any(axis=1)
+
+    results = np.zeros(k, dtype=np.int64)
+    x_won, o_won = three(x_bits), three(o_bits)
+    results[x_won] = 1
+    results[o_won & ~x_won] = -1
+    active = ~(x_won | o_won) & ((x_bits | o_bits) != full)
+    while active.any():
+        legal = ((x_bits | o_bits)[:, None] & cells[None, :]) == 0
+        move = cells[np.argmax(rng.random((k, n * n)) * legal, axis=1)] * active
+        player = np.where(balance <= 0, 1, -1)
+        x_moves = player == 1
+        x_bits |= move * x_moves
+        o_bits |= move * ~x_moves
+        balance += player * active
+        won = active & np.where(x_moves, three(x_bits), three(o_bits))
+        results[won] = player[won]
+        active &= ~won & ((x_bits | o_bits) != full)
+    return results
+
+@lru_cache(maxsize=None)
+def line_masks(n: int) -> tuple[tuple[int, ...], tuple[int, ...], tuple[int, int]]:
+    """Bitmasks (cell r*n + c) of the rows, the columns and the two diagonals of an n x n board."""
+    rows = tuple(sum(1 << (r * n + c) for c in range(n)) for r in range(n))
+    cols = tuple(sum(1 << (r * n + c) for r in range(n)) for c in range(n))
+    diags = (sum(1 << (i * n + i) for i in range(n)), sum(1 << (i * n + n - 1 - i) for i in range(n)))
+    return rows, cols, diags
+
+@lru_cache(maxsize=None)
+def cell_symmetries(n: int) -> tuple[tuple[int, ...], ...]:
+    """The 8 rotations/reflections of an n x n board, each as the bit that cell r*n + c moves to:
+    transposed or not, then turned 0-3 quarter turns counterclockwise."""
+    images = []
+    for transpose in (False, True):
+        for turns in range(4):
+            image = []
+            for r, c in product(range(n), repeat=2):
+                i, j = (c, r) if transpose else (r, c)
+                for _ in range(turns):
+                    i, j = n - 1 - j, i
+                image.append(1 << (i * n + j))
+            images.append(tuple(image))
+    return tuple(images)
+
+def transform(bits: int, image: tuple[int, ...]) -> int:
+    """Move every cell set in `bits` to where `image` sends it."""
+    moved = 0
+    while bits:
+        low = bits & -bits
+        moved |= image[low.bit_length() - 1]
+        bits ^= low
+    return moved
+
+class TicTacToeState:
+    """A tictactoe state is the state of a tic tac toe board. Tictactoe is perfect information."""
+    __slots__ = ('_state','shape','x_bits','o_bits','key','zobrist','balance','player','all_legal_actions',
+                 'result','is_terminal','cache','__weakref__')
+    
+    def __init__(game, state: np.ndarray):
+        game._state: np.ndarray | None = state
+        game.shape: tuple = state.shape
+        # cell r*n + c of each player as a bitmask: the exact key, and what the Zobrist key hashes
+        game.x_bits: int = sum(1 << i for i, cell in enumerate(state.flat) if cell > 0)
+        game.o_bits: int = sum(1 << i for i, cell in enumerate(state.flat) if cell < 0)
+        game.key: tuple = (game.x_bits, game.o_bits, state.shape)  # the exact position
+        game.zobrist: int = zobrist_hash(game.x_bits, game.o_bits, zobrist_table(state.size))
+        game.balance: int = int(np.sum(state))
+        game.player = 1 if game.balance <= 0 else -1
+        game.result = game.game_result()
+        game.is_terminal = True if game.result is not None else False
+        game.all_legal_actions: list[tuple] = [action for 
+                                                action in product(*[range(dim) for dim in state.shape])
+                                                if state[action] == 0] if not game.is_terminal else []
+        game.cache: StateCache = TicTacToe.cache
+
+    @property
+    def state(game) -> np.ndarray:
+        """The board as an array, rebuilt from the bitmasks the first time it is asked for."""
+        if game._state is None:
+            rows, cols = game.shape
+            game._state = np.array([1. if game.x_bits >> i & 1 else -1. if game.o_bits >> i & 1 else 0.
+                                    for i in range(rows * cols)]).reshape(game.shape)
+        return game._state
+
+    @property
+    def num_actions(game) -> int:
+        return game.shape[0] * game.shape[1]
+
+    def action_index(game, action: tuple) -> int:
+        """Position of action in an evaluator's prior vector."""
+        return action[0] * game.shape[1] + action[1]
+
+    def canonical(game) -> tuple:
+        """The smallest key among the 8 rotations/reflections of this position."""
+        return min((transform(game.x_bits, image), transform(game.o_bits, image), game.shape)
+                   for image in cell_symmetries(game.shape[0]))
+
+    def transition(game, action: tuple) -> 'TicTacToeState':
+        r, c = action
+        cell = r * game.shape[1] + c
+        if game.player == 1:
+            key = (game.x_bits | 1 << cell, game.o_bits, game.shape)
+            zobrist = game.zobrist ^ zobrist_table(game.num_actions)[0][cell]
+        else:
+            key = (game.x_bits, game.o_bits | 1 << cell, game.shape)
+            zobrist = game.zobrist ^ zobrist_table(game.num_actions)[1][cell]
+        child = game.cache.get(zobrist, key)
+        if child is None:
+            child = game.cache.put(zobrist, game._child(key, zobrist, action))
+        return child
+
+    def _child(game, key: tuple, zobrist: int, action: tuple) -> 'TicTacToeState':
+        """Build the state after `action` from this one. 
+        Only the row, column and diagonals through `action` can have been completed."""
+        child = TicTacToeState.__new__(TicTacToeState)
+        child._state = None
+        child.x_bits, child.o_bits, child.shape = key
+        child.key = key
+        child.zobrist = zobrist
+        child.cache = game.cache
+        child.balance = game.balance + game.player
+        child.player = 1 if child.balance <= 0 else -1
+        n = game.shape[1]
+        r, c = action
+        rows, cols, diags = line_masks(n)
+        lines = [rows[r], cols[c]]
+        if r == c:
+            lines.append(diags[0])
+        if r + c == n - 1:
+            lines.append(diags[1])
+        mover_bits = child.x_bits if game.player == 1 else child.o_bits
+        if any(mover_bits & line == line for line in lines):
+            child.result = {1: game.player, -1: -game.player}
+        else:
+            child.result = None if len(game.all_legal_actions) > 1 else {1:0, -1:0}
+        child.is_terminal = True if child.result is not None else False
+        child.all_legal_actions = [a for a in game.all_legal_actions 
+                                   if a != action] if not child.is_terminal else []
+        return child
+    
+    batch_rollout = staticmethod(batch_rollout)
+
+    def scratch(game) -> 'TicTacToeScratch':
+        """A mutable copy of this position for throwaway playouts."""
+        return TicTacToeScratch(game)
+
+    def game_result(game) -> int | None:
+        """ this property should return 
+        1 if player #1 wins 
+        -1 if player #2 wins 
+        0 if there is a draw 
+        None if result is unknown
+        """
+        board = game.state
+        three_in_a_row = 3
+        rowsum = np.sum(board, 0)
+        colsum = np.sum(board, 1)
+        diag_sum_tl = board.trace()
+        diag_sum_tr = board[::-1].trace()
+
+        player_one_wins = any(rowsum == three_in_a_row)
+        player_one_wins |= any(colsum == three_in_a_row)
+        player_one_wins |= (diag_sum_tl == three_in_a_row)
+        player_one_wins |= (diag_sum_tr == three_in_a_row)
+
+        if player_one_wins:
+            return {1:1, -1:-1}
+
+        player_two_wins = any(rowsum == -three_in_a_row)
+        player_two_wins |= any(colsum == -three_in_a_row)
+        player_two_wins |= (diag_sum_tl == -three_in_a_row)
+        player_two_wins |= (diag_sum_tr == -three_in_a_row)
+
+        if player_two_wins:
+            return {1:-1, -1:1}
+
+        if np.all(board != 0):
+            return {1:0, -1:0}
+
+        return None
+    
+    def __str__(game):
+        return str(game.state)
+    
+    def __hash__(game):
+        return game.zobrist
+
+    def __eq__(game, other):
+        if isinstance(other, TicTacToeState):
+            return game.key == other.key
+        return False
+
+    def __reduce__(game):
+        # pickle the position only; the receiving process interns it in its own cache
+        return (TicTacToe.get_state, (game.state,))
+
+class TicTacToeScratch:
+    """Mutable tictactoe simulator for rollouts. 
+    Keeps running row/column/diagonal sums so a move is checked for a win in O(1), 
+    and never creates or interns a TicTacToeState."""
+    __slots__ = ('n','rows','cols','diags','balance','player','legal_actions')
+
+    def __init__(sim, game: TicTacToeState):
+        sim.legal_actions: list[tuple] = []
+        sim.reset(game)
+
+    def reset(sim, game: TicTacToeState):
+        sim.n: int = game.shape[0]
+        x_bits, o_bits = game.x_bits, game.o_bits
+        rows, cols, diags = line_masks(sim.n)
+        sim.rows: list[int] = [(x_bits & line).bit_count() - (o_bits & line).bit_count() for line in rows]
+        sim.cols: list[int] = [(x_bits & line).bit_count() - (o_bits & line).bit_count() for line in cols]
+        sim.diags: list[int] = [(x_bits & line).bit_count() - (o_bits & line).bit_count() for line in diags]
+        sim.balance: int = game.balance
+        sim.player: int = game.player
+        sim.legal_actions[:] = game.all_legal_actions
+
+    def play(sim, action: tuple) -> dict | None:
+        """Mark `action` for the player to move. Returns the result if that ended the game."""
+        mover = sim.player
+        n = sim.n
+        r, c = action
+        sim.legal_actions.remove(action)
+        sim.rows[r] += mover
+        sim.cols[c] += mover
+        won = sim.rows[r] == n * mover or sim.cols[c] == n * mover
+        if r == c:
+            sim.diags[0] += mover
+            won |= sim.diags[0] == n * mover
+        if r + c == n - 1:
+            sim.diags[1] += mover
+            won |= sim.diags[1] == n * mover
+        sim.balance += mover
+        sim.player = 1 if sim.balance <= 0 else -1
+        if won:
+            return {1: mover, -1: -mover}
+        return None if sim.legal_actions else {1:0, -1:0}
+
+    def winning_action(sim, player: int) -> tuple | None:
+        """A cell where `player` would complete a line with their next mark, if there is one."""
+        n = sim.n
+        target = (n - 1) * player
+        for r, c in sim.legal_actions:
+            if (sim.rows[r] == target or sim.cols[c] == target or r == c and sim.diags[0] == target
+                    or r + c == n - 1 and sim.diags[1] == target):
+                return (r, c)
+        return None
+
+    def heuristic(sim) -> float:
+        """No cheap signal on a board this small: call it even."""
+        return 0.
+
+class TicTacToe:
+    """Class to manage TicTacToe states and cache."""
+    cache: StateCache = StateCache()
+
+    @classmethod
+    def get_state(cls, state: np.ndarray, cache: StateCache | None = None) -> TicTacToeState:
+        cache = cls.cache if cache is None else cache
+        game = TicTacToeState(state)
+        interned = cache.get(game.zobrist, game.key)
+        if interned is None:
+            game.cache = cache
+            interned = cache.put(game.zobrist, game)
+        return interned
+
+    @classmethod
+    def reset_cache(cls):
+        cls.cache.clear()
+
+def test_tic_tac_toe():
+    def all_states(state: TicTacToeState):
+        """Generate all states of tictactoe. The number of valid states is 5478. """
+        yield state   
+        for action in state.all_legal_actions:
+            new_state = state.transition(action)
+            yield from all_states(new_state)
+    empty_board = np.zeros((3, 3))
+    new_game = TicTacToe.get_state(empty_board)
+    assert len(set(all_states(new_game))) == 5478
+
@@ -1,23 +1,105 @@
-from graphviz import Digraph
-import numpy as np 
+"""Drawing and exporting search trees and graphs.
+walk() visits the nodes reachable from a root breadth first, without recursion, optionally
+pruned to a maximum depth, a minimum edge visit count and the top-k children of every node.
+write_dot() and write_edges() stream what it finds straight to a file (DOT, or a CSV/JSON edge
+list annotated with edge visits and Q), so big searches can be exported without building a
+second copy of the graph; visualize_tree() builds a graphviz.Digraph for small ones.
+
+    export(mcgs.root, 'graph.dot', max_depth=6, min_visits=10, top_k=3)"""
+from collections import deque
+from typing import Any, Iterator, TextIO
+import json
+import os
+import numpy as np
+
+Node = Any
 
 def format_board(board: np.ndarray, result: int):
     """Convert numpy array to a string format suitable for graph labels."""
     player = 1 if np.sum(board) <= 0 else -1
-    return f'player {player}\n' + '\n'.join(' '.join(str(int(cell)) for cell in row) for row in board) + f'\n{result}'
-
-def add_nodes_edges(graph, node, seen):
-    node_label = format_board(node.game_state.state, node.game_state.result)
-    if node in seen:
-        return
-    seen.add(node)
-    graph.node(name=str(id(node)), label=node_label, shape='circle')
-    for child in node.children:
-        graph.edge(str(id(node)), str(id(child)))
-        add_nodes_edges(graph, child, seen)
-
-def visualize_tree(root):
+    rows = board.astype(int).tolist()
+    return f'player {player}\n' + '\n'.join(' '.join(map(str, row)) for row in rows) + f'\n{result}'
+
+def edge_visits(node: Node, child: Node) -> int:
+    """How often selection went from node to child: MCGS edge visits, or the child's N in a tree."""
+    edges = getattr(node, 'child_to_edge_visits', None)
+    return edges[child] if edges is not None else child.N
+
+def walk(root: Node, max_depth: int | None = None, min_visits: int = 0,
+         top_k: int | None = None) -> Iterator[tuple[int, Node, int, list[tuple[int, Node, int]]]]:
+    """Yield (id, node, depth, edges) for every node reachable from root through the edges that
+    survive the filters, breadth first, each node once at its shallowest depth. `edges` lists
+    (child id, child, edge visits) of the kept edges out of node: those with at least min_visits
+    visits, the top_k most visited of them, none below max_depth. Ids count up from 0 (the root)."""
+    ids = {root: 0}
+    queue = deque([(root, 0)])
+    while queue:
+        node, depth = queue.popleft()
+        edges = []
+        if max_depth is None or depth < max_depth:
+            edges = [(child, visits) for child in node.children
+                     if (visits := edge_visits(node, child)) >= min_visits]
+            if top_k is not None and len(edges) > top_k:
+                edges = sorted(edges, key=lambda edge: edge[1], reverse=True)[:top_k]
+            for child, _ in edges:
+                if child not in ids:
+                    ids[child] = len(ids)
+                    queue.append((child, depth + 1))
+        yield ids[node], node, depth, [(ids[child], child, visits) for child, visits in edges]
+
+def node_label(node: Node) -> str:
+    return format_board(node.game_state.state, node.game_state.result) + f'\nN={node.N} Q={node.Q:.3f}'
+
+def write_dot(root: Node, file: TextIO, labels: bool = True, **filters):
+    """Write the (filtered, see walk) graph under root to file as a DOT digraph. Edges are labelled
+    with their visits and the child's Q (for the player taking the edge); without labels nodes
+    show only N, which skips building the board strings."""
+    file.write('digraph game_tree {\n')
+    for node_id, node, depth, edges in walk(root, **filters):
+        label = node_label(node) if labels else f'N={node.N}'
+        file.write(f'{node_id} [label={json.dumps(label)}, shape=circle];\n')
+        for child_id, child, visits in edges:
+            file.write(f'{node_id} -> {child_id} [label="{visits} / {child.Q:.3f}"];\n')
+    file.write('}\n')
+
+EDGE_FIELDS = ('parent', 'child', 'depth', 'visits', 'Q', 'N', 'terminal')
+
+def write_edges(root: Node, file: TextIO, format: str = 'csv', **filters):
+    """Write the (filtered, see walk) edges under root to file, one per line: a CSV with a header,
+    or a JSON array of objects. Fields: parent and child ids, the parent's depth, edge visits,
+    the child's Q (for the player taking the edge) and N, and whether the child is terminal."""
+    if format not in ('csv', 'json'):
+        raise ValueError(f"unknown edge list format {format!r}")
+    file.write(','.join(EDGE_FIELDS) + '\n' if format == 'csv' else '[')
+    first = True
+    for node_id, node, depth, edges in walk(root, **filters):
+        for child_id, child, visits in edges:
+            row = (node_id, child_id, depth, visits, child.Q, child.N, bool(child.is_terminal))
+            if format == 'csv':
+                file.write(','.join(map(str, row)) + '\n')
+            else:
+                file.write(('\n' if first else ',\n') + json.dumps(dict(zip(EDGE_FIELDS, row))))
+            first = False
+    if format == 'json':
+        file.write('\n]\n')
+
+def export(root: Node, path: str | os.PathLike, **options):
+    """Write the graph under root to path as DOT, CSV or JSON, chosen by its suffix."""
+    suffix = os.path.splitext(path)[1]
+    if suffix not in ('.dot', '.csv', '.json'):
+        raise ValueError(f"cannot tell the format of {path} (expected .dot, .csv or .json)")
+    with open(path, 'w') as file:
+        if suffix == '.dot':
+            write_dot(root, file, **options)
+        else:
+            write_edges(root, file, suffix[1:], **options)
+
+def visualize_tree(root: Node, **filters):
+    """graphviz.Digraph of the (filtered, see walk) graph under root, to render small graphs."""
+    from graphviz import Digraph  # optional: only needed for drawing
     graph = Digraph(comment='game_tree', format='png')
-    seen = set()
-    add_nodes_edges(graph, root, seen)
+    for node_id, node, depth, edges in walk(root, **filters):
+        graph.node(name=str(node_id), label=node_label(node), shape='circle')
+        for child_id, child, visits in edges:
+            graph.edge(str(node_id), str(child_id), label=f'{visits} / {child.Q:.3f}')
     return graph
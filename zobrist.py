@@ -0,0 +1,24 @@
+"""64-bit Zobrist keys for board positions.
+Every (cell, player) pair gets a fixed random 64-bit number and a position's key is the XOR of
+the numbers of its occupied cells, so playing a move updates the key with a single XOR. Keys can
+collide, so whoever indexes positions by them must still compare the exact positions."""
+import random
+from functools import lru_cache
+
+@lru_cache(maxsize=None)
+def zobrist_table(cells: int) -> tuple[tuple[int, ...], tuple[int, ...]]:
+    """Random numbers for player 1 and for player -1 on each of `cells` cells.
+    Seeded by the board size, so every process builds the same table."""
+    rng = random.Random(cells)
+    return (tuple(rng.getrandbits(64) for _ in range(cells)),
+            tuple(rng.getrandbits(64) for _ in range(cells)))
+
+def zobrist_hash(x_bits: int, o_bits: int, table: tuple) -> int:
+    """Key of the position with player 1 on the set bits of x_bits and player -1 on those of o_bits."""
+    key = 0
+    for bits, numbers in ((x_bits, table[0]), (o_bits, table[1])):
+        while bits:
+            low = bits & -bits
+            key ^= numbers[low.bit_length() - 1]
+            bits ^= low
+    return key